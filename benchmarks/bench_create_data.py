@@ -0,0 +1,56 @@
+"""
+Compares per-leg `DataProvider.create_data` against the bulk `create_data_many` loader.
+
+Usage: python -m benchmarks.bench_create_data [num_straddles] [num_snapshots]
+"""
+from benchmarks.synthetic import build_synthetic_db
+from src.data_provider import DataProvider
+import pandas as pd
+import tempfile
+import time
+import sys
+
+
+def make_straddles(num_straddles, ticker="SYN", expiration_date="2025-03-14"):
+    return [
+        [
+            {
+                "ticker": ticker,
+                "option_type": option_type,
+                "expiration_date": expiration_date,
+                "strike": 100.0 + i,
+            }
+            for option_type in ("call", "put")
+        ]
+        for i in range(num_straddles)
+    ]
+
+
+def run(num_straddles=50, num_snapshots=200, reference_date="2025-03-05"):
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = build_synthetic_db(work_dir, num_snapshots=num_snapshots)
+        provider = DataProvider(db_path)
+        straddles = make_straddles(num_straddles)
+
+        start = time.perf_counter()
+        per_leg = [provider.create_data(legs, reference_date) for legs in straddles]
+        per_leg_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        bulk = provider.create_data_many(straddles, reference_date)
+        bulk_elapsed = time.perf_counter() - start
+
+        for expected, actual in zip(per_leg, bulk):
+            pd.testing.assert_frame_equal(expected, actual)
+
+        print(f"{num_straddles} straddles x {num_snapshots} snapshots (frames identical)")
+        print(f"create_data per straddle: {per_leg_elapsed * 1000:>10.1f} ms")
+        print(f"create_data_many:         {bulk_elapsed * 1000:>10.1f} ms")
+        print(f"speedup:                  {per_leg_elapsed / bulk_elapsed:>10.2f}x")
+
+
+if __name__ == "__main__":
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 50,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 200,
+    )
@@ -0,0 +1,144 @@
+"""
+Times a many-small-queries workload shaped like `main.py` (per contract: a realized
+volatility lookup, a first-contract-date lookup and one query per straddle leg) through
+`SQLiteBackend` and `UnderlyingPriceStore`, opening a connection per query as before
+versus a `ConnectionPool`, and checks every variant returns the same answers.
+
+Usage: python -m benchmarks.bench_db_pool [num_jobs] [num_threads]
+"""
+from benchmarks.synthetic import build_synthetic_db
+from src.connection_pool import ConnectionPool, QueryStats
+from src.price_store import UnderlyingPriceStore
+from src.storage import SQLiteBackend
+from concurrent.futures import ThreadPoolExecutor
+import contextlib
+import io
+import pandas as pd
+import sqlite3
+import tempfile
+import time
+import sys
+
+
+class _ConnectPerQuery(ConnectionPool):
+    # The previous access pattern: a fresh default connection for every query
+    def _run(self, func):
+        conn = sqlite3.connect(self.db_name)
+        try:
+            return func(conn)
+        finally:
+            conn.close()
+
+    def fetchall(self, query, params=()):
+        return self._timed(
+            lambda: self._run(lambda conn: conn.execute(query, params).fetchall()), query, params
+        )
+
+    def fetchone(self, query, params=()):
+        return self._timed(
+            lambda: self._run(lambda conn: conn.execute(query, params).fetchone()), query, params
+        )
+
+    def read_frame(self, query, params=(), parse_dates=None):
+        return self._timed(
+            lambda: self._run(
+                lambda conn: pd.read_sql_query(query, conn, params=params, parse_dates=parse_dates)
+            ),
+            query,
+            params,
+        )
+
+
+def _run(pool, straddles, reference_date, threads):
+    backend = SQLiteBackend(pool.db_name, pool)
+    store = UnderlyingPriceStore(pool.db_name, offline=True, pool=pool)
+
+    def job(legs):
+        return [
+            store.get_realized_volatility("SYN", 7, reference_date),
+            backend.first_contract_date("SYN"),
+            *(backend.load_contract(**leg) for leg in legs),
+        ]
+
+    start = time.perf_counter()
+    if threads <= 1:
+        answers = [job(legs) for legs in straddles]
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            answers = list(executor.map(job, straddles))
+    elapsed = time.perf_counter() - start
+    return [answer for answers_ in answers for answer in answers_], elapsed
+
+
+def _same(expected, actual):
+    assert len(expected) == len(actual)
+    for left, right in zip(expected, actual):
+        if isinstance(left, pd.DataFrame):
+            pd.testing.assert_frame_equal(left, right)
+        else:
+            assert left == right or (left != left and right != right), (left, right)
+
+
+def run(num_jobs=2000, threads=4, reference_date="2025-03-05"):
+    with tempfile.TemporaryDirectory() as work_dir:
+        with contextlib.redirect_stdout(io.StringIO()):
+            db_path = build_synthetic_db(work_dir, num_snapshots=20)
+        straddles = [
+            [
+                {
+                    "ticker": "SYN",
+                    "option_type": option_type,
+                    "expiration_date": f"2025-03-{7 + 7 * (i % 4):02d}",
+                    "strike": 50.0 + i % 200,
+                }
+                for option_type in ("call", "put")
+            ]
+            for i in range(num_jobs)
+        ]
+
+        legacy, pooled = _ConnectPerQuery(db_path), ConnectionPool(db_path)
+        legacy_stats, pooled_stats = QueryStats(), QueryStats()
+        legacy.add_hook(legacy_stats)
+        pooled.add_hook(pooled_stats)
+        variants = [
+            ("connection per query", legacy, 1),
+            (
+                "pool, no pragmas",
+                ConnectionPool(db_path, mmap_size=None, cache_size=None, temp_store=None),
+                1,
+            ),
+            ("pool", pooled, 1),
+            (f"pool, {threads} threads", ConnectionPool(db_path), threads),
+        ]
+
+        timings = {}
+        expected = None
+        for name, pool, num_threads in variants:
+            answers, timings[name] = _run(pool, straddles, reference_date, num_threads)
+            if expected is None:
+                expected = answers
+            else:
+                _same(expected, answers)
+            pool.close()
+
+    queries = len(expected)
+    print(f"{num_jobs} jobs, {queries} queries (answers identical across variants)")
+    baseline = timings["connection per query"]
+    for name, elapsed in timings.items():
+        print(
+            f"  {name:<24}{elapsed:>8.2f} s{elapsed / queries * 1e6:>10.0f} us/query"
+            f"{baseline / elapsed:>8.2f}x"
+        )
+    per_query = legacy_stats.summary().merge(
+        pooled_stats.summary(), on="query", suffixes=("_per_query", "_pooled")
+    )
+    per_query["query"] = per_query["query"].str[:40]
+    columns = ["query", "count_pooled", "mean_us_per_query", "mean_us_pooled"]
+    print(per_query[columns].to_string(index=False))
+
+
+if __name__ == "__main__":
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 2000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 4,
+    )
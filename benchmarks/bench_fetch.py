@@ -0,0 +1,78 @@
+"""
+Runs `HistoricalDataHandler.fetch_and_store_options_data` against `FakeChainSource` with
+simulated latency and failures, checks what was stored, and compares one worker to many.
+
+Usage: python -m benchmarks.bench_fetch [num_tickers] [num_expirations] [latency_ms]
+"""
+from src.historical.chain_source import FakeChainSource
+from src.historical.historical import HistoricalDataHandler
+import contextlib
+import io
+import os
+import tempfile
+import time
+import yaml
+import sys
+
+
+def _fetch(work_dir, name, tickers, source, workers):
+    config_path = os.path.join(work_dir, f"{name}.yaml")
+    with open(config_path, "w") as file:
+        yaml.safe_dump(
+            {
+                "database": os.path.join(work_dir, f"{name}.db"),
+                "output_folder": work_dir,
+                "stocks": tickers,
+                "fetch_workers": workers,
+                "fetch_rate_limit": 1000,
+                "fetch_backoff": 0.01,
+            },
+            file,
+        )
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        handler = HistoricalDataHandler(config_path, chain_source=source)
+        start = time.perf_counter()
+        report = handler.fetch_and_store_options_data()
+        elapsed = time.perf_counter() - start
+    rows = handler.conn.execute("SELECT COUNT(*) FROM options").fetchone()[0]
+    handler.close_connection()
+    return report, rows, elapsed
+
+
+def run(num_tickers=6, num_expirations=8, latency_ms=50):
+    tickers = [f"T{i:02d}" for i in range(num_tickers)]
+    expiration = FakeChainSource().expirations("T00")[1]
+    # One transient failure per kind of request, plus one expiration that never succeeds
+    failures = {tickers[0]: 1, (tickers[1], expiration): 2, (tickers[2], expiration): 99}
+    chain_rows = 2 * 50
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        timings = {}
+        for workers in (1, 8):
+            source = FakeChainSource(num_expirations, latency=latency_ms / 1000, failures=failures)
+            report, rows, timings[workers] = _fetch(
+                work_dir, f"fetch_{workers}", tickers, source, workers
+            )
+
+            expected = (num_tickers * num_expirations - 1) * chain_rows
+            assert rows == expected, (rows, expected)
+            assert report[tickers[0]]["errors"] == [] and report[tickers[1]]["errors"] == []
+            assert len(report[tickers[2]]["errors"]) == 1
+            assert report[tickers[2]]["chains"] == num_expirations - 1
+
+        print(
+            f"{num_tickers} tickers x {num_expirations} expirations, {latency_ms} ms latency: "
+            f"{expected} rows stored, transient failures retried, permanent failure isolated"
+        )
+        print(f"1 worker:  {timings[1]:>8.2f} s")
+        print(f"8 workers: {timings[8]:>8.2f} s")
+        print(f"speedup:   {timings[1] / timings[8]:>8.2f}x")
+
+
+if __name__ == "__main__":
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 6,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 8,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 50,
+    )
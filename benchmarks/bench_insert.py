@@ -0,0 +1,33 @@
+"""
+Compares row-by-row and bulk `DBHandler.insert_data` throughput on a synthetic chain.
+
+Usage: python -m benchmarks.bench_insert [num_rows]
+"""
+from benchmarks.synthetic import make_synthetic_chain, make_handler
+import tempfile
+import time
+import sys
+
+
+def run(num_rows=20000, batch_sizes=(500, 5000, 50000)):
+    chain = make_synthetic_chain(num_rows)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        handler = make_handler(work_dir, "row_by_row", batch_sizes[0])
+        start = time.perf_counter()
+        handler.insert_data(chain, bulk=False)
+        elapsed = time.perf_counter() - start
+        handler.close_connection()
+        print(f"row-by-row:            {num_rows / elapsed:>12,.0f} rows/sec")
+
+        for batch_size in batch_sizes:
+            handler = make_handler(work_dir, f"bulk_{batch_size}", batch_size)
+            start = time.perf_counter()
+            handler.insert_data(chain)
+            elapsed = time.perf_counter() - start
+            handler.close_connection()
+            print(f"bulk (batch={batch_size:>6}): {num_rows / elapsed:>12,.0f} rows/sec")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
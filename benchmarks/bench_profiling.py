@@ -0,0 +1,119 @@
+"""
+Checks the stage profiler (`src.profiling`) on a synthetic database: a profiled run
+reports every pipeline stage, SQL statement and the slowest contracts (also when the
+backtests run in a process pool), the JSON report round-trips, and the instrumentation
+costs next to nothing while profiling is disabled.
+
+Usage: python -m benchmarks.bench_profiling [num_straddles] [repeats]
+"""
+from benchmarks.synthetic import build_synthetic_db
+from src.backtest_engine import BacktestEngine
+from src.connection_pool import ConnectionPool
+from src.profiling import disable_profiling, enable_profiling, stage
+from src.storage import SQLiteBackend
+from src.straddle_selector import StraddleSelector
+from src.strategy import SimpleStraddleStrategy
+from src.walk_forward import straddle_legs
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+import sys
+
+
+REFERENCE_DATE = "2025-03-05"
+
+EXPECTED_STAGES = {"chain_snapshot", "spot_price", "load_rows", "resample", "combine_legs", "backtest"}
+
+
+def _pipeline(db_path, pool, straddles, workers=1):
+    backend = SQLiteBackend(db_path, pool)
+    selector = StraddleSelector(db_path, use_open=True, offline=True, backend=backend, pool=pool)
+    engine = BacktestEngine(db_path, backend=backend)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        # The synthetic chain is observed during the reference date, so select a day later
+        selector.select_contract("SYN", reference_date="2025-03-06")
+        results = engine.run_many(
+            SimpleStraddleStrategy, straddles, REFERENCE_DATE, workers=workers, chunk_size=4
+        )
+    return results, time.perf_counter() - start
+
+
+def _check_report(report, num_straddles):
+    assert EXPECTED_STAGES <= set(report["stages"]), set(report["stages"])
+    assert report["stages"]["backtest"]["count"] == report["counters"]["backtests"]
+    assert report["counters"]["backtests"] == num_straddles, report["counters"]
+    assert report["queries"], "No SQL timings"
+    assert len(report["slowest_contracts"]) == min(20, num_straddles)
+
+
+def run(num_straddles=24, repeats=3):
+    straddles = [
+        straddle_legs("SYN", {"strike": 60.0 + 3 * i, "expiration_date": "2025-03-14"})
+        for i in range(num_straddles)
+    ]
+    with tempfile.TemporaryDirectory() as work_dir:
+        with contextlib.redirect_stdout(io.StringIO()):
+            db_path = build_synthetic_db(work_dir, num_snapshots=200)
+        pool = ConnectionPool(db_path)
+        _pipeline(db_path, pool, straddles)  # Warm the page cache
+
+        disabled = min(_pipeline(db_path, pool, straddles)[1] for _ in range(repeats))
+        enabled = []
+        for _ in range(repeats):
+            profiler = enable_profiling()
+            profiler.attach(pool)
+            enabled.append(_pipeline(db_path, pool, straddles)[1])
+            pool.remove_hook(profiler.query_stats)
+            disable_profiling()
+        report_path = os.path.join(work_dir, "profile.json")
+        profiler.write_report(report_path)
+        with open(report_path) as file:
+            report = json.load(file)
+        _check_report(report, num_straddles)
+
+        # Worker stage and SQL timings are merged into the parent's report, each counted once
+        profiler = enable_profiling()
+        profiler.attach(pool)
+        _pipeline(db_path, pool, straddles, workers=2)
+        pool.remove_hook(profiler.query_stats)
+        pooled = profiler.report()
+        disable_profiling()
+        assert pooled["counters"]["backtests"] == num_straddles, pooled["counters"]
+        assert pooled["stages"]["backtest"]["count"] == num_straddles
+        stage_counts = lambda report: {name: stats["count"] for name, stats in report["stages"].items()}
+        assert stage_counts(pooled) == stage_counts(report), (stage_counts(pooled), stage_counts(report))
+        query_counts = lambda report: {query["query"]: query["count"] for query in report["queries"]}
+        assert query_counts(pooled) == query_counts(report), (query_counts(pooled), query_counts(report))
+
+    calls = sum(stats["count"] for stats in report["stages"].values())
+    start = time.perf_counter()
+    for _ in range(100000):
+        with stage("noop"):
+            pass
+    disabled_call = (time.perf_counter() - start) / 100000
+
+    print(f"{num_straddles} straddles, {calls} timed stage calls per run")
+    print(f"  profiling disabled {disabled:>8.3f} s")
+    print(f"  profiling enabled  {min(enabled):>8.3f} s ({min(enabled) / disabled - 1:+.1%})")
+    print(
+        f"  disabled stage() costs {disabled_call * 1e9:.0f} ns per call, "
+        f"{calls * disabled_call / disabled:.4%} of the run"
+    )
+    print("Top stages:")
+    for name, stats in list(report["stages"].items())[:6]:
+        print(
+            f"  {name:<16}{stats['count']:>6} calls {stats['total_s']:>8.3f} s "
+            f"p50 {stats['p50_ms']:.2f} ms p99 {stats['p99_ms']:.2f} ms"
+        )
+    print(f"  slowest contract: {report['slowest_contracts'][0]['contract']}")
+
+
+if __name__ == "__main__":
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 24,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 3,
+    )
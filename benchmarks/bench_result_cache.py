@@ -0,0 +1,99 @@
+"""
+Checks and times the backtest result cache (`ResultCache`) on synthetic straddle bars:
+
+- a warm rerun returns the same trades and summaries as an uncached run;
+- after new bars arrive for some contracts only those are recomputed;
+- changing a strategy parameter or the cash misses the cache;
+- size-based eviction keeps the cache under its limit.
+
+Usage: python -m benchmarks.bench_result_cache [num_bars] [num_series]
+"""
+from benchmarks.synthetic import make_straddle_bars
+from src.backtest_engine import BacktestEngine
+from src.result_cache import ResultCache
+from src.strategy import SimpleStraddleStrategy
+import contextlib
+import io
+import os
+import pandas as pd
+import tempfile
+import time
+import sys
+
+
+def _run(engine, series, strategy=SimpleStraddleStrategy, cash=10000, cache=None):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = [
+            engine.run_backtest(strategy, [], None, cash=cash, bt_data=bt_data, result_cache=cache)
+            for bt_data in series
+        ]
+    return results, time.perf_counter() - start
+
+
+def _same(expected, actual):
+    for left, right in zip(expected, actual):
+        if left["results"] is None:
+            assert right["results"] is None
+        else:
+            pd.testing.assert_frame_equal(left["results"], right["results"])
+        pd.testing.assert_series_equal(pd.Series(left["summary"]), pd.Series(right["summary"]))
+
+
+def _with_new_bar(bt_data):
+    extra = bt_data.iloc[[-1]].copy()
+    extra.index = extra.index + pd.Timedelta(minutes=1)
+    return pd.concat([bt_data, extra])
+
+
+def run(num_bars=5000, num_series=20):
+    engine = BacktestEngine(":memory:")
+    series = [make_straddle_bars(num_bars, seed=seed) for seed in range(num_series)]
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        cache = ResultCache(os.path.join(work_dir, "cache"), max_bytes=None)
+        timings = {}
+
+        expected, timings["no cache"] = _run(engine, series)
+        cold, timings["cold cache"] = _run(engine, series, cache=cache)
+        assert cache.counts()[:2] == (0, num_series), cache.counts()
+        warm, timings["warm cache"] = _run(engine, series, cache=cache)
+        assert cache.counts()[:2] == (num_series, num_series), cache.counts()
+        _same(expected, cold)
+        _same(expected, warm)
+
+        # A nightly rerun where every other contract gained a bar
+        updated = [_with_new_bar(df) if i % 2 else df for i, df in enumerate(series)]
+        cache.reset_counts()
+        nightly, timings["new bars on half"] = _run(engine, updated, cache=cache)
+        assert cache.counts()[:2] == (num_series - num_series // 2, num_series // 2)
+        _same(_run(engine, updated)[0], nightly)
+
+        # Strategy parameters and cash are part of the key
+        changed = type("ChangedStrategy", (SimpleStraddleStrategy,), {"profit_target": 0.3})
+        for kwargs in ({"strategy": changed}, {"cash": 20000}):
+            cache.reset_counts()
+            _run(engine, series[:2], cache=cache, **kwargs)
+            assert cache.counts()[:2] == (0, 2), kwargs
+
+        size = cache.stats()["size_bytes"]
+        small = ResultCache(cache.root, max_bytes=size // 2)
+        small.put("0" * 64, None, expected[0]["summary"])
+        stats = small.stats()
+        assert stats["size_bytes"] <= size // 2 and stats["evictions"], stats
+
+    baseline = timings["no cache"]
+    print(f"{num_series} straddles x {num_bars} bars (cached results identical)")
+    for name, elapsed in timings.items():
+        print(f"  {name:<18}{elapsed:>8.2f} s{baseline / elapsed:>8.2f}x")
+    print(
+        f"  eviction: {size / 1024:.0f} KB cache capped at {size // 2 / 1024:.0f} KB, "
+        f"{stats['evictions']} entries evicted"
+    )
+
+
+if __name__ == "__main__":
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 5000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 20,
+    )
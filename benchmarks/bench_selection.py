@@ -0,0 +1,218 @@
+"""
+Checks that the vectorized `select_contract` implementations rank exactly like the
+original dict-based loops, and times both on large random chains.
+
+Usage: python -m benchmarks.bench_selection [num_rows] [num_chains]
+"""
+from src.contract_select import ContractSelector
+from src.storage import CONTRACT_COLUMNS, CONTRACT_KEY_COLUMNS, StorageBackend
+from src.straddle_selector import StraddleSelector
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import time
+import sys
+
+
+REFERENCE_DATE = "2025-03-05"
+
+
+class _RowsBackend(StorageBackend):
+    def __init__(self, rows):
+        # Serve rows the way `chain_as_of` does: last observation per contract, in key order
+        latest = {row[:3]: row for row in rows}
+        self.rows = [latest[key] for key in sorted(latest)]
+
+    def load_contract(self, ticker, option_type, expiration_date, strike):
+        raise NotImplementedError
+
+    def load_contracts(self, ticker, keys):
+        raise NotImplementedError
+
+    def first_contract_date(self, ticker):
+        return REFERENCE_DATE
+
+    def chain_as_of(self, ticker, as_of):
+        return self.rows
+
+    def load_history(self, ticker, since):
+        # One snapshot per contract, taken at the reference date
+        df = pd.DataFrame(
+            self.rows,
+            columns=["strike", "expiration_date", "option_type", "volume", "openInterest", "impliedVolatility"],
+        )
+        df["Date"] = pd.Timestamp(REFERENCE_DATE)
+        df = df[df["expiration_date"] >= since].reindex(columns=CONTRACT_KEY_COLUMNS + CONTRACT_COLUMNS)
+        return df.sort_values(CONTRACT_KEY_COLUMNS + ["Date"], kind="mergesort").reset_index(drop=True)
+
+
+class _FixedPriceSelector(StraddleSelector):
+    def __init__(self, rows, stock_price, hv):
+        super().__init__(":memory:", backend=_RowsBackend(rows))
+        self.stock_price = stock_price
+        self.hv = hv
+
+    def _get_historical_spot_price(self, ticker, trade_date, use_open):
+        return self.stock_price
+
+    def _compute_realized_volatility(self, ticker, days, reference_date):
+        return self.hv
+
+
+def _value_or_default(value, default):
+    return default if value is None or value != value else value
+
+
+def _legacy_contract_select(contracts, stock_price, reference_date, max_results):
+    # ContractSelector.select_contract before vectorization
+    all_contracts = []
+    for strike in contracts.keys():
+        for expiration_date, contract_data in contracts[strike].items():
+            if "call" in contract_data and "put" in contract_data:
+                call_data = contract_data["call"]
+                put_data = contract_data["put"]
+                call_volume = _value_or_default(call_data.get("volume"), 0)
+                put_volume = _value_or_default(put_data.get("volume"), 0)
+                call_oi = _value_or_default(call_data.get("open_interest"), 0)
+                put_oi = _value_or_default(put_data.get("open_interest"), 0)
+                call_iv = _value_or_default(call_data.get("iv"), 0.0)
+                put_iv = _value_or_default(put_data.get("iv"), 0.0)
+                min_liquidity = min(call_volume, put_volume, call_oi, put_oi)
+                all_contracts.append(
+                    {
+                        "strike": strike,
+                        "expiration_date": expiration_date,
+                        "reference_date": reference_date,
+                        "stock_price": stock_price,
+                        "liquidity_score": min_liquidity,
+                        "implied_volatility": (call_iv + put_iv) / 2,
+                    }
+                )
+    sorted_contracts = sorted(
+        all_contracts,
+        key=lambda x: (
+            abs(x["strike"] - stock_price),
+            -x["liquidity_score"],
+            -x["implied_volatility"],
+        ),
+    )
+    return sorted_contracts[:max_results]
+
+
+def _legacy_straddle_select(contracts, stock_price, hv, reference_date, max_results,
+                            optimal_expiry_range=(7, 30)):
+    # StraddleSelector.select_contract before vectorization
+    selected_contracts = []
+    for strike, exp_data in contracts.items():
+        for expiration_date, contract_data in exp_data.items():
+            days_to_expiry = (
+                datetime.strptime(expiration_date, "%Y-%m-%d")
+                - datetime.strptime(reference_date, "%Y-%m-%d")
+            ).days
+            if not optimal_expiry_range[0] <= days_to_expiry <= optimal_expiry_range[1]:
+                continue
+            call_data = contract_data.get("call")
+            put_data = contract_data.get("put")
+            if not call_data or not put_data:
+                continue
+            liquidity = min(call_data["volume"], put_data["volume"])
+            if liquidity == 0:
+                continue
+            avg_iv = (call_data["iv"] + put_data["iv"]) / 2
+            iv_hv_ratio = avg_iv / hv if hv != 0 else np.inf
+            selected_contracts.append(
+                {
+                    "strike": strike,
+                    "expiration_date": expiration_date,
+                    "days_to_expiry": days_to_expiry,
+                    "reference_date": reference_date,
+                    "stock_price": stock_price,
+                    "liquidity": liquidity,
+                    "iv_hv_ratio": iv_hv_ratio,
+                    "strike_distance": abs(strike - stock_price),
+                }
+            )
+    sorted_contracts = sorted(
+        selected_contracts,
+        key=lambda x: (x["strike_distance"], x["iv_hv_ratio"], -x["liquidity"]),
+    )
+    return sorted_contracts[:max_results]
+
+
+def make_chain_rows(num_rows, seed=0, nan_iv=0.0):
+    """
+    Random chain observations with repeated snapshots, symmetric strikes (distance ties),
+    coarse volumes (liquidity ties) and optional missing IVs.
+    """
+    rng = np.random.default_rng(seed)
+    expirations = [
+        (datetime(2025, 3, 5) + timedelta(days=int(d))).strftime("%Y-%m-%d")
+        for d in rng.choice(np.arange(1, 60), 24, replace=False)
+    ]
+    strikes = rng.integers(100, 301, num_rows) / 2.0
+    iv = np.round(rng.uniform(0.1, 1.0, num_rows), 1)
+    iv[rng.random(num_rows) < nan_iv] = np.nan
+    return [
+        (strike, expiration, option_type, volume, open_interest, None if np.isnan(v) else v)
+        for strike, expiration, option_type, volume, open_interest, v in zip(
+            strikes.tolist(),
+            rng.choice(expirations, num_rows).tolist(),
+            rng.choice(["call", "put", "CALL"], num_rows, p=[0.45, 0.45, 0.1]).tolist(),
+            (rng.integers(0, 5, num_rows) * 10).tolist(),
+            rng.integers(0, 50, num_rows).tolist(),
+            iv.tolist(),
+        )
+    ]
+
+
+def _check(expected, actual):
+    assert len(expected) == len(actual), (expected, actual)
+    for left, right in zip(expected, actual):
+        assert left.keys() == right.keys()
+        for key in left:
+            assert repr(left[key]) == repr(right[key]) or left[key] == right[key], (key, left, right)
+
+
+def run(num_rows=200000, num_chains=5):
+    legacy_elapsed = vectorized_elapsed = 0.0
+    cases = 0
+    for seed in range(num_chains):
+        for nan_iv, hv, max_results in [(0.0, 0.35, 50), (0.0, 0.0, 50), (0.05, 0.35, 5), (0.0, 0.35, 0)]:
+            rows = make_chain_rows(num_rows, seed=seed, nan_iv=nan_iv)
+            selector = _FixedPriceSelector(rows, stock_price=100.0, hv=hv)
+
+            start = time.perf_counter()
+            expected = [
+                _legacy_contract_select(
+                    selector.get_available_contracts("SYN", REFERENCE_DATE),
+                    100.0, REFERENCE_DATE, max_results,
+                ),
+                _legacy_straddle_select(
+                    selector.get_available_contracts("SYN", REFERENCE_DATE),
+                    100.0, hv, REFERENCE_DATE, max_results,
+                ),
+            ]
+            legacy_elapsed += time.perf_counter() - start
+
+            start = time.perf_counter()
+            actual = [
+                ContractSelector.select_contract(selector, "SYN", REFERENCE_DATE, max_results),
+                selector.select_contract("SYN", REFERENCE_DATE, max_results),
+            ]
+            vectorized_elapsed += time.perf_counter() - start
+
+            for left, right in zip(expected, actual):
+                _check(left, right)
+            cases += 1
+
+    print(f"{cases} chains x {num_rows} rows: rankings identical (ContractSelector and StraddleSelector)")
+    print(f"dict loops:  {legacy_elapsed:>8.2f} s")
+    print(f"vectorized:  {vectorized_elapsed:>8.2f} s")
+    print(f"speedup:     {legacy_elapsed / vectorized_elapsed:>8.2f}x")
+
+
+if __name__ == "__main__":
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 200000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 5,
+    )
@@ -0,0 +1,76 @@
+"""
+Checks that `ParquetBackend` returns the same frames and rows as `SQLiteBackend` and
+compares their load latency on a synthetic chain.
+
+Usage: python -m benchmarks.bench_storage [num_straddles] [num_snapshots]
+"""
+from benchmarks.bench_create_data import make_straddles
+from benchmarks.synthetic import build_synthetic_db
+from src.data_provider import DataProvider
+from src.storage import SQLiteBackend, ParquetBackend, convert_sqlite_to_parquet
+import contextlib
+import io
+import os
+import pandas as pd
+import tempfile
+import time
+import sys
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def run(num_straddles=50, num_snapshots=200, reference_date="2025-03-05",
+        as_of="2025-03-05 12:00:00"):
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = build_synthetic_db(work_dir, num_snapshots=num_snapshots)
+        root = os.path.join(work_dir, "options_parquet")
+        with contextlib.redirect_stdout(io.StringIO()):
+            convert_sqlite_to_parquet(db_path, root)
+
+        backends = {"sqlite": SQLiteBackend(db_path), "parquet": ParquetBackend(root)}
+        straddles = make_straddles(num_straddles)
+        legs = [leg for legs in straddles for leg in legs]
+        keys = [(leg["option_type"], leg["expiration_date"], leg["strike"]) for leg in legs]
+
+        results, timings = {}, {}
+        for name, backend in backends.items():
+            provider = DataProvider(db_path, backend=backend)
+            results[name], timings[name] = zip(
+                _timed(lambda: [backend.load_contract(**leg) for leg in legs]),
+                _timed(lambda: backend.load_contracts("SYN", keys)),
+                _timed(lambda: backend.chain_as_of("SYN", as_of)),
+                _timed(lambda: backend.first_contract_date("SYN")),
+                _timed(lambda: provider.create_data_many(straddles, reference_date)),
+            )
+
+        expected, actual = results["sqlite"], results["parquet"]
+        for left, right in zip(expected[0], actual[0]):
+            pd.testing.assert_frame_equal(left, right)
+        pd.testing.assert_frame_equal(expected[1], actual[1])
+        assert expected[2] == actual[2]
+        assert expected[3] == actual[3]
+        for left, right in zip(expected[4], actual[4]):
+            pd.testing.assert_frame_equal(left, right)
+
+        print(f"{num_straddles} straddles x {num_snapshots} snapshots (frames and rows identical)")
+        print(f"{'':<22}{'sqlite':>12}{'parquet':>12}")
+        labels = [
+            f"load_contract x{len(legs)}", "load_contracts", "chain_as_of",
+            "first_contract_date", "create_data_many",
+        ]
+        for i, label in enumerate(labels):
+            print(
+                f"{label:<22}{timings['sqlite'][i] * 1000:>9.1f} ms"
+                f"{timings['parquet'][i] * 1000:>9.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 50,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 200,
+    )
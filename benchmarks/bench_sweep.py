@@ -0,0 +1,59 @@
+"""
+Checks that `BacktestEngine.sweep_contract` matches one `Backtest.run()` per parameter set
+and reports the speedup of sharing data and signals across the sweep.
+
+Usage: python -m benchmarks.bench_sweep [num_bars] [num_series]
+"""
+from benchmarks.bench_vectorized import _strategy_with
+from benchmarks.synthetic import make_straddle_bars
+from src.backtest_engine import BacktestEngine, make_param_sets
+from src.strategy import SimpleStraddleStrategy
+import contextlib
+import io
+import time
+import sys
+
+
+PARAM_GRID = {
+    "base_hold_period": [1, 3, 5],
+    "cooldown_period": [0, 1, 3],
+    "profit_target": [0.05, 0.2, 0.5],
+    "base_size": [10, 50],
+}
+
+
+def run(num_bars=5000, num_series=3):
+    engine = BacktestEngine(":memory:")
+    param_sets = make_param_sets(PARAM_GRID)
+    naive_elapsed = sweep_elapsed = 0.0
+
+    for seed in range(num_series):
+        bt_data = make_straddle_bars(num_bars, seed=seed)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            expected = [
+                engine.run_backtest(_strategy_with(params), [], None, bt_data=bt_data)["summary"]
+                for params in param_sets
+            ]
+            naive_elapsed += time.perf_counter() - start
+
+            start = time.perf_counter()
+            rows = engine.sweep_contract(SimpleStraddleStrategy, [], bt_data, param_sets)
+            sweep_elapsed += time.perf_counter() - start
+
+        for summary, row in zip(expected, rows):
+            actual = {key: value for key, value in row.items() if key != "param_set"}
+            assert repr(summary) == repr(actual), (summary, actual)
+
+    print(f"{num_series} series x {len(param_sets)} parameter sets x {num_bars} bars: summaries identical")
+    print(f"Backtest.run per set: {naive_elapsed:>8.2f} s")
+    print(f"sweep_contract:       {sweep_elapsed:>8.2f} s")
+    print(f"speedup:              {naive_elapsed / sweep_elapsed:>8.2f}x")
+
+
+if __name__ == "__main__":
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 5000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 3,
+    )
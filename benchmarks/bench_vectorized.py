@@ -0,0 +1,74 @@
+"""
+Checks that the vectorized straddle simulator reproduces `Backtest.run()` trades and
+reports the speedup on synthetic one-minute straddle bars.
+
+Usage: python -m benchmarks.bench_vectorized [num_bars] [num_series]
+"""
+from benchmarks.synthetic import make_straddle_bars
+from src.backtest_engine import BacktestEngine
+from src.strategy import SimpleStraddleStrategy
+import contextlib
+import io
+import pandas as pd
+import time
+import sys
+
+
+PARAMETER_SETS = [
+    {},
+    {"cooldown_period": 0, "profit_target": 0.05},
+    {"base_hold_period": 1, "base_size": 50},
+]
+
+
+def _strategy_with(params):
+    return type("SweepStrategy", (SimpleStraddleStrategy,), dict(params))
+
+
+def check_equivalence(bt_data, strategy, engine):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        expected = engine.run_backtest(strategy, [], None, bt_data=bt_data)
+        event_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = engine.run_backtest(strategy, [], None, bt_data=bt_data, vectorized=True)
+        vectorized_elapsed = time.perf_counter() - start
+
+    if expected["results"] is None:
+        assert actual["results"] is None
+    else:
+        pd.testing.assert_frame_equal(expected["results"], actual["results"])
+    pd.testing.assert_series_equal(
+        pd.Series(expected["summary"]), pd.Series(actual["summary"])
+    )
+    return event_elapsed, vectorized_elapsed, expected["summary"]["num_trades"]
+
+
+def run(num_bars=20000, num_series=5):
+    engine = BacktestEngine(":memory:")
+    event_total = vectorized_total = 0.0
+    total_trades = 0
+
+    for seed in range(num_series):
+        bt_data = make_straddle_bars(num_bars, seed=seed)
+        for params in PARAMETER_SETS:
+            event, vectorized, num_trades = check_equivalence(
+                bt_data, _strategy_with(params), engine
+            )
+            event_total += event
+            vectorized_total += vectorized
+            total_trades += num_trades
+
+    runs = num_series * len(PARAMETER_SETS)
+    print(f"{runs} runs x {num_bars} bars, {total_trades} trades: trades and summaries identical")
+    print(f"backtesting.py: {event_total:>8.2f} s")
+    print(f"vectorized:     {vectorized_total:>8.2f} s")
+    print(f"speedup:        {event_total / vectorized_total:>8.2f}x")
+
+
+if __name__ == "__main__":
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 5,
+    )
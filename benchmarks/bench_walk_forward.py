@@ -0,0 +1,198 @@
+"""
+Checks that `run_walk_forward` selects the same contracts and produces the same bars and
+backtest results as separate single-date runs (selection plus `run_many` per reference
+date), and compares their run time on a synthetic multi-day chain: data preparation
+(selection and bars) on its own, then end to end.
+
+Usage: python -m benchmarks.bench_walk_forward [num_days] [snapshots_per_day] [max_contracts]
+"""
+from benchmarks.synthetic import make_handler, make_synthetic_chain
+from src.backtest_engine import BacktestEngine
+from src.storage import (
+    MemoryBackend,
+    ParquetBackend,
+    SQLiteBackend,
+    convert_sqlite_to_parquet,
+)
+from src.strategy import SimpleStraddleStrategy
+from src.straddle_selector import StraddleSelector
+from src.walk_forward import run_walk_forward, straddle_legs, walk_forward_dates
+import contextlib
+import io
+import numpy as np
+import os
+import pandas as pd
+import tempfile
+import time
+import sys
+
+
+TICKER = "SYN"
+
+
+def _build_db(work_dir, dates, snapshots_per_day):
+    chain = make_synthetic_chain(len(dates) * snapshots_per_day * 3200, ticker=TICKER)
+    rng = np.random.default_rng(2)
+    chain["volume"] = chain["volume"].astype(float)
+    chain.loc[rng.random(len(chain)) < 0.05, "volume"] = np.nan
+
+    # Spread the one-minute snapshots over the business days, snapshots_per_day per day
+    snapshot = (
+        pd.to_datetime(chain["lastTradeDate"]) - pd.Timestamp("2025-03-05 10:00")
+    ) // pd.Timedelta(minutes=1)
+    day = pd.to_datetime(
+        pd.Series(np.array(dates)[snapshot // snapshots_per_day], index=chain.index)
+    )
+    chain["lastTradeDate"] = (
+        day + pd.Timedelta(hours=10) + pd.to_timedelta(snapshot % snapshots_per_day, unit="min")
+    ).dt.strftime("%Y-%m-%d %H:%M:%S")
+
+    days = pd.date_range("2025-02-01", "2025-04-30", freq="B")
+    close = 150.0 * np.exp(np.cumsum(rng.normal(0.0, 0.01, len(days))))
+    prices = pd.DataFrame(
+        {"Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close, "Volume": 1e6},
+        index=days,
+    )
+
+    handler = make_handler(work_dir, "walk_forward", 50000)
+    handler.insert_data(chain)
+    handler.insert_underlying_prices(TICKER, prices)
+    handler.close_connection()
+    return os.path.join(work_dir, "walk_forward.db"), len(chain)
+
+
+def _separate_runs(db_path, dates, max_contracts):
+    # One independent selection and run_many batch per reference date
+    records = []
+    for reference_date in dates:
+        selector = StraddleSelector(db_path, use_open=True, offline=True)
+        engine = BacktestEngine(db_path)
+        selected = selector.select_contract(TICKER, reference_date, max_contracts)
+        results = engine.run_many(
+            SimpleStraddleStrategy,
+            [straddle_legs(TICKER, contract) for contract in selected],
+            reference_date,
+            vectorized=True,
+        )
+        records.extend(
+            (reference_date, TICKER, contract, result)
+            for contract, result in zip(selected, results)
+        )
+    return records
+
+
+def _separate_data(backend, db_path, dates, max_contracts):
+    bars = []
+    for reference_date in dates:
+        selector = StraddleSelector(db_path, use_open=True, offline=True, backend=backend)
+        engine = BacktestEngine(db_path, backend=backend)
+        selected = selector.select_contract(TICKER, reference_date, max_contracts)
+        bars.extend(
+            engine.data_provider.create_data_many(
+                [straddle_legs(TICKER, contract) for contract in selected], reference_date
+            )
+        )
+    return bars
+
+
+def _walk_forward_data(backend, db_path, dates, max_contracts, preload):
+    # The data preparation steps of run_walk_forward
+    if preload:
+        backend = MemoryBackend.load(backend, [TICKER], since=dates[0])
+    selector = StraddleSelector(db_path, use_open=True, offline=True, backend=backend)
+    engine = BacktestEngine(db_path, backend=backend)
+    jobs = [
+        (reference_date, straddle_legs(TICKER, contract))
+        for reference_date in dates
+        for contract in selector.select_contract(TICKER, reference_date, max_contracts)
+    ]
+    return engine.data_provider.create_data_many(
+        [contracts for _, contracts in jobs],
+        reference_dates=[reference_date for reference_date, _ in jobs],
+    )
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def _check(expected, actual):
+    assert len(expected) == len(actual), (len(expected), len(actual))
+    for left, right in zip(expected, actual):
+        assert left[:3] == right[:3], (left[:3], right[:3])
+        if left[3] is None or right[3] is None:
+            assert left[3] is right[3]
+            continue
+        pd.testing.assert_series_equal(pd.Series(left[3]["summary"]), pd.Series(right[3]["summary"]))
+        if left[3]["results"] is None:
+            assert right[3]["results"] is None
+        else:
+            pd.testing.assert_frame_equal(left[3]["results"], right[3]["results"])
+
+
+def run(num_days=10, snapshots_per_day=12, max_contracts=10):
+    dates = walk_forward_dates("2025-03-03", "2025-03-31", "1B")[:num_days]
+    with tempfile.TemporaryDirectory() as work_dir:
+        with contextlib.redirect_stdout(io.StringIO()):
+            db_path, num_rows = _build_db(work_dir, dates, snapshots_per_day)
+            root = os.path.join(work_dir, "options_parquet")
+            convert_sqlite_to_parquet(db_path, root)
+
+            timings = []
+            expected_bars = None
+            for name, backend in [("sqlite", SQLiteBackend(db_path)), ("parquet", ParquetBackend(root))]:
+                separate_bars, separate = _timed(_separate_data, backend, db_path, dates, max_contracts)
+                expected_bars = expected_bars or separate_bars
+                for preload in (False, True):
+                    bars, elapsed = _timed(
+                        _walk_forward_data, backend, db_path, dates, max_contracts, preload
+                    )
+                    assert len(bars) == len(expected_bars)
+                    for left, right in zip(expected_bars, bars):
+                        pd.testing.assert_frame_equal(left, right)
+                    label = f"{name}{', preloaded' if preload else ''}"
+                    if preload != backend.seeks_as_of:
+                        label += " (default)"
+                    timings.append((label, separate, elapsed))
+
+            expected, separate_elapsed = _timed(_separate_runs, db_path, dates, max_contracts)
+            actual, walk_forward_elapsed = _timed(
+                run_walk_forward,
+                SimpleStraddleStrategy,
+                [TICKER],
+                dates,
+                SQLiteBackend(db_path),
+                db_path,
+                max_contracts,
+                True,
+                10000,
+                0.001,
+                True,
+            )
+
+    _check(expected, actual)
+    backtests = sum(record[3] is not None for record in actual)
+    trades = sum(record[3]["summary"]["num_trades"] for record in actual if record[3])
+    assert backtests, "Nothing was selected"
+
+    print(
+        f"{len(dates)} reference dates, {num_rows} stored rows: {len(actual)} selections, "
+        f"{backtests} backtests, {trades} trades (bars and results identical to separate runs)"
+    )
+    print(f"{'selection and bars':<32}{'separate':>10}{'walk-forward':>14}{'speedup':>10}")
+    for label, before, after in timings:
+        print(f"  {label:<30}{before:>8.2f} s{after:>12.2f} s{before / after:>9.2f}x")
+    print(
+        f"{'end to end (sqlite)':<32}{separate_elapsed:>8.2f} s{walk_forward_elapsed:>12.2f} s"
+        f"{separate_elapsed / walk_forward_elapsed:>9.2f}x"
+    )
+
+
+if __name__ == "__main__":
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 10,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 12,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 10,
+    )
@@ -0,0 +1,123 @@
+"""
+Checks the point-in-time chain snapshot (`StorageBackend.chain_as_of`):
+
+- exactly one row per unexpired contract observed (with volume and open interest) at or
+  before the as-of time, holding that contract's latest such observation;
+- nothing after the as-of time leaks in, for the backends and for both selectors;
+- the SQLite and Parquet backends agree.
+
+Usage: python -m benchmarks.check_as_of [num_snapshots]
+"""
+from benchmarks.synthetic import make_handler, make_synthetic_chain
+from src.contract_select import ContractSelector
+from src.storage import SQLiteBackend, ParquetBackend, convert_sqlite_to_parquet
+from src.straddle_selector import StraddleSelector
+import contextlib
+import io
+import numpy as np
+import os
+import pandas as pd
+import sqlite3
+import tempfile
+import time
+import sys
+
+
+# Selection date; the synthetic history straddles its midnight
+AS_OF = "2025-03-06"
+AS_OF_TIME = str(pd.Timestamp(AS_OF))
+KEY = ["strike", "expiration_date", "option_type"]
+
+
+class _FixedPriceSelector(StraddleSelector):
+    def _get_historical_spot_price(self, ticker, trade_date, use_open):
+        return 150.0
+
+    def _compute_realized_volatility(self, ticker, days, reference_date):
+        return 0.5
+
+
+def _build_db(work_dir, name, num_snapshots):
+    chain = make_synthetic_chain(num_snapshots * 3200, ticker="SYN")
+    rng = np.random.default_rng(1)
+    # Gaps: contracts missing from some snapshots, unknown liquidity, an expired series
+    chain = chain[rng.random(len(chain)) > 0.3].copy()
+    chain.loc[rng.random(len(chain)) < 0.1, "volume"] = np.nan
+    chain.loc[chain["expiration_date"] == "2025-03-07", "expiration_date"] = "2025-03-04"
+    chain["contractSymbol"] = chain["contractSymbol"] + chain["expiration_date"]
+    # Snapshots after 11:00 move to the next day, i.e. after the as-of time
+    later = chain["lastTradeDate"] > "2025-03-05 11:00:00"
+    chain.loc[later, "lastTradeDate"] = (
+        pd.to_datetime(chain.loc[later, "lastTradeDate"]) + pd.Timedelta(days=1)
+    ).dt.strftime("%Y-%m-%d %H:%M:%S")
+    with contextlib.redirect_stdout(io.StringIO()):
+        handler = make_handler(work_dir, name, 50000)
+        handler.insert_data(chain)
+        handler.close_connection()
+    return os.path.join(work_dir, f"{name}.db")
+
+
+def _expected_rows(db_path, as_of):
+    conn = sqlite3.connect(db_path)
+    df = pd.read_sql_query("SELECT * FROM options WHERE ticker='SYN'", conn)
+    conn.close()
+    past = df[
+        (df["lastTradeDate"] <= str(pd.Timestamp(as_of)))
+        & (df["expiration_date"] >= as_of[:10])
+        & df["volume"].notna()
+        & df["openInterest"].notna()
+    ]
+    latest = past.sort_values(KEY + ["lastTradeDate", "id"]).drop_duplicates(KEY, keep="last")
+    columns = KEY + ["volume", "openInterest", "impliedVolatility"]
+    return [tuple(row) for row in latest[columns].astype(object).itertuples(index=False)], len(df)
+
+
+def run(num_snapshots=240):
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = _build_db(work_dir, "as_of", num_snapshots)
+        expected, total_rows = _expected_rows(db_path, AS_OF)
+        legacy_rows = sqlite3.connect(db_path).execute(
+            "SELECT COUNT(*) FROM options WHERE ticker='SYN' AND lastTradeDate >= ?", (AS_OF,)
+        ).fetchone()[0]
+
+        root = os.path.join(work_dir, "options_parquet")
+        with contextlib.redirect_stdout(io.StringIO()):
+            convert_sqlite_to_parquet(db_path, root)
+
+        start = time.perf_counter()
+        sqlite_rows = SQLiteBackend(db_path).chain_as_of("SYN", AS_OF)
+        elapsed = time.perf_counter() - start
+        parquet_rows = ParquetBackend(root).chain_as_of("SYN", AS_OF)
+
+        assert sqlite_rows == expected, "SQLite as-of rows differ from the latest observations"
+        assert parquet_rows == expected, "Parquet as-of rows differ from the latest observations"
+        assert len({row[:3] for row in sqlite_rows}) == len(sqlite_rows)
+        assert all(row[1] >= AS_OF[:10] for row in sqlite_rows)
+
+        # Deleting everything after the as-of time must not change any answer
+        selections = []
+        for cutoff in (False, True):
+            if cutoff:
+                conn = sqlite3.connect(db_path)
+                with conn:
+                    conn.execute("DELETE FROM options WHERE lastTradeDate > ?", (AS_OF_TIME,))
+                conn.close()
+            selector = _FixedPriceSelector(db_path, offline=True)
+            selections.append(
+                (
+                    selector.backend.chain_as_of("SYN", AS_OF),
+                    ContractSelector.select_contract(selector, "SYN", AS_OF, 20),
+                    selector.select_contract("SYN", AS_OF, 20),
+                )
+            )
+        assert selections[0][1] and selections[0][2], "Selectors picked nothing"
+        assert selections[0] == selections[1], "Future rows changed the as-of selection"
+
+        print(f"{total_rows} stored rows, as of {AS_OF}:")
+        print(f"  one row per contract, latest observation: {len(sqlite_rows)} rows ({elapsed * 1000:.1f} ms)")
+        print(f"  previous 'lastTradeDate >= reference' query returned {legacy_rows} rows")
+        print("  SQLite and Parquet agree; selections unchanged when future rows are deleted")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 240)
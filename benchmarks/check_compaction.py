@@ -0,0 +1,272 @@
+"""
+Checks the retention job (`DBHandler.compact`) on a synthetic chain history with some
+snapshots missing volume or open interest:
+
+- reads at day boundaries are unchanged after the rollup: `chain_as_of` at every midnight,
+  session open and close, `first_contract_date` and the daily IV term structure;
+- snapshots newer than the cutoff are untouched;
+- `options_daily` matches `DataProvider`'s 1D bars built from the snapshots before the
+  rollup, and compacting in several runs and chunks gives the same tables as one run;
+- `DataProvider`'s 1D and weekly bars of every contract (`load_contract` and
+  `load_contracts`) are unchanged after the rollup, read through the SQLite, Parquet and
+  in-memory backends;
+- dropping expired contracts only removes those past the horizon;
+- the file shrinks, both when a legacy database is converted to incremental auto_vacuum
+  and on a later incremental vacuum.
+
+Usage: python -m benchmarks.check_compaction [snapshot_minutes]
+"""
+from benchmarks.synthetic import build_options_db, make_handler
+from src.data_provider import DataProvider
+from src.historical.iv_context import compute_term_structure
+from src.storage import MemoryBackend, ParquetBackend, SQLiteBackend, convert_sqlite_to_parquet
+import contextlib
+import io
+import os
+import pandas as pd
+import sqlite3
+import tempfile
+import time
+import sys
+
+
+TICKER = "SYN"
+START = "2025-03-03"
+NUM_DAYS = 10
+CUTOFF = "2025-03-10"
+RETENTION_DAYS = 30
+BAR_INTERVALS = ("1D", "1W")
+AS_OF = pd.Timestamp(CUTOFF) + pd.Timedelta(days=RETENTION_DAYS)
+
+
+def _build(work_dir, name, snapshot_minutes, legacy=False):
+    path = os.path.join(work_dir, f"{name}.db")
+    build_options_db(path, tickers=(TICKER,), start=START, num_days=NUM_DAYS, snapshot_minutes=snapshot_minutes)
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE options SET volume = NULL WHERE id % 7 = 0")
+        conn.execute("UPDATE options SET openInterest = NULL WHERE id % 11 = 0")
+    if legacy:
+        # Files created before auto_vacuum was enabled
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA auto_vacuum=NONE")
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.close()
+    return path
+
+
+def _handler(work_dir, name):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return make_handler(work_dir, name, 50000)
+
+
+def _compact(handler, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return handler.compact(**kwargs)
+
+
+def _as_of_times():
+    days = pd.date_range(START, periods=NUM_DAYS + 5, freq="D")
+    return [
+        str(time)
+        for day in days
+        for time in (day, day + pd.Timedelta(hours=9, minutes=30), day + pd.Timedelta(hours=16))
+    ]
+
+
+def _reads(path):
+    backend = SQLiteBackend(path)
+    history = backend.load_history(TICKER, START)
+    closes = backend.pool.read_frame(
+        "SELECT date, close FROM underlying_prices WHERE ticker=?", params=[TICKER], parse_dates=["date"]
+    ).set_index("date")["close"]
+    reads = {
+        "chains": {as_of: backend.chain_as_of(TICKER, as_of) for as_of in _as_of_times()},
+        "first_date": backend.first_contract_date(TICKER),
+        "history": history,
+        "term": compute_term_structure(history.rename(columns={"Date": "lastTradeDate"}), closes),
+    }
+    backend.pool.close()
+    return reads
+
+
+def _tables(path):
+    with sqlite3.connect(path) as conn:
+        return [
+            pd.read_sql_query(f"SELECT * FROM {table} ORDER BY {order}", conn)
+            for table, order in (
+                ("options", "id"),
+                ("options_daily", "option_type, expiration_date, strike, date"),
+            )
+        ]
+
+
+def expected_daily(path, history):
+    """`DataProvider._to_ohlcv` 1D bars of every contract, on the days it has snapshots."""
+    provider = DataProvider(path)
+    frames = []
+    for (option_type, expiration_date, strike), rows in history.groupby(["option_type", "expiration_date", "strike"]):
+        days = rows["Date"].dt.normalize().unique()
+        bars = provider._to_ohlcv(rows.drop(columns=["option_type", "expiration_date", "strike"]).copy(), "1D")
+        bars = bars.loc[days].reset_index()
+        bars.insert(0, "option_type", option_type)
+        bars.insert(1, "expiration_date", expiration_date)
+        bars.insert(2, "strike", strike)
+        frames.append(bars)
+    provider.backend.pool.close()
+    bars = pd.concat(frames, ignore_index=True)
+    bars["date"] = bars.pop("Date").dt.strftime("%Y-%m-%d")
+    return bars
+
+
+def check_daily(daily, expected):
+    columns = {
+        "Open": "open", "High": "high", "Low": "low", "Close": "close", "volume": "volume",
+        "openInterest": "open_interest", "impliedVolatility": "implied_volatility",
+        "percentChange": "percent_change", "change": "change", "inTheMoney": "in_the_money",
+    }
+    expected = expected.rename(columns=columns)
+    keys = ["option_type", "expiration_date", "strike", "date"]
+    merged = daily.merge(expected, on=keys, how="outer", suffixes=("", "_expected"), indicator=True)
+    assert (merged["_merge"] == "both").all(), "options_daily and the 1D bars cover different days"
+    for column in columns.values():
+        pd.testing.assert_series_equal(
+            merged[column].astype(float), merged[f"{column}_expected"].astype(float),
+            check_names=False, rtol=1e-12,
+        )
+
+
+def provider_bars(backend, contracts):
+    """`DataProvider` bars of every contract and interval, read one by one and in bulk."""
+    provider = DataProvider(backend=backend)
+    bars = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for interval in BAR_INTERVALS:
+            for contract in contracts:
+                bars[interval, "load_contract", *contract.values()] = provider.load_contract(
+                    **contract, interval=interval
+                )
+            bulk = provider.load_contracts(contracts, interval=interval)
+            for key, frame in bulk.items():
+                bars[interval, "load_contracts", *key] = frame
+    return bars
+
+
+def _contracts(history):
+    keys = history[["option_type", "expiration_date", "strike"]].drop_duplicates()
+    return [
+        {"ticker": TICKER, "option_type": option_type, "expiration_date": expiration_date, "strike": strike}
+        for option_type, expiration_date, strike in keys.itertuples(index=False, name=None)
+    ]
+
+
+def check_bars(contracts, expected, backends):
+    for name, backend in backends.items():
+        actual = provider_bars(backend, contracts)
+        assert actual.keys() == expected.keys()
+        for key, frame in expected.items():
+            # Volume and open interest sums come back as int64 once no snapshot lacks them
+            pd.testing.assert_frame_equal(actual[key], frame, check_dtype=False, rtol=1e-12)
+        print(f"  {name + ':':<8} {len(actual)} bar frames unchanged")
+
+
+def run(snapshot_minutes=15):
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = _build(work_dir, "once", snapshot_minutes, legacy=True)
+        before = _reads(path)
+        rows_before = len(before["history"])
+        compacted = before["history"][before["history"]["Date"] < CUTOFF]
+        daily_expected = expected_daily(path, compacted)
+        contracts = _contracts(before["history"])
+        backend = SQLiteBackend(path)
+        bars_before = provider_bars(backend, contracts)
+        backend.pool.close()
+
+        handler = _handler(work_dir, "once")
+        start = time.perf_counter()
+        report = _compact(handler, compact_after_days=RETENTION_DAYS, as_of=AS_OF)
+        compact_time = time.perf_counter() - start
+        assert handler.conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        assert _compact(handler, compact_after_days=RETENTION_DAYS, as_of=AS_OF)["snapshots_removed"] == 0
+        handler.close_connection()
+
+        after = _reads(path)
+        assert after["chains"] == before["chains"], "chain_as_of changed at a day boundary"
+        assert after["first_date"] == before["first_date"]
+        pd.testing.assert_frame_equal(after["term"], before["term"])
+        recent = lambda history: history[history["Date"] >= CUTOFF].reset_index(drop=True)
+        pd.testing.assert_frame_equal(recent(after["history"]), recent(before["history"]))
+        options, daily = _tables(path)
+        check_daily(daily, daily_expected)
+        assert report["snapshots_removed"] == rows_before - len(after["history"]) > 0
+        assert report["bytes_reclaimed"] > 0
+        print(
+            f"{rows_before} snapshots: {report['snapshots_removed']} rolled up into "
+            f"{report['daily_rows']} daily rows before {CUTOFF}; chain_as_of at "
+            f"{len(before['chains'])} day boundaries, first_contract_date, the IV term structure "
+            f"and every newer snapshot unchanged; options_daily matches DataProvider's 1D bars"
+        )
+        print(f"  compact + full VACUUM:   {compact_time * 1e3:>8.1f} ms")
+        print(
+            f"  file size:               {report['bytes_before'] / 1e6:>8.2f} MB -> "
+            f"{report['bytes_after'] / 1e6:.2f} MB"
+        )
+
+        print(f"DataProvider {'/'.join(BAR_INTERVALS)} bars of {len(contracts)} contracts after the rollup:")
+        root = os.path.join(work_dir, "parquet")
+        with contextlib.redirect_stdout(io.StringIO()):
+            convert_sqlite_to_parquet(path, root)
+        backend = SQLiteBackend(path)
+        check_bars(
+            contracts,
+            bars_before,
+            {
+                "sqlite": backend,
+                "parquet": ParquetBackend(root),
+                "memory": MemoryBackend.load(backend, [TICKER], since=START),
+            },
+        )
+        backend.pool.close()
+
+        # The same cutoff reached over two runs, in two-day chunks
+        _build(work_dir, "steps", snapshot_minutes)
+        handler = _handler(work_dir, "steps")
+        handler.compact_chunk_days = 2
+        _compact(handler, compact_after_days=RETENTION_DAYS + 4, as_of=AS_OF)
+        _compact(handler, compact_after_days=RETENTION_DAYS, as_of=AS_OF)
+        handler.close_connection()
+        for expected, actual in zip((options, daily), _tables(os.path.join(work_dir, "steps.db"))):
+            pd.testing.assert_frame_equal(expected, actual)
+        print("Two runs in two-day chunks give the same tables as one run")
+
+        # Drop the contracts that expired more than a day before the last chain day
+        last_day = pd.bdate_range(START, periods=NUM_DAYS)[-1]
+        horizon = (last_day - pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+        handler = _handler(work_dir, "once")
+        start = time.perf_counter()
+        report = _compact(handler, drop_expired_after_days=1, as_of=last_day)
+        drop_time = time.perf_counter() - start
+        handler.close_connection()
+        dropped = _reads(path)
+        kept = lambda history: history[history["expiration_date"] >= horizon].reset_index(drop=True)
+        pd.testing.assert_frame_equal(dropped["history"], kept(after["history"]))
+        options_left, daily_left = _tables(path)
+        assert (options_left["expiration_date"] >= horizon).all()
+        assert (daily_left["expiration_date"] >= horizon).all() and len(daily_left) < len(daily)
+        assert all(
+            dropped["chains"][as_of] == chain for as_of, chain in after["chains"].items() if as_of >= horizon
+        )
+        assert report["expired_rows"] == len(after["history"]) - len(dropped["history"]) > 0
+        with sqlite3.connect(path) as conn:
+            assert conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+        assert report["bytes_reclaimed"] > 0
+        print(f"Dropped {report['expired_rows']} rows of contracts expired before {horizon}; other reads unchanged")
+        print(f"  drop + incremental vacuum: {drop_time * 1e3:>6.1f} ms")
+        print(
+            f"  file size:               {report['bytes_before'] / 1e6:>8.2f} MB -> "
+            f"{report['bytes_after'] / 1e6:.2f} MB"
+        )
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 15)
@@ -0,0 +1,163 @@
+"""
+Checks and times the materialized IV context (`iv_term_structure` and `iv_rank`, see
+`DBHandler.refresh_iv_context`) on a synthetic chain history with rolling weekly
+expirations:
+
+- ATM IVs match a per-day loop interpolating each expiration's strikes with `np.interp`;
+- IV rank and percentile match a per-date loop over each lookback;
+- refreshing after every weekly batch of new rows gives the same tables as one refresh
+  over the whole history;
+- `StraddleSelector` reads the stored rank and skips tickers above `max_iv_rank`.
+
+Usage: python -m benchmarks.check_iv_context [num_weeks]
+"""
+from benchmarks.synthetic import make_handler, make_options_frame, make_underlying_prices
+from src.historical.iv_context import compute_constant_maturity
+from src.price_store import UnderlyingPriceStore
+from src.straddle_selector import StraddleSelector
+import contextlib
+import io
+import numpy as np
+import pandas as pd
+import tempfile
+import time
+import sys
+
+
+TICKER = "SYN"
+START = "2025-01-06"
+WINDOWS = (30, 90)
+
+
+def make_history(num_weeks, seed=0):
+    """Weekly chains (each with its own expirations) whose IV level drifts from day to day."""
+    rng = np.random.default_rng(seed)
+    weeks = pd.date_range(START, periods=num_weeks, freq="W-MON")
+    prices = make_underlying_prices(TICKER, weeks[0] - pd.Timedelta(days=10), weeks[-1] + pd.Timedelta(days=7), seed=seed)
+    chains = [
+        make_options_frame(TICKER, prices, week, num_days=5, num_strikes=30, num_expirations=4,
+                           snapshot_minutes=60, seed=seed + i)
+        for i, week in enumerate(weeks)
+    ]
+    days = pd.bdate_range(weeks[0], weeks[-1] + pd.Timedelta(days=4))
+    level = pd.Series(np.exp(np.cumsum(rng.normal(0.0, 0.05, len(days)))), index=days.strftime("%Y-%m-%d"))
+    for chain in chains:
+        chain["impliedVolatility"] *= level.reindex(chain["lastTradeDate"].str.slice(0, 10)).to_numpy()
+    return prices, chains
+
+
+def _handler(work_dir, name, prices):
+    with contextlib.redirect_stdout(io.StringIO()):
+        handler = make_handler(work_dir, name, 50000)
+    handler.insert_underlying_prices(TICKER, prices)
+    handler.refresh_realized_volatility(TICKER)
+    return handler
+
+
+def _tables(handler):
+    return [
+        pd.read_sql_query(f"SELECT * FROM {table} ORDER BY {order}", handler.conn)
+        for table, order in (("iv_term_structure", "date, expiration_date"), ("iv_rank", "window, date"))
+    ]
+
+
+def check_term_structure(chains, prices, term):
+    snapshots = pd.concat(chains, ignore_index=True)
+    snapshots["day"] = snapshots["lastTradeDate"].str.slice(0, 10)
+    closes = prices["Close"]
+    checked = 0
+    for day, rows in snapshots.groupby("day"):
+        last = rows.sort_values("lastTradeDate", kind="mergesort").drop_duplicates(
+            ["option_type", "expiration_date", "strike"], keep="last"
+        )
+        spot = closes[closes.index <= day].iloc[-1]
+        stored = term[term["date"] == day].set_index("expiration_date")["atm_iv"]
+        for expiration_date, chain in last[last["expiration_date"] >= day].groupby("expiration_date"):
+            by_strike = chain[chain["impliedVolatility"] > 0].groupby("strike")["impliedVolatility"].mean()
+            expected = np.interp(spot, by_strike.index.to_numpy(), by_strike.to_numpy())
+            assert np.isclose(stored[expiration_date], expected, rtol=1e-12), (day, expiration_date)
+            checked += 1
+    return checked
+
+
+def check_ranks(term, ranks):
+    term = term.assign(date=pd.to_datetime(term["date"]))
+    atm_iv = compute_constant_maturity(term)
+    for window in WINDOWS:
+        stored = ranks[ranks["window"] == window].set_index("date")
+        for date, iv in atm_iv.items():
+            history = atm_iv[(atm_iv.index > date - pd.Timedelta(days=window)) & (atm_iv.index <= date)]
+            low, high = history.min(), history.max()
+            rank = (iv - low) / (high - low) if high != low else np.nan
+            percentile = (history < iv).sum() / (len(history) - 1) if len(history) >= 2 else np.nan
+            row = stored.loc[date.strftime("%Y-%m-%d")]
+            assert np.isclose(row["atm_iv"], iv, rtol=1e-12)
+            assert np.isclose(row["iv_rank"], rank, rtol=1e-12, equal_nan=True), (window, date)
+            assert np.isclose(row["iv_percentile"], percentile, rtol=1e-12, equal_nan=True), (window, date)
+    return len(atm_iv)
+
+
+def run(num_weeks=16):
+    prices, chains = make_history(num_weeks)
+    with tempfile.TemporaryDirectory() as work_dir:
+        full = _handler(work_dir, "full", prices)
+        for chain in chains:
+            full.insert_data(chain)
+        start = time.perf_counter()
+        full.refresh_iv_context(TICKER, WINDOWS)
+        full_time = time.perf_counter() - start
+        term, ranks = _tables(full)
+
+        incremental = _handler(work_dir, "incremental", prices)
+        refresh_times = []
+        for chain in chains:
+            incremental.insert_data(chain)
+            start = time.perf_counter()
+            incremental.refresh_iv_context(TICKER, WINDOWS)
+            refresh_times.append(time.perf_counter() - start)
+        for expected, actual in zip((term, ranks), _tables(incremental)):
+            pd.testing.assert_frame_equal(expected, actual, rtol=1e-12)
+
+        expirations = check_term_structure(chains, prices, term)
+        days = check_ranks(term, ranks)
+        rows = sum(len(chain) for chain in chains)
+        print(
+            f"{rows} option rows over {days} days: ATM IV matches np.interp for {expirations} "
+            f"day/expiration pairs; ranks match for lookbacks {WINDOWS}"
+        )
+        print("Weekly incremental refreshes give the same tables as one full refresh")
+        print(f"  full refresh:            {full_time * 1e3:>8.1f} ms")
+        print(f"  last weekly refresh:     {refresh_times[-1] * 1e3:>8.1f} ms")
+
+        db_path = full.db_name
+        full.close_connection()
+        incremental.close_connection()
+
+        store = UnderlyingPriceStore(db_path, offline=True)
+        reference_date = (pd.Timestamp(term["date"].iloc[-1]) + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+        context = store.get_iv_rank(TICKER, WINDOWS[-1], reference_date)
+        assert context["date"] == term["date"].iloc[-1]
+        start = time.perf_counter()
+        for _ in range(1000):
+            store.get_iv_rank(TICKER, WINDOWS[-1], reference_date)
+        lookup_time = (time.perf_counter() - start) / 1000
+        print(f"  stored IV rank lookup:   {lookup_time * 1e6:>8.1f} us")
+
+        selector = StraddleSelector(db_path, use_open=True, offline=True)
+        selection_date = term["date"].iloc[-5]
+        with contextlib.redirect_stdout(io.StringIO()):
+            selected = selector.select_contract(
+                TICKER, selection_date, 5, optimal_expiry_range=(0, 30), iv_rank_window=WINDOWS[-1]
+            )
+            stored = store.get_iv_rank(TICKER, WINDOWS[-1], selection_date)
+            skipped = selector.select_contract(
+                TICKER, selection_date, 5, optimal_expiry_range=(0, 30), iv_rank_window=WINDOWS[-1],
+                max_iv_rank=stored["iv_rank"] - 1e-9,
+            )
+        assert selected and all(contract["iv_rank"] == stored["iv_rank"] for contract in selected)
+        assert skipped == []
+        print(f"StraddleSelector carries the stored IV rank ({stored['iv_rank']:.2f}) and honours max_iv_rank")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 16)
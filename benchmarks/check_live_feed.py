@@ -0,0 +1,212 @@
+"""
+Checks and times the live bar pipeline (`src.live_feed`) by replaying a synthetic options
+database through `ReplayBroker`:
+
+- the combined bars `LiveBarPipeline.stream` yields for each selected straddle equal
+  `DataProvider.create_data` on the same stored rows;
+- `DataProvider` in live mode, polled while the replay runs, ends with the same bars as
+  the historical load, while each poll only aggregates the new snapshots;
+- a high-rate two-leg feed, many quotes per bar, gives the same bars as resampling it;
+- quote events per second through the pipeline, and the cost of a live poll compared
+  with resampling the whole payload again.
+
+Usage: python -m benchmarks.check_live_feed [num_days] [snapshot_minutes]
+"""
+from benchmarks.synthetic import build_options_db
+from src.data_provider import DataProvider
+from src.live_feed import LiveBarPipeline, ReplayBroker
+from src.storage import SQLiteBackend
+from src.straddle_selector import StraddleSelector
+from src.walk_forward import straddle_legs
+import asyncio
+import contextlib
+import io
+import numpy as np
+import os
+import pandas as pd
+import tempfile
+import time
+import sys
+
+
+TICKER = "SYN"
+REFERENCE_DATE = "2025-03-04"
+
+
+async def _collect(pipeline, broker, legs):
+    return [bar async for bar in pipeline.stream(broker.stream_quotes(legs))]
+
+
+def _same_bars(expected, actual):
+    # `inTheMoney` is the last leg's value at a timestamp; `create_data` orders the legs of
+    # one timestamp with an unstable sort, so only the numeric columns are compared exactly
+    columns = [column for column in expected.columns if column != "inTheMoney"]
+    pd.testing.assert_frame_equal(
+        expected[columns], actual[columns], check_dtype=False, check_freq=False, check_names=False
+    )
+
+
+def check_pipeline(backend, provider, straddles):
+    events = 0
+    elapsed = 0.0
+    for legs in straddles:
+        broker = ReplayBroker.from_backend(backend, legs)
+        pipeline = LiveBarPipeline(legs)
+        start = time.perf_counter()
+        bars = asyncio.run(_collect(pipeline, broker, legs))
+        elapsed += time.perf_counter() - start
+        events += sum(leg.quotes for leg in pipeline.legs.values())
+
+        assert len(bars) == len(pipeline.frame())
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = provider.create_data(legs)
+        _same_bars(expected, pipeline.frame())
+    return events, elapsed
+
+
+def check_live_provider(backend, provider, legs, polls=50):
+    """Polls a live `DataProvider` while the replay advances; returns per-poll costs."""
+    broker = ReplayBroker.from_backend(backend, legs)
+    live = DataProvider(live=True, backend=backend, api=broker)
+    leg = legs[0]
+    quotes = broker.stream_quotes([leg])
+    total = len(broker.get_option_price(**leg))
+    step = max(total // polls, 1)
+
+    async def replay():
+        fetch = incremental = rebuild = 0.0
+        n = 0
+        async for _ in quotes:
+            n += 1
+            if n % step:
+                continue
+            start = time.perf_counter()
+            payload = broker.get_option_price(**leg)
+            fetch += time.perf_counter() - start
+
+            start = time.perf_counter()
+            live.load_contract(**leg)
+            incremental += time.perf_counter() - start
+
+            # Live loading before: resample the whole payload on every poll
+            start = time.perf_counter()
+            provider._to_ohlcv(pd.DataFrame(payload), "1T")
+            rebuild += time.perf_counter() - start
+        polled = n // step
+        # The broker's payload is fetched by the live load too; report the processing only
+        return (incremental - fetch) / polled, rebuild / polled
+
+    incremental, rebuild = asyncio.run(replay())
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = provider.load_contract(**leg)
+    _same_bars(expected, live.load_contract(**leg))
+    return incremental, rebuild
+
+
+def _leg_rate(backend, legs, repeats=5):
+    # Raw bar building without the async replay, for the events/second upper bound
+    broker = ReplayBroker.from_backend(backend, legs)
+    quotes = list(broker._quotes())
+    best = float("inf")
+    for _ in range(repeats):
+        pipeline = LiveBarPipeline(legs)
+        start = time.perf_counter()
+        for quote in quotes:
+            pipeline.on_quote(quote)
+        pipeline.flush()
+        best = min(best, time.perf_counter() - start)
+    return len(quotes) / best
+
+
+def _tick_snapshots(num_quotes, quotes_per_second=20, seed=0):
+    """Two legs quoting alternately at a high rate, shaped like `ReplayBroker`'s input."""
+    rng = np.random.default_rng(seed)
+    leg = np.arange(num_quotes) % 2
+    close = 5.0 + np.cumsum(rng.normal(0.0, 0.01, num_quotes))
+    spread = rng.uniform(0.01, 0.05, num_quotes)
+    return pd.DataFrame(
+        {
+            "ticker": TICKER,
+            "option_type": np.where(leg == 0, "call", "put"),
+            "expiration_date": "2025-03-21",
+            "strike": 100.0,
+            "Date": pd.Timestamp("2025-03-04 09:30")
+            + pd.to_timedelta(np.arange(num_quotes) / quotes_per_second, unit="s"),
+            "Close": close,
+            "bid": close - spread,
+            "ask": close + spread,
+            "volume": rng.integers(0, 50, num_quotes),
+            "openInterest": rng.integers(100, 1000, num_quotes),
+            "impliedVolatility": rng.uniform(0.2, 0.4, num_quotes),
+            "percentChange": rng.normal(0.0, 1.0, num_quotes),
+            "change": rng.normal(0.0, 0.1, num_quotes),
+            "inTheMoney": leg,
+        }
+    )
+
+
+def check_tick_rate(provider, num_quotes=200000):
+    """Replays a high-rate two-leg feed; checks the bars and returns quotes per second."""
+    snapshots = _tick_snapshots(num_quotes)
+    legs = [
+        {"ticker": TICKER, "option_type": option_type, "expiration_date": "2025-03-21", "strike": 100.0}
+        for option_type in ("call", "put")
+    ]
+    broker = ReplayBroker(snapshots)
+    pipeline = LiveBarPipeline(legs)
+    start = time.perf_counter()
+    asyncio.run(_collect(pipeline, broker, legs))
+    elapsed = time.perf_counter() - start
+
+    columns = ["Date", "Close", "bid", "ask", "volume", "openInterest", "impliedVolatility",
+               "percentChange", "change", "inTheMoney"]
+    expected = provider._combine_legs(
+        [
+            provider._to_ohlcv(snapshots.loc[snapshots["option_type"] == leg["option_type"], columns].copy(), "1T")
+            for leg in legs
+        ],
+        None,
+    )
+    _same_bars(expected, pipeline.frame())
+    return num_quotes / elapsed, len(expected)
+
+
+def run(num_days=5, snapshot_minutes=1):
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = os.path.join(work_dir, "options.db")
+        info = build_options_db(
+            db_path, tickers=(TICKER,), num_days=num_days, num_strikes=20,
+            num_expirations=2, snapshot_minutes=snapshot_minutes,
+        )
+        selector = StraddleSelector(db_path, use_open=True, offline=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            straddles = [
+                straddle_legs(TICKER, contract)
+                for contract in selector.select_contract(TICKER, reference_date=REFERENCE_DATE, max_results=5)
+            ]
+        assert straddles, "No straddles selected"
+
+        backend = SQLiteBackend(db_path)
+        provider = DataProvider(db_path, backend=backend)
+        events, elapsed = check_pipeline(backend, provider, straddles)
+        print(
+            f"Streamed bars match create_data for {len(straddles)} straddles "
+            f"({info['rows']} options rows, {events} quotes replayed)"
+        )
+        print(f"Async replay: {events / elapsed:,.0f} quotes/s")
+        print(f"Pipeline alone: {_leg_rate(backend, straddles[0]):,.0f} quotes/s")
+        rate, num_bars = check_tick_rate(provider)
+        print(f"High-rate feed (20 quotes/s into {num_bars} one-minute bars): {rate:,.0f} quotes/s, bars match")
+
+        incremental, rebuild = check_live_provider(backend, provider, straddles[0])
+        print(
+            f"Live DataProvider matches the historical load; per poll: incremental "
+            f"{incremental * 1e3:.2f} ms, full resample {rebuild * 1e3:.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 5,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 1,
+    )
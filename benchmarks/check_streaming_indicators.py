@@ -0,0 +1,135 @@
+"""
+Checks the incremental indicators (`src.streaming_indicators`) against TA-Lib and the
+strategy on synthetic straddle bars, and compares the cost of a live bar update with
+rebuilding the strategy's indicators over the whole session:
+
+- RSI, ATR and Bollinger bands match `talib.RSI`, `talib.ATR` and `talib.BBANDS`;
+- IV rank and volume mean match trailing-window pandas equivalents;
+- `StraddleSignals.should_buy`, `should_exit` and `position_size` match the strategy's
+  own methods evaluated on the frame built up to each sampled bar.
+
+Usage: python -m benchmarks.check_streaming_indicators [num_bars] [num_samples]
+"""
+from benchmarks.synthetic import make_straddle_bars
+from src.streaming_indicators import ATR, RSI, BollingerBands, RollingMean, RollingRank, StraddleSignals
+from src.vectorized_backtest import VectorizedStraddleSimulator
+import contextlib
+import io
+import numpy as np
+import pandas as pd
+import talib
+import time
+import sys
+
+
+def _stream(indicator, *columns):
+    out = []
+    for values in zip(*columns):
+        out.append(indicator.update(*values))
+    return np.asarray(out, dtype=float)
+
+
+def check_indicators(df):
+    high, low, close = (df[name].to_numpy(dtype=float) for name in ("High", "Low", "Close"))
+    volume = df["volume"].to_numpy(dtype=float)
+    iv = df["impliedVolatility"].to_numpy(dtype=float)
+    tolerance = {"rtol": 1e-9, "atol": 1e-9, "equal_nan": True}
+
+    np.testing.assert_allclose(_stream(RSI(14), close), talib.RSI(close, timeperiod=14), **tolerance)
+    np.testing.assert_allclose(
+        _stream(ATR(14), high, low, close), talib.ATR(high, low, close, timeperiod=14), **tolerance
+    )
+    bands = np.asarray(_stream(BollingerBands(20), close).tolist()).T
+    for actual, expected in zip(bands, talib.BBANDS(close, timeperiod=20)):
+        np.testing.assert_allclose(actual, expected, **tolerance)
+
+    rolling_iv = pd.Series(iv).rolling(20, min_periods=1)
+    low_iv, high_iv = rolling_iv.min().to_numpy(), rolling_iv.max().to_numpy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        expected_rank = np.where(high_iv != low_iv, (iv - low_iv) / (high_iv - low_iv), np.nan)
+    np.testing.assert_allclose(_stream(RollingRank(20), iv), expected_rank, **tolerance)
+    np.testing.assert_allclose(
+        _stream(RollingMean(20), volume),
+        pd.Series(volume).rolling(20, min_periods=1).mean().to_numpy(),
+        **tolerance,
+    )
+
+
+def check_signals(df, num_samples):
+    signals = StraddleSignals()
+    rows = list(zip(df.index, df["High"], df["Low"], df["Close"], df["volume"], df["impliedVolatility"]))
+    samples = set(np.linspace(signals.start, len(df) - 1, num_samples).astype(int).tolist())
+    entry_bar = signals.start
+    checked = 0
+    for i, row in enumerate(rows):
+        signals.update(*row)
+        if i not in samples:
+            continue
+        assert signals.ready
+
+        # What the strategy sees when the frame is rebuilt up to this bar
+        with contextlib.redirect_stdout(io.StringIO()):
+            strategy = VectorizedStraddleSimulator(df.iloc[: i + 1]).strategy
+        strategy.entry_price = df["Close"].iloc[entry_bar]
+        strategy.entry_time = df.index[entry_bar]
+        assert signals.should_buy() == strategy.should_buy(), i
+        assert signals.should_exit(strategy.entry_price, strategy.entry_time) == strategy.should_exit(), i
+        assert signals.hold_period == strategy.hold_period, i
+
+        # Position sizing as in `SimpleStraddleStrategy.next`
+        window = np.asarray(strategy.atr[-20:], dtype=float)
+        with np.errstate(invalid="ignore"):
+            avg_atr = np.nanmean(window)
+        current_atr = strategy.atr[-1] if not np.isnan(strategy.atr[-1]) else avg_atr
+        size = (
+            strategy.base_size
+            if np.isnan(current_atr) or np.isnan(avg_atr) or avg_atr == 0
+            else int(strategy.base_size / (current_atr / avg_atr))
+        )
+        assert signals.position_size() == max(1, size), i
+        checked += 1
+    return checked
+
+
+def _update_cost(df, start, count):
+    signals = StraddleSignals()
+    rows = list(zip(df.index, df["High"], df["Low"], df["Close"], df["volume"], df["impliedVolatility"]))
+    for row in rows[:start]:
+        signals.update(*row)
+    begin = time.perf_counter()
+    for row in rows[start : start + count]:
+        signals.update(*row)
+        signals.should_buy()
+    return (time.perf_counter() - begin) / count
+
+
+def _rebuild_cost(df, length, repeats=20):
+    # Live mode without incremental state: rebuild the strategy over the whole session
+    prefix = df.iloc[:length]
+    begin = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeats):
+            VectorizedStraddleSimulator(prefix).strategy.should_buy()
+    return (time.perf_counter() - begin) / repeats
+
+
+def run(num_bars=20000, num_samples=150):
+    df = make_straddle_bars(num_bars)
+    check_indicators(df)
+    checked = check_signals(df.iloc[:3000], num_samples)
+    print(f"Indicators match TA-Lib over {num_bars} bars; signals match the strategy at {checked} bars")
+
+    long_df = make_straddle_bars(200000, seed=1)
+    print("Per-bar cost of a live update (indicators + should_buy):")
+    for length in (1000, 10000, 100000):
+        print(
+            f"  session of {length:>6} bars: incremental {_update_cost(long_df, length, 1000) * 1e6:>8.1f} us, "
+            f"rebuild {_rebuild_cost(long_df, length) * 1e6:>10.1f} us"
+        )
+
+
+if __name__ == "__main__":
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 150,
+    )
@@ -0,0 +1,184 @@
+"""
+Benchmark suite on synthetic options databases (`benchmarks.synthetic.build_options_db`)
+at several data scales. For each scale it times, and measures the peak Python heap
+(tracemalloc) of:
+
+- `DBHandler.insert_data` of one ticker's chain history into an empty database;
+- `StraddleSelector.select_contract` and the base `ContractSelector.select_contract`;
+- `DataProvider.create_data` for the selected straddles;
+- `BacktestEngine.run_backtest` on those straddles, with backtesting.py and vectorized.
+
+Timings are the best of `--repeats` runs; memory is measured in a separate run because
+tracemalloc slows everything down. SQLite's own page cache is not part of the heap figures.
+
+Usage: python -m benchmarks.suite [--scales small medium large] [--repeats N] [--output CSV]
+"""
+from benchmarks.synthetic import build_options_db, make_handler, make_options_frame, make_underlying_prices
+from src.backtest_engine import BacktestEngine
+from src.contract_select import ContractSelector
+from src.data_provider import DataProvider
+from src.straddle_selector import StraddleSelector
+from src.strategy import SimpleStraddleStrategy
+from src.walk_forward import straddle_legs
+import argparse
+import contextlib
+import io
+import os
+import pandas as pd
+import tempfile
+import time
+import tracemalloc
+
+
+# Options rows per scale: tickers x strikes x expirations x 2 x snapshots per day x days
+SCALES = {
+    "small": dict(tickers=("AAA",), num_days=5, num_strikes=40, num_expirations=4, snapshot_minutes=30),
+    "medium": dict(tickers=("AAA", "BBB"), num_days=10, num_strikes=80, num_expirations=6, snapshot_minutes=15),
+    "large": dict(tickers=("AAA", "BBB", "CCC"), num_days=20, num_strikes=100, num_expirations=8, snapshot_minutes=15),
+}
+
+START = "2025-03-03"
+
+# Selection and backtests start on the second chain day, so the first one is history
+REFERENCE_DATE = "2025-03-04"
+
+MAX_STRADDLES = 10
+
+
+def _measure(func, repeats):
+    """Best wall time of `repeats` calls, then the peak traced heap of one more call."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            func()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def _insert_benchmark(work_dir, scale):
+    ticker = scale["tickers"][0]
+    prices = make_underlying_prices(ticker, START, pd.Timestamp(START) + pd.Timedelta(days=60))
+    chain = make_options_frame(
+        ticker,
+        prices,
+        START,
+        scale["num_days"],
+        scale["num_strikes"],
+        scale["num_expirations"],
+        scale["snapshot_minutes"],
+    )
+    runs = []
+
+    def insert():
+        # Every call writes into a fresh database so none of them is an update
+        with contextlib.redirect_stdout(io.StringIO()):
+            handler = make_handler(work_dir, f"insert_{len(runs)}", 50000)
+        runs.append(handler)
+        handler.insert_data(chain)
+        handler.close_connection()
+
+    return len(chain), insert
+
+
+def run_scale(name, repeats=3):
+    scale = SCALES[name]
+    rows = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        num_rows, insert = _insert_benchmark(work_dir, scale)
+        rows.append(("DBHandler.insert_data", num_rows, *_measure(insert, repeats)))
+
+        db_path = os.path.join(work_dir, "options.db")
+        info = build_options_db(db_path, start=START, **scale)
+        selector = StraddleSelector(db_path, use_open=True, offline=True)
+        tickers = scale["tickers"]
+
+        def select(select_contract):
+            return lambda: [
+                select_contract(selector, ticker, reference_date=REFERENCE_DATE, max_results=MAX_STRADDLES)
+                for ticker in tickers
+            ]
+
+        rows.append(("StraddleSelector.select_contract", len(tickers),
+                     *_measure(select(StraddleSelector.select_contract), repeats)))
+        rows.append(("ContractSelector.select_contract", len(tickers),
+                     *_measure(select(ContractSelector.select_contract), repeats)))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            straddles = [
+                straddle_legs(ticker, contract)
+                for ticker in tickers
+                for contract in selector.select_contract(
+                    ticker, reference_date=REFERENCE_DATE, max_results=MAX_STRADDLES
+                )
+            ]
+        assert straddles, f"No straddles selected at scale {name}"
+
+        provider = DataProvider(db_path)
+        rows.append(("DataProvider.create_data", len(straddles), *_measure(
+            lambda: [provider.create_data(legs, REFERENCE_DATE) for legs in straddles], repeats
+        )))
+
+        engine = BacktestEngine(db_path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            frames = [provider.create_data(legs, REFERENCE_DATE) for legs in straddles]
+        for label, vectorized in (("BacktestEngine.run_backtest", False),
+                                  ("BacktestEngine.run_backtest (vectorized)", True)):
+            rows.append((label, len(straddles), *_measure(
+                lambda: [
+                    engine.run_backtest(
+                        SimpleStraddleStrategy, legs, REFERENCE_DATE, bt_data=df, vectorized=vectorized
+                    )
+                    for legs, df in zip(straddles, frames)
+                ],
+                repeats,
+            )))
+
+    return pd.DataFrame(
+        [
+            {
+                "scale": name,
+                "options_rows": info["rows"],
+                "benchmark": benchmark,
+                "calls": calls,
+                "total_s": elapsed,
+                "ms_per_call": elapsed / calls * 1000,
+                "peak_mib": peak / 1024 / 1024,
+            }
+            for benchmark, calls, elapsed, peak in rows
+        ]
+    )
+
+
+def run(scales=("small", "medium"), repeats=3, output=None):
+    results = []
+    for name in scales:
+        table = run_scale(name, repeats)
+        results.append(table)
+        print(f"{name}: {table['options_rows'].iloc[0]} options rows")
+        print(
+            table[["benchmark", "calls", "total_s", "ms_per_call", "peak_mib"]].to_string(
+                index=False, float_format=lambda value: f"{value:.2f}"
+            )
+        )
+    results = pd.concat(results, ignore_index=True)
+    if output:
+        results.to_csv(output, index=False)
+        print(f"Results saved to {output}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--scales", nargs="+", choices=list(SCALES), default=["small", "medium"])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", help="Optional CSV for the results table")
+    args = parser.parse_args()
+    run(args.scales, args.repeats, args.output)
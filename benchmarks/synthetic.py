@@ -0,0 +1,347 @@
+"""
+Synthetic option data shared by the benchmark scripts.
+
+`build_options_db` writes a full options database (chain history, underlying prices and
+realized volatility) with a configurable number of tickers, strikes, expirations and
+snapshot frequency.
+
+Usage: python -m benchmarks.synthetic PATH [--tickers T ...] [--days N] [--strikes N]
+                                           [--expirations N] [--snapshot-minutes N]
+"""
+from src.historical.db_handler import DBHandler
+from datetime import datetime, timedelta
+import argparse
+import contextlib
+import io
+import numpy as np
+import pandas as pd
+import yaml
+import os
+
+
+def make_synthetic_chain(num_rows, ticker="SYN", seed=0):
+    """
+    Builds a yfinance-shaped option chain frame with the metadata columns the fetcher adds.
+    """
+    rng = np.random.default_rng(seed)
+    expirations = [
+        (datetime(2025, 3, 7) + timedelta(days=7 * i)).strftime("%Y-%m-%d")
+        for i in range(8)
+    ]
+    strikes = np.arange(50.0, 250.0, 1.0)
+    retrieval_date = datetime(2025, 3, 5, 10, 0)
+
+    idx = np.arange(num_rows)
+    strike = strikes[idx % len(strikes)]
+    option_type = np.where((idx // len(strikes)) % 2 == 0, "call", "put")
+    expiration = np.array(expirations)[(idx // (2 * len(strikes))) % len(expirations)]
+    snapshot = idx // (2 * len(strikes) * len(expirations))
+    last_trade = [
+        (retrieval_date + timedelta(minutes=int(s))).strftime("%Y-%m-%d %H:%M:%S")
+        for s in snapshot
+    ]
+
+    df = pd.DataFrame(
+        {
+            "contractSymbol": [
+                f"{ticker}{e.replace('-', '')[2:]}{t[0].upper()}{int(k * 1000):08d}"
+                for e, t, k in zip(expiration, option_type, strike)
+            ],
+            "lastTradeDate": last_trade,
+            "strike": strike,
+            "lastPrice": rng.uniform(0.5, 20.0, num_rows),
+            "bid": rng.uniform(0.4, 19.0, num_rows),
+            "ask": rng.uniform(0.6, 21.0, num_rows),
+            "change": rng.normal(0.0, 1.0, num_rows),
+            "percentChange": rng.normal(0.0, 5.0, num_rows),
+            "volume": rng.integers(0, 5000, num_rows),
+            "openInterest": rng.integers(0, 20000, num_rows),
+            "impliedVolatility": rng.uniform(0.1, 1.5, num_rows),
+            "inTheMoney": rng.integers(0, 2, num_rows).astype(bool),
+            "contractSize": "REGULAR",
+            "currency": "USD",
+            "option_type": option_type,
+            "expiration_date": expiration,
+            "retrieval_date": retrieval_date,
+            "ticker": ticker,
+        }
+    )
+    return df
+
+
+def make_handler(work_dir, name, batch_size):
+    config_path = os.path.join(work_dir, f"{name}.yaml")
+    with open(config_path, "w") as file:
+        yaml.safe_dump(
+            {
+                "database": os.path.join(work_dir, f"{name}.db"),
+                "output_folder": work_dir,
+                "insert_batch_size": batch_size,
+            },
+            file,
+        )
+    return DBHandler(config_path=config_path)
+
+
+def build_synthetic_db(work_dir, name="synthetic", num_snapshots=100, ticker="SYN"):
+    """
+    Creates a migrated options database holding `num_snapshots` one-minute snapshots
+    of a 200-strike x 8-expiration synthetic chain.
+
+    :return: Path to the database file.
+    """
+    handler = make_handler(work_dir, name, 50000)
+    handler.insert_data(make_synthetic_chain(num_snapshots * 3200, ticker=ticker))
+    handler.close_connection()
+    return os.path.join(work_dir, f"{name}.db")
+
+
+def make_straddle_bars(num_bars, seed=0, start="2025-03-05 09:30"):
+    """
+    Builds a combined straddle frame shaped like `DataProvider.create_data` output:
+    continuous one-minute bars with a random-walk premium and bursty volume.
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(start, periods=num_bars, freq="1min")
+
+    close = 10.0 * np.exp(np.cumsum(rng.normal(0.0, 0.004, num_bars)))
+    open_ = close * np.exp(rng.normal(0.0, 0.002, num_bars))
+    spread = np.abs(rng.normal(0.0, 0.01, num_bars)) * close
+    volume = np.floor(rng.lognormal(3.0, 1.0, num_bars))
+    # Falling IV into the end keeps the strategy's IV-rank gate open
+    iv = 0.4 + 0.1 * np.sin(np.arange(num_bars) / 500.0) - np.linspace(0.0, 0.05, num_bars)
+
+    return pd.DataFrame(
+        {
+            "Open": open_,
+            "High": np.maximum(open_, close) + spread,
+            "Low": np.minimum(open_, close) - spread,
+            "Close": close,
+            "volume": volume,
+            "openInterest": rng.integers(100, 1000, num_bars).astype(float),
+            "impliedVolatility": iv,
+            "percentChange": rng.normal(0.0, 1.0, num_bars),
+            "change": rng.normal(0.0, 0.1, num_bars),
+            "inTheMoney": 1.0,
+        },
+        index=index,
+    )
+
+
+def _strike_step(spot):
+    for step in (0.5, 1.0, 2.5, 5.0):
+        if spot / step <= 200:
+            return step
+    return 10.0
+
+
+def make_underlying_prices(ticker, start, end, spot=100.0, annual_vol=0.3, seed=0):
+    """
+    Daily geometric-random-walk bars (`yf.Ticker.history` layout) for every business day
+    from `start` to `end` inclusive.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, end)
+    daily_vol = annual_vol / np.sqrt(252)
+    close = spot * np.exp(np.cumsum(rng.normal(0.0, daily_vol, len(dates))))
+    open_ = np.concatenate([[spot], close[:-1]]) * np.exp(rng.normal(0.0, daily_vol / 4, len(dates)))
+    wick = np.abs(rng.normal(0.0, daily_vol / 2, len(dates)))
+    return pd.DataFrame(
+        {
+            "Open": open_,
+            "High": np.maximum(open_, close) * (1 + wick),
+            "Low": np.minimum(open_, close) * (1 - wick),
+            "Close": close,
+            "Volume": rng.integers(1_000_000, 50_000_000, len(dates)),
+        },
+        index=dates,
+    )
+
+
+def make_options_frame(
+    ticker,
+    prices,
+    start,
+    num_days=5,
+    num_strikes=40,
+    num_expirations=4,
+    snapshot_minutes=30,
+    seed=0,
+):
+    """
+    Builds a yfinance-shaped option chain history for one ticker: every strike and
+    expiration observed every `snapshot_minutes` during regular hours (09:30-16:00) of
+    `num_days` business days from `start`.
+
+    Strikes are centred on the first day's open of `prices` (see `make_underlying_prices`),
+    expirations are the weekly Fridays after `start`, and premiums follow intrinsic value
+    plus a time value that scales with implied volatility and the square root of time.
+
+    :return: DataFrame with the `DBHandler.insert_data` columns.
+    """
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range(start, periods=num_days)
+    times = pd.timedelta_range("09:30:00", "16:00:00", freq=f"{snapshot_minutes}min")
+    snapshots = (days.values[:, None] + times.values[None, :]).ravel()
+
+    # Intraday spot moves from each day's open to its close
+    daily = prices.reindex(days).ffill()
+    session = max(times[-1] - times[0], pd.Timedelta(minutes=1))
+    fraction = np.tile(((times - times[0]) / session).to_numpy(), num_days)
+    day_open = np.repeat(daily["Open"].to_numpy(), len(times))
+    day_close = np.repeat(daily["Close"].to_numpy(), len(times))
+    spot = day_open + (day_close - day_open) * fraction
+
+    first_spot = daily["Open"].iloc[0]
+    step = _strike_step(first_spot)
+    centre = round(first_spot / step) * step
+    strikes = centre + step * (np.arange(num_strikes) - num_strikes // 2)
+    first_friday = days[0] + pd.offsets.Week(weekday=4)
+    expirations = pd.date_range(first_friday, periods=num_expirations, freq="W-FRI")
+
+    # One row per (snapshot, expiration, option type, strike)
+    shape = (len(snapshots), num_expirations, 2, num_strikes)
+    s_idx, e_idx, t_idx, k_idx = (a.ravel() for a in np.indices(shape))
+    num_rows = len(s_idx)
+    snapshot_times = pd.DatetimeIndex(snapshots[s_idx])
+    expiration = expirations[e_idx]
+    is_call = t_idx == 0
+    strike = strikes[k_idx]
+    underlying = spot[s_idx]
+
+    years = np.maximum((expiration.normalize() + pd.Timedelta(hours=16) - snapshot_times)
+                       / pd.Timedelta(days=365), 1e-4)
+    moneyness = np.log(strike / underlying)
+    iv = 0.25 + 0.4 * moneyness ** 2 + 0.02 * rng.standard_normal(num_rows)
+    iv = np.clip(iv, 0.05, 3.0)
+    intrinsic = np.where(is_call, np.maximum(underlying - strike, 0.0), np.maximum(strike - underlying, 0.0))
+    time_value = 0.4 * underlying * iv * np.sqrt(years) * np.exp(-0.5 * (moneyness / (iv * np.sqrt(years))) ** 2)
+    last_price = np.round(np.maximum(intrinsic + time_value, 0.01), 2)
+    half_spread = np.round(np.maximum(0.01, 0.02 * last_price), 2)
+
+    # Liquidity concentrates near the money and comes in bursts
+    liquidity = np.exp(-8.0 * np.abs(moneyness))
+    volume = np.floor(rng.lognormal(2.0, 1.2, num_rows) * liquidity * (1 + 4 * (rng.random(num_rows) < 0.05)))
+    open_interest = np.floor(rng.lognormal(6.0, 1.0, num_rows) * liquidity)
+    change = np.round(rng.normal(0.0, 0.05, num_rows) * last_price, 2)
+
+    expiration_text = expiration.strftime("%Y-%m-%d")
+    symbol_dates = expiration.strftime("%y%m%d")
+    type_text = np.where(is_call, "call", "put")
+    return pd.DataFrame(
+        {
+            "contractSymbol": [
+                f"{ticker}{d}{'C' if c else 'P'}{int(round(k * 1000)):08d}"
+                for d, c, k in zip(symbol_dates, is_call, strike)
+            ],
+            "lastTradeDate": snapshot_times.strftime("%Y-%m-%d %H:%M:%S"),
+            "strike": strike,
+            "lastPrice": last_price,
+            "bid": np.round(last_price - half_spread, 2),
+            "ask": np.round(last_price + half_spread, 2),
+            "change": change,
+            "percentChange": np.round(100 * change / last_price, 2),
+            "volume": volume.astype(np.int64),
+            "openInterest": open_interest.astype(np.int64),
+            "impliedVolatility": iv,
+            "inTheMoney": intrinsic > 0,
+            "contractSize": "REGULAR",
+            "currency": "USD",
+            "option_type": type_text,
+            "expiration_date": expiration_text,
+            "retrieval_date": snapshot_times,
+            "ticker": ticker,
+        }
+    )
+
+
+def build_options_db(
+    path,
+    tickers=("SYN",),
+    start="2025-03-03",
+    num_days=5,
+    num_strikes=40,
+    num_expirations=4,
+    snapshot_minutes=30,
+    history_days=120,
+    seed=0,
+    batch_size=50000,
+):
+    """
+    Writes a migrated options database through `DBHandler`: the option chain history of
+    every ticker (see `make_options_frame`), daily `underlying_prices` covering
+    `history_days` calendar days before `start` through the last chain day, and the
+    `realized_volatility` rows derived from them.
+
+    :param path: Database file to create (its directory also receives the handler config).
+    :return: Dict with the `options` row count and the chain `(first, last)` days.
+    """
+    work_dir = os.path.dirname(os.path.abspath(path))
+    name = os.path.splitext(os.path.basename(path))[0]
+    days = pd.bdate_range(start, periods=num_days)
+    history_start = pd.Timestamp(start) - pd.Timedelta(days=history_days)
+
+    num_rows = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        handler = make_handler(work_dir, name, batch_size)
+        for i, ticker in enumerate(tickers):
+            prices = make_underlying_prices(
+                ticker, history_start, days[-1], spot=50.0 + 75.0 * i, seed=seed + i
+            )
+            handler.insert_underlying_prices(ticker, prices)
+            handler.refresh_realized_volatility(ticker)
+            chain = make_options_frame(
+                ticker,
+                prices,
+                start,
+                num_days,
+                num_strikes,
+                num_expirations,
+                snapshot_minutes,
+                seed=seed + i,
+            )
+            handler.insert_data(chain)
+            num_rows += len(chain)
+        handler.analyze()
+    handler.close_connection()
+    return {
+        "rows": num_rows,
+        "first_day": days[0].strftime("%Y-%m-%d"),
+        "last_day": days[-1].strftime("%Y-%m-%d"),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Build a synthetic options database with the production schema."
+    )
+    parser.add_argument("path", help="Database file to create")
+    parser.add_argument("--tickers", nargs="+", default=["SYN"])
+    parser.add_argument("--start", default="2025-03-03", help="First chain day")
+    parser.add_argument("--days", type=int, default=5, help="Business days of chain history")
+    parser.add_argument("--strikes", type=int, default=40, help="Strikes per expiration")
+    parser.add_argument("--expirations", type=int, default=4, help="Weekly expirations")
+    parser.add_argument("--snapshot-minutes", type=int, default=30, help="Minutes between snapshots")
+    parser.add_argument("--history-days", type=int, default=120, help="Underlying history before --start")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    info = build_options_db(
+        args.path,
+        tickers=args.tickers,
+        start=args.start,
+        num_days=args.days,
+        num_strikes=args.strikes,
+        num_expirations=args.expirations,
+        snapshot_minutes=args.snapshot_minutes,
+        history_days=args.history_days,
+        seed=args.seed,
+    )
+    print(
+        f"Wrote {info['rows']} option rows for {', '.join(args.tickers)} "
+        f"({info['first_day']} to {info['last_day']}) to {args.path}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+from src.historical.db_handler import DBHandler, COMPACTION_CHUNK_QUERY, EXPORT_CHUNK_QUERY, IV_SNAPSHOT_QUERY
+from src.storage import (
+    HISTORICAL_CONTRACT_QUERY,
+    BULK_CONTRACTS_QUERY,
+    FIRST_CONTRACT_DATE_QUERY,
+    AS_OF_CHAIN_QUERY,
+    TICKER_HISTORY_QUERY,
+    DAILY_CONTRACTS_QUERY,
+    DAILY_HISTORY_QUERY,
+)
+from src.price_store import (
+    UNDERLYING_HISTORY_QUERY,
+    REALIZED_VOL_QUERY,
+    IV_RANK_QUERY,
+    IV_TERM_STRUCTURE_QUERY,
+)
+import sys
+
+# Every query the backtest/selection path runs against the options database
+QUERIES = {
+    "SQLiteBackend.load_contract": HISTORICAL_CONTRACT_QUERY,
+    "SQLiteBackend.load_contracts": BULK_CONTRACTS_QUERY.format(values="(?, ?, ?), (?, ?, ?)"),
+    "SQLiteBackend.first_contract_date": FIRST_CONTRACT_DATE_QUERY,
+    "SQLiteBackend.chain_as_of": AS_OF_CHAIN_QUERY,
+    "SQLiteBackend.load_history": TICKER_HISTORY_QUERY,
+    "SQLiteBackend.load_daily": DAILY_CONTRACTS_QUERY.format(values="(?, ?, ?), (?, ?, ?)"),
+    "SQLiteBackend.load_daily_history": DAILY_HISTORY_QUERY,
+    "UnderlyingPriceStore._query_ticker_history": UNDERLYING_HISTORY_QUERY,
+    "UnderlyingPriceStore.get_realized_volatility": REALIZED_VOL_QUERY,
+    "UnderlyingPriceStore.get_iv_rank": IV_RANK_QUERY,
+    "UnderlyingPriceStore.get_term_structure": IV_TERM_STRUCTURE_QUERY,
+    "DBHandler.export_to_parquet": EXPORT_CHUNK_QUERY,
+    "DBHandler.refresh_iv_context": IV_SNAPSHOT_QUERY,
+    "DBHandler.compact": COMPACTION_CHUNK_QUERY,
+}
+
+if __name__ == "__main__":
+    config_path = sys.argv[1] if len(sys.argv) > 1 else "configs/fetch_config.yaml"
+    db_handler = DBHandler(config_path=config_path)
+    report = db_handler.check_query_plans(QUERIES)
+    db_handler.close_connection()
+
+    failed = False
+    for name, entry in report.items():
+        status = "OK  " if entry["uses_index"] else "SCAN"
+        print(f"[{status}] {name}")
+        for step in entry["plan"]:
+            print(f"        {step}")
+        failed = failed or not entry["uses_index"]
+
+    sys.exit(1 if failed else 0)
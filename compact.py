@@ -0,0 +1,12 @@
+from src.historical.db_handler import DBHandler
+import datetime
+import sys
+
+# Retention job: rolls old intraday snapshots into options_daily, drops long-expired
+# contracts and vacuums (see DBHandler.compact). Run daily, outside the fetch schedule.
+if __name__ == "__main__":
+    config_path = sys.argv[1] if len(sys.argv) > 1 else "/home/chris/options_1/configs/fetch_config.yaml"
+    print(f"Starting compaction at time: {datetime.datetime.now()}")
+    db_handler = DBHandler(config_path=config_path)
+    db_handler.compact()
+    db_handler.close_connection()
@@ -0,0 +1,9 @@
+from src.storage import convert_sqlite_to_parquet
+import sys
+
+# Builds the dataset read by ParquetBackend (data.storage: parquet) from the options database
+if __name__ == "__main__":
+    db_name = sys.argv[1] if len(sys.argv) > 1 else "data/options_data.db"
+    root = sys.argv[2] if len(sys.argv) > 2 else "data/options_parquet"
+    written = convert_sqlite_to_parquet(db_name, root)
+    print(f"Wrote {written} rows to {root}")
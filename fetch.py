@@ -7,5 +7,9 @@ if __name__ == "__main__":
     print(f"Starting fetch at time: {datetime.datetime.now()}")
     data_handler = HistoricalDataHandler(config_path=config_path)
     data_handler.fetch_and_store_options_data()
-    data_handler.export_to_csv()
+    data_handler.fetch_and_store_underlying_prices()
+    if data_handler.config.get('export_format', 'parquet') == 'parquet':
+        data_handler.export_to_parquet()
+    else:
+        data_handler.export_to_csv()
     data_handler.close_connection()
@@ -1,9 +1,22 @@
+import argparse
+import atexit
 import yaml
-import pandas as pd
 from src.backtest_engine import BacktestEngine
 from src.straddle_selector import StraddleSelector
 from src.strategy import SimpleStraddleStrategy
+from src.connection_pool import ConnectionPool
+from src.profiling import enable_profiling
+from src.result_cache import ResultCache
+from src.results_sink import STATUS_ERROR, STATUS_NO_TRADES, job_key, make_results_sink
+from src.storage import make_backend
+from src.walk_forward import (
+    run_walk_forward,
+    straddle_legs,
+    summarize_walk_forward,
+    walk_forward_dates,
+)
 import os
+import sys
 
 # Load config.yaml
 with open("configs/backtest_config.yaml", "r") as file:
@@ -16,82 +29,203 @@ summary_csv = results_csv.replace(".csv", "_summary.csv")  # Save summary separa
 reference_date = config["backtest"]["reference_date"]
 max_contracts_per_ticker = config["backtest"]["max_contracts_per_ticker"]
 tickers = config["backtest"]["tickers"]
+offline = config["data"].get("offline", False)
+storage = config["data"].get("storage", "sqlite")
+parquet_path = config["data"].get("parquet_path", "data/options_parquet")
+sqlite_config = config["data"].get("sqlite") or {}
+workers = config["backtest"].get("workers", 1)
+vectorized = config["backtest"].get("vectorized", False)
+sweep_config = config.get("sweep") or {}
+walk_forward_config = config.get("walk_forward") or {}
+results_config = config.get("results") or {}
+results_sink = results_config.get("sink", "sqlite")
+cache_config = config.get("cache") or {}
+selection_config = config.get("selection") or {}
 
 # Initialize backtesting engine
-engine = BacktestEngine(db_path)
-selector = StraddleSelector(db_path, use_open=True)
+pool = ConnectionPool(db_path, **sqlite_config)
+backend = make_backend(storage, db_path, parquet_path, pool=pool)
+result_cache = (
+    ResultCache(
+        cache_config.get("path", "data/result_cache"),
+        max_bytes=cache_config.get("max_size_mb", 512) * 1024 * 1024,
+    )
+    if cache_config.get("enabled", False)
+    else None
+)
+engine = BacktestEngine(db_path, backend=backend, result_cache=result_cache)
+selector = StraddleSelector(db_path, use_open=True, offline=offline, backend=backend, pool=pool)
 
-all_results = []
-all_summaries = []
 
-for ticker in tickers:
-    selected_contracts = selector.select_contract(
-        ticker, reference_date=reference_date, max_results=max_contracts_per_ticker
+def print_cache_stats():
+    if result_cache is None:
+        return
+    stats = result_cache.stats()
+    print(
+        f"Result cache: {stats['hits']} hits, {stats['misses']} misses "
+        f"({stats['hit_rate']:.0%} hit rate), {stats['evictions']} evicted, "
+        f"{stats['entries']} entries ({stats['size_bytes'] / 1024 / 1024:.1f} MB)"
     )
 
-    if not selected_contracts:
-        print(f"No suitable contracts found for {ticker}")
-        continue
-
-    for contract in selected_contracts:
-        contracts = [
-            {
-                "ticker": ticker,
-                "option_type": "call",
-                "expiration_date": contract["expiration_date"],
-                "strike": contract["strike"],
-            },
-            {
-                "ticker": ticker,
-                "option_type": "put",
-                "expiration_date": contract["expiration_date"],
-                "strike": contract["strike"],
-            },
-        ]
 
+def write_profile(profiler, path):
+    print(profiler.format_stages())
+    profiler.write_report(path)
+    print(f"Profile report saved to {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Select straddles and backtest them.")
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=results_csv.replace(".csv", "_profile.json"),
+        metavar="REPORT_JSON",
+        help="Time every pipeline stage and write a JSON report "
+        "(default: next to results_csv with a _profile.json suffix)",
+    )
+    args = parser.parse_args()
+    if args.profile:
+        profiler = enable_profiling()
+        profiler.attach(pool)
+        # Every exit path (walk-forward, sweep, normal run) ends with the report
+        atexit.register(write_profile, profiler, args.profile)
+
+    if walk_forward_config.get("enabled", False):
+        reference_dates = walk_forward_dates(
+            walk_forward_config["start_date"],
+            walk_forward_config["end_date"],
+            walk_forward_config.get("step", "1B"),
+        )
         print(
-            f"Running backtest for {ticker} - Strike: {contract['strike']}, Expiration: {contract['expiration_date']}"
+            f"Walk-forward over {len(reference_dates)} reference dates "
+            f"({walk_forward_config['start_date']} to {walk_forward_config['end_date']})"
         )
-        result = engine.run_backtest(
-            SimpleStraddleStrategy, contracts, reference_date=reference_date
+        records = run_walk_forward(
+            SimpleStraddleStrategy,
+            tickers,
+            reference_dates,
+            backend,
+            db_name=db_path,
+            max_contracts_per_ticker=max_contracts_per_ticker,
+            offline=offline,
+            vectorized=vectorized,
+            pool=pool,
+            result_cache=result_cache,
+            select_kwargs=selection_config,
         )
-        if result:
-            if result and result["results"] is not None:
-                for i, trade in enumerate(result["results"].to_dict(orient="records")):
-                    trade["ticker"] = ticker
-                    trade["strike"] = contract["strike"]
-                    trade["expiration_date"] = contract["expiration_date"]
-                    trade["option_type"] = "straddle"
-
-                    # Assign the correct entry/exit reason per trade
-                    trade["entry_reason"] = result["results"].iloc[i]["entry_reason"]
-                    trade["exit_reason"] = result["results"].iloc[i]["exit_reason"]
-
-                    all_results.append(trade)
-
-                # Append summary stats
-                summary = result["summary"]
-                summary["ticker"] = ticker
-                summary["strike"] = contract["strike"]
-                summary["expiration_date"] = contract["expiration_date"]
-                all_summaries.append(summary)
-            else:
+        for reference_date, ticker, contract, result in records:
+            if result and result.get("error"):
                 print(
-                    f"No trades executed for {ticker} - {contract['strike']} exp {contract['expiration_date']}. Skipping."
+                    f"Backtest failed for {ticker} on {reference_date} - {contract['strike']} exp {contract['expiration_date']}: {result['error']}"
                 )
+        print_cache_stats()
+
+        trades_df, summary_df, by_date_df = summarize_walk_forward(records)
+        if summary_df.empty:
+            print("No valid results to save.")
+            sys.exit(0)
+
+        os.makedirs(os.path.dirname(results_csv), exist_ok=True)
+        outputs = [
+            (trades_df, results_csv.replace(".csv", "_walk_forward.csv")),
+            (summary_df, results_csv.replace(".csv", "_walk_forward_summary.csv")),
+            (by_date_df, results_csv.replace(".csv", "_walk_forward_by_date.csv")),
+        ]
+        for df, path in outputs:
+            df.to_csv(path, index=False)
+            print(f"Walk-forward results saved to {path}")
+        print(by_date_df.to_string(index=False))
+        sys.exit(0)
+
+    # Select contracts for every ticker first, then backtest them all in one (parallel) batch
+    jobs = []
+    for ticker in tickers:
+        selected_contracts = selector.select_contract(
+            ticker,
+            reference_date=reference_date,
+            max_results=max_contracts_per_ticker,
+            **selection_config,
+        )
 
+        if not selected_contracts:
+            print(f"No suitable contracts found for {ticker}")
+            continue
+
+        for contract in selected_contracts:
+            contracts = straddle_legs(ticker, contract)
+            jobs.append((ticker, contract, contracts))
+
+    if sweep_config.get("enabled", False):
+        output_csv = sweep_config.get("output_csv")
+        if output_csv:
+            os.makedirs(os.path.dirname(output_csv), exist_ok=True)
+        ranked = engine.sweep(
+            SimpleStraddleStrategy,
+            [contracts for _, _, contracts in jobs],
+            reference_date=reference_date,
+            param_grid=sweep_config["params"],
+            method=sweep_config.get("method", "grid"),
+            max_tries=sweep_config.get("max_tries"),
+            random_state=sweep_config.get("random_state"),
+            workers=workers,
+            rank_by=sweep_config.get("rank_by", "total_profit"),
+            output_csv=output_csv,
+        )
+        if ranked is not None:
+            print(ranked.head(10).to_string(index=False))
+        sys.exit(0)
+
+    results_path = results_config.get("path") or results_csv.replace(
+        ".csv", ".db" if results_sink == "sqlite" else ""
+    )
+    sink = make_results_sink(
+        results_sink,
+        results_path,
+        run_id=results_config.get("run_id"),
+        resume=results_config.get("resume", False),
+    )
+    completed = sink.completed_keys() if sink.resume else set()
+    pending = [
+        job for job in jobs if job_key(job[0], job[1], reference_date) not in completed
+    ]
+
+    print(
+        f"Run {sink.run_id}: running {len(pending)} backtests with {workers} worker(s)"
+        f" ({len(jobs) - len(pending)} already completed)"
+    )
+    job_results = engine.iter_many(
+        SimpleStraddleStrategy,
+        [contracts for _, _, contracts in pending],
+        reference_date=reference_date,
+        workers=workers,
+        vectorized=vectorized,
+    )
+
+    # Every result is written as soon as it arrives, so an interrupted run can be resumed
+    for (ticker, contract, contracts), result in zip(pending, job_results):
+        print(
+            f"Backtest for {ticker} - Strike: {contract['strike']}, Expiration: {contract['expiration_date']}"
+        )
+        status = sink.add(ticker, contract, reference_date, result)
+        if status == STATUS_ERROR:
+            print(
+                f"Backtest failed for {ticker} - {contract['strike']} exp {contract['expiration_date']}: {result['error']}"
+            )
+        elif status == STATUS_NO_TRADES:
+            print(
+                f"No trades executed for {ticker} - {contract['strike']} exp {contract['expiration_date']}. Skipping."
+            )
+    print(f"Run {sink.run_id} stored in {results_path}")
+    print_cache_stats()
 
-# Save trade results
-if all_results:
-    results_df = pd.DataFrame(all_results)
+    # Save trade results and summary stats of the whole run
     os.makedirs(os.path.dirname(results_csv), exist_ok=True)
-    results_df.to_csv(results_csv, index=False)
-    print(f"Results saved to {results_csv}")
-else:
-    print("No valid results to save.")
-
-# Save summary stats
-if all_summaries:
-    summary_df = pd.DataFrame(all_summaries)
-    summary_df.to_csv(summary_csv, index=False)
-    print(f"Summary stats saved to {summary_csv}")
+    num_trades, num_summaries = sink.export_csv(results_csv, summary_csv)
+    sink.close()
+    if num_trades:
+        print(f"Results saved to {results_csv}")
+    else:
+        print("No valid results to save.")
+    if num_summaries:
+        print(f"Summary stats saved to {summary_csv}")
@@ -1,35 +1,177 @@
 from backtesting import Backtest
 from src.data_provider import DataProvider  # Import the new abstraction
+from src.profiling import count, disable_profiling, enable_profiling, get_profiler, stage
+from src.result_cache import result_key
+from src.vectorized_backtest import VectorizedStraddleSimulator, supports_strategy
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
 import numpy as np
+import pandas as pd
+import traceback
+
+
+# Per-process engine used by pool workers, created once by `_init_worker`
+_worker_engine = None
+
+
+def _init_worker(db_name, backend=None, result_cache=None, profile=False):
+    global _worker_engine
+    _worker_engine = BacktestEngine(db_name, backend=backend, result_cache=result_cache)
+    if profile:
+        # Forked workers inherit the parent's profiler with everything it has recorded (and
+        # its SQL hook on the backend pool); start from an empty one so only this worker's
+        # own work is sent back and merged
+        pool = getattr(_worker_engine.data_provider.backend, "pool", None)
+        inherited = get_profiler()
+        if pool is not None and inherited is not None and inherited.query_stats in pool.hooks:
+            pool.remove_hook(inherited.query_stats)
+        disable_profiling()
+        profiler = enable_profiling()
+        if pool is not None:
+            profiler.attach(pool)
+
+
+def _run_chunk_in_worker(
+    strategy, contract_sets, reference_date, cash, commission, vectorized
+):
+    # Cache counts and stage timings are returned with the results so the parent can report them
+    cache = _worker_engine.result_cache
+    before = cache.counts() if cache is not None else None
+    results = _worker_engine._run_chunk(
+        strategy, contract_sets, reference_date, cash, commission, vectorized
+    )
+    cache_counts = (
+        [after - start for after, start in zip(cache.counts(), before)]
+        if cache is not None
+        else None
+    )
+    profiler = get_profiler()
+    return results, cache_counts, profiler.drain() if profiler is not None else None
+
+
+def _sweep_chunk_in_worker(
+    strategy, contract_sets, reference_date, param_sets, cash, commission
+):
+    return _worker_engine._sweep_chunk(
+        strategy, contract_sets, reference_date, param_sets, cash, commission
+    )
+
+
+def make_param_sets(param_grid, method="grid", max_tries=None, random_state=None):
+    """
+    Expands a parameter grid into the list of parameter sets to evaluate.
+
+    :param param_grid: Dict mapping a strategy parameter name to the list of values to try.
+    :param method: "grid" for every combination, "random" for a random subset of the grid.
+    :param max_tries: Number of combinations to sample when `method="random"`.
+    :param random_state: Seed for the random sample.
+    :return: List of parameter dicts.
+    """
+    names = list(param_grid)
+    combos = [dict(zip(names, values)) for values in product(*param_grid.values())]
+
+    if method == "grid":
+        return combos
+    if method == "random":
+        rng = np.random.default_rng(random_state)
+        size = min(max_tries or len(combos), len(combos))
+        return [combos[i] for i in rng.choice(len(combos), size=size, replace=False)]
+    raise ValueError(f"Unknown sweep method: {method}")
 
 
 class BacktestEngine:
-    def __init__(self, db_name="data/options_data.db", live=False):
-        self.data_provider = DataProvider(db_name, live=live)
+    def __init__(self, db_name="data/options_data.db", live=False, backend=None, result_cache=None, api=None):
+        """
+        :param result_cache: Optional `ResultCache` used by every `run_backtest` call.
+        :param api: Broker client for live mode (see `DataProvider`).
+        """
+        self.db_name = db_name
+        self.live = live
+        self.result_cache = result_cache
+        self.data_provider = DataProvider(db_name, live=live, backend=backend, api=api)
 
     def run_backtest(
-        self, strategy, contracts, reference_date, cash=10000, commission=0.001
+        self,
+        strategy,
+        contracts,
+        reference_date,
+        cash=10000,
+        commission=0.001,
+        bt_data=None,
+        vectorized=False,
+        result_cache=None,
     ):
         """
         Runs a backtest and logs additional statistics.
+
+        :param bt_data: Optional pre-built frame (e.g. from `DataProvider.create_data_many`);
+                        when omitted, the contracts are loaded with `create_data`.
+        :param vectorized: If True, uses `VectorizedStraddleSimulator` (SimpleStraddleStrategy only),
+                           falling back to backtesting.py for corner cases it does not model.
+        :param result_cache: `ResultCache` to reuse the trades and summary of an identical
+                             earlier run from (same bars, strategy source and parameters,
+                             cash and commission); defaults to the engine's cache.
         """
-        bt_data = self.data_provider.create_data(contracts, reference_date)
+        if bt_data is None:
+            bt_data = self.data_provider.create_data(contracts, reference_date)
         if bt_data is None:
             print("Skipping backtest due to missing data.")
             return None
 
-        bt = Backtest(bt_data, strategy, cash=cash, commission=commission)
-        result = bt.run()
+        result_cache = result_cache or self.result_cache
+        if result_cache is not None:
+            with stage("result_cache", contracts):
+                key = result_key(bt_data, strategy, cash, commission, vectorized)
+                cached = result_cache.get(key)
+            if cached is not None:
+                trades, summary_stats = cached
+                return {"contracts": contracts, "results": trades, "summary": summary_stats}
 
-        # Retrieve the actual strategy instance used during backtest
-        strategy_instance = result._strategy
+        count("backtests")
+        count("bars", len(bt_data))
+        with stage("backtest", contracts):
+            if vectorized:
+                simulator = VectorizedStraddleSimulator(
+                    bt_data, strategy, cash=cash, commission=commission
+                )
+            else:
+                simulator = None
+            result = self._backtest_result(
+                contracts, bt_data, strategy, cash, commission, simulator
+            )
+        if result_cache is not None:
+            result_cache.put(key, result["results"], result["summary"])
+        return result
 
-        # Extract trade results and store entry/exit reasons
-        trades = result._trades.copy()
+    def _backtest_result(
+        self, contracts, bt_data, strategy, cash, commission, simulator=None, params=None
+    ):
+        """
+        Runs one parameter set, through `simulator` when given (and able), and builds
+        the `run_backtest` result dictionary.
+        """
+        params = params or {}
+        simulated = simulator.run(**params) if simulator is not None else None
+
+        if simulated is not None:
+            result, trades, entry_reason, exit_reason = simulated
+            trades = trades.copy()
+        else:
+            bt = Backtest(bt_data, strategy, cash=cash, commission=commission)
+            result = bt.run(**params)
 
+            # Retrieve the actual strategy instance used during backtest
+            strategy_instance = result._strategy
+            entry_reason = strategy_instance.entry_reason
+            exit_reason = strategy_instance.exit_reason
+
+            # Extract trade results
+            trades = result._trades.copy()
+
+        # Store entry/exit reasons
         if not trades.empty:
-            trades["entry_reason"] = strategy_instance.entry_reason
-            trades["exit_reason"] = strategy_instance.exit_reason
+            trades["entry_reason"] = entry_reason
+            trades["exit_reason"] = exit_reason
 
         # Compute additional stats safely
         total_profit = trades["PnL"].sum() if not trades.empty else 0.0
@@ -52,3 +194,312 @@ class BacktestEngine:
             "results": trades if not trades.empty else None,
             "summary": summary_stats,
         }
+
+    def run_many(
+        self,
+        strategy,
+        contract_sets,
+        reference_date,
+        cash=10000,
+        commission=0.001,
+        workers=1,
+        chunk_size=10,
+        vectorized=False,
+    ):
+        """
+        Runs one backtest per contract set, optionally across a process pool.
+
+        Contract sets are processed in chunks; each chunk is loaded with one
+        `create_data_many` call. Results always come back in the order of
+        `contract_sets`, so the output matches a serial run regardless of `workers`.
+        A failing contract set yields a result with an `error` message instead of
+        aborting the run.
+
+        :param contract_sets: List of contract lists, each as accepted by `run_backtest`.
+        :param workers: Number of worker processes; 1 runs everything in this process.
+        :param chunk_size: Contract sets loaded and backtested together per task.
+        :param vectorized: Passed through to `run_backtest`.
+        :return: List aligned with `contract_sets` of `run_backtest` results (or None when no data).
+        """
+        return list(
+            self.iter_many(
+                strategy,
+                contract_sets,
+                reference_date,
+                cash=cash,
+                commission=commission,
+                workers=workers,
+                chunk_size=chunk_size,
+                vectorized=vectorized,
+            )
+        )
+
+    def iter_many(
+        self,
+        strategy,
+        contract_sets,
+        reference_date,
+        cash=10000,
+        commission=0.001,
+        workers=1,
+        chunk_size=10,
+        vectorized=False,
+    ):
+        """
+        Streaming version of `run_many`: yields each result, in `contract_sets` order, as
+        soon as its chunk has finished, so callers can persist results while the run goes on.
+        """
+        chunks = [
+            contract_sets[i : i + chunk_size]
+            for i in range(0, len(contract_sets), chunk_size)
+        ]
+
+        if workers <= 1 or self.live:
+            for chunk in chunks:
+                yield from self._run_chunk(
+                    strategy, chunk, reference_date, cash, commission, vectorized
+                )
+            return
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(
+                self.db_name,
+                self.data_provider.backend,
+                self.result_cache,
+                get_profiler() is not None,
+            ),
+        ) as executor:
+            futures = [
+                executor.submit(
+                    _run_chunk_in_worker,
+                    strategy,
+                    chunk,
+                    reference_date,
+                    cash,
+                    commission,
+                    vectorized,
+                )
+                for chunk in chunks
+            ]
+            for chunk, future in zip(chunks, futures):
+                try:
+                    results, cache_counts, profile = future.result()
+                    if cache_counts is not None:
+                        self.result_cache.add_counts(*cache_counts)
+                    if profile is not None and get_profiler() is not None:
+                        get_profiler().merge(profile)
+                except Exception as e:
+                    # The worker itself died (e.g. BrokenProcessPool); fail the whole chunk
+                    print(f"Backtest chunk failed: {e}")
+                    results = [self._error_result(contracts, e) for contracts in chunk]
+                yield from results
+
+    def _run_chunk(
+        self, strategy, contract_sets, reference_date, cash, commission, vectorized=False
+    ):
+        try:
+            chunk_data = self.data_provider.create_data_many(
+                contract_sets, reference_date
+            )
+        except Exception:
+            # Isolate the bad contract set by loading the chunk one set at a time
+            chunk_data = [None] * len(contract_sets)
+            for i, contracts in enumerate(contract_sets):
+                try:
+                    chunk_data[i] = self.data_provider.create_data(
+                        contracts, reference_date
+                    )
+                except Exception as e:
+                    chunk_data[i] = e
+
+        results = []
+        for contracts, bt_data in zip(contract_sets, chunk_data):
+            if isinstance(bt_data, Exception):
+                results.append(self._error_result(contracts, bt_data))
+                continue
+            if bt_data is None:
+                print("Skipping backtest due to missing data.")
+                results.append(None)
+                continue
+            try:
+                results.append(
+                    self.run_backtest(
+                        strategy,
+                        contracts,
+                        reference_date,
+                        cash=cash,
+                        commission=commission,
+                        bt_data=bt_data,
+                        vectorized=vectorized,
+                    )
+                )
+            except Exception as e:
+                results.append(self._error_result(contracts, e))
+        return results
+
+    @staticmethod
+    def _error_result(contracts, error):
+        return {
+            "contracts": contracts,
+            "results": None,
+            "summary": None,
+            "error": "".join(
+                traceback.format_exception_only(type(error), error)
+            ).strip(),
+        }
+
+    def sweep(
+        self,
+        strategy,
+        contract_sets,
+        reference_date,
+        param_grid,
+        method="grid",
+        max_tries=None,
+        random_state=None,
+        cash=10000,
+        commission=0.001,
+        workers=1,
+        chunk_size=10,
+        rank_by="total_profit",
+        output_csv=None,
+    ):
+        """
+        Evaluates many strategy parameter sets over the same contracts and ranks them.
+
+        Each contract set is loaded and resampled once, and its indicators and entry signals
+        are computed once by `VectorizedStraddleSimulator`; every parameter set then reuses
+        them. Strategies the simulator does not support fall back to backtesting.py per set.
+
+        :param param_grid: Dict mapping a strategy parameter name to the list of values to try.
+        :param method: "grid" or "random" (see `make_param_sets`).
+        :param max_tries: Combinations sampled when `method="random"`.
+        :param random_state: Seed for the random sample.
+        :param workers: Number of worker processes; contract chunks are spread across them.
+        :param chunk_size: Contract sets loaded together per task.
+        :param rank_by: Summary column to rank parameter sets by (descending).
+        :param output_csv: Optional path for the ranked table.
+        :return: DataFrame with one row per parameter set, best first.
+        """
+        param_sets = make_param_sets(param_grid, method, max_tries, random_state)
+        chunks = [
+            contract_sets[i : i + chunk_size]
+            for i in range(0, len(contract_sets), chunk_size)
+        ]
+
+        rows = []
+        if workers <= 1 or self.live:
+            for chunk in chunks:
+                rows.extend(
+                    self._sweep_chunk(
+                        strategy, chunk, reference_date, param_sets, cash, commission
+                    )
+                )
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=(self.db_name, self.data_provider.backend)
+            ) as executor:
+                futures = [
+                    executor.submit(
+                        _sweep_chunk_in_worker,
+                        strategy,
+                        chunk,
+                        reference_date,
+                        param_sets,
+                        cash,
+                        commission,
+                    )
+                    for chunk in chunks
+                ]
+                for future in futures:
+                    try:
+                        rows.extend(future.result())
+                    except Exception as e:
+                        print(f"Sweep chunk failed: {e}")
+
+        if not rows:
+            print("No sweep results.")
+            return None
+
+        per_contract = pd.DataFrame(rows)
+        ranked = (
+            per_contract.groupby("param_set")
+            .agg(
+                total_profit=("total_profit", "sum"),
+                win_rate=("win_rate", "mean"),
+                max_drawdown=("max_drawdown", "mean"),
+                sharpe_ratio=("sharpe_ratio", "mean"),
+                num_trades=("num_trades", "sum"),
+                num_contracts=("total_profit", "size"),
+            )
+            .reset_index()
+        )
+        params_df = pd.DataFrame(param_sets)
+        params_df["param_set"] = range(len(param_sets))
+        ranked = params_df.merge(ranked, on="param_set")
+        ranked = ranked.sort_values(
+            [rank_by, "param_set"], ascending=[False, True], kind="mergesort"
+        ).reset_index(drop=True)
+        ranked.insert(0, "rank", range(1, len(ranked) + 1))
+        ranked = ranked.drop(columns="param_set")
+
+        if output_csv:
+            ranked.to_csv(output_csv, index=False)
+            print(f"Sweep results saved to {output_csv}")
+
+        return ranked
+
+    def _sweep_chunk(
+        self, strategy, contract_sets, reference_date, param_sets, cash, commission
+    ):
+        try:
+            chunk_data = self.data_provider.create_data_many(
+                contract_sets, reference_date
+            )
+        except Exception:
+            chunk_data = []
+            for contracts in contract_sets:
+                try:
+                    chunk_data.append(
+                        self.data_provider.create_data(contracts, reference_date)
+                    )
+                except Exception as e:
+                    print(f"Sweep skipped {contracts}: {e}")
+                    chunk_data.append(None)
+
+        rows = []
+        for contracts, bt_data in zip(contract_sets, chunk_data):
+            if bt_data is None:
+                continue
+            try:
+                rows.extend(
+                    self.sweep_contract(
+                        strategy, contracts, bt_data, param_sets, cash, commission
+                    )
+                )
+            except Exception as e:
+                print(f"Sweep skipped {contracts}: {e}")
+        return rows
+
+    def sweep_contract(
+        self, strategy, contracts, bt_data, param_sets, cash=10000, commission=0.001
+    ):
+        """
+        Runs every parameter set over one contract set's bars, reusing a single simulator.
+
+        :return: List of summary dicts, each tagged with its `param_set` index.
+        """
+        simulator = (
+            VectorizedStraddleSimulator(bt_data, strategy, cash=cash, commission=commission)
+            if supports_strategy(strategy)
+            else None
+        )
+        rows = []
+        for i, params in enumerate(param_sets):
+            result = self._backtest_result(
+                contracts, bt_data, strategy, cash, commission, simulator, params
+            )
+            rows.append({"param_set": i, **result["summary"]})
+        return rows
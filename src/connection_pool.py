@@ -0,0 +1,183 @@
+import os
+import sqlite3
+import threading
+import time
+import pandas as pd
+
+
+# Pragmas applied to every pooled connection; see `ConnectionPool`
+DEFAULT_PRAGMAS = {
+    "mmap_size": 256 * 1024 * 1024,  # Bytes of the database file read through mmap
+    "cache_size": -64 * 1024,  # Negative values are KiB of page cache per connection
+    "temp_store": "MEMORY",  # Sorts and temp b-trees stay off disk
+}
+
+
+class QueryStats:
+    """
+    Query timing hook that keeps a count, total and maximum per query text.
+
+    Register it with `ConnectionPool.add_hook`; `summary()` returns one row per query.
+    """
+
+    def __init__(self):
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, query, params, elapsed):
+        # Name a query by its collapsed, truncated text
+        name = " ".join(query.split())[:80]
+        with self._lock:
+            count, total, longest = self.stats.get(name, (0, 0.0, 0.0))
+            self.stats[name] = (count + 1, total + elapsed, max(longest, elapsed))
+
+    def summary(self):
+        rows = [
+            {
+                "query": name,
+                "count": count,
+                "total_ms": total * 1000,
+                "mean_us": total / count * 1e6,
+                "max_ms": longest * 1000,
+            }
+            for name, (count, total, longest) in self.stats.items()
+        ]
+        return pd.DataFrame(rows, columns=["query", "count", "total_ms", "mean_us", "max_ms"])
+
+    def reset(self):
+        with self._lock:
+            self.stats = {}
+
+    def drain(self):
+        """Returns and clears the stats collected so far, for `merge` in another process."""
+        with self._lock:
+            stats, self.stats = self.stats, {}
+        return stats
+
+    def merge(self, stats):
+        """Adds the `drain` output of another `QueryStats` (e.g. a backtest worker's)."""
+        with self._lock:
+            for name, (count, total, longest) in stats.items():
+                own_count, own_total, own_longest = self.stats.get(name, (0, 0.0, 0.0))
+                self.stats[name] = (own_count + count, own_total + total, max(own_longest, longest))
+
+
+class ConnectionPool:
+    def __init__(
+        self,
+        db_name="data/options_data.db",
+        read_only=True,
+        mmap_size=DEFAULT_PRAGMAS["mmap_size"],
+        cache_size=DEFAULT_PRAGMAS["cache_size"],
+        temp_store=DEFAULT_PRAGMAS["temp_store"],
+        cached_statements=256,
+    ):
+        """
+        Thread-local SQLite connections shared by the backtest-side readers.
+
+        Each thread opens one connection on first use and keeps it, so pragmas are set
+        once and sqlite3's per-connection statement cache reuses prepared statements
+        across calls. Connections are never shared between threads, and a pool sent to
+        another process (e.g. a backtest worker) reconnects there.
+
+        :param db_name: Path to the SQLite database.
+        :param read_only: Open connections as `file:...?mode=ro` URIs; a missing database
+                          raises instead of being created.
+        :param mmap_size: `PRAGMA mmap_size` in bytes (0 disables memory-mapped reads).
+        :param cache_size: `PRAGMA cache_size` (pages, or KiB when negative).
+        :param temp_store: `PRAGMA temp_store` (DEFAULT, FILE or MEMORY).
+        :param cached_statements: Prepared statements kept per connection.
+        """
+        self.db_name = db_name
+        self.read_only = read_only
+        self.pragmas = {"mmap_size": mmap_size, "cache_size": cache_size, "temp_store": temp_store}
+        self.cached_statements = cached_statements
+        self.hooks = []
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Connections and timing hooks stay with the process that opened or added them
+        state = {**self.__dict__, "_connections": [], "hooks": []}
+        del state["_local"], state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _open(self):
+        if self.read_only and self.db_name != ":memory:":
+            path = os.path.abspath(self.db_name)
+            target, uri = f"file:{path}?mode=ro", True
+        else:
+            target, uri = self.db_name, False
+        # Only the opening thread queries a connection; other threads may only close it
+        conn = sqlite3.connect(
+            target,
+            uri=uri,
+            cached_statements=self.cached_statements,
+            check_same_thread=False,
+        )
+        for name, value in self.pragmas.items():
+            if value is not None:
+                conn.execute(f"PRAGMA {name}={value}")
+        return conn
+
+    def connection(self):
+        """This thread's connection, opened on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def add_hook(self, hook):
+        """Registers `hook(query, params, elapsed_seconds)`, called after every query."""
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    def _timed(self, func, query, params):
+        if not self.hooks:
+            return func()
+        start = time.perf_counter()
+        try:
+            return func()
+        finally:
+            elapsed = time.perf_counter() - start
+            for hook in self.hooks:
+                hook(query, params, elapsed)
+
+    def fetchall(self, query, params=()):
+        return self._timed(
+            lambda: self.connection().execute(query, params).fetchall(), query, params
+        )
+
+    def fetchone(self, query, params=()):
+        return self._timed(
+            lambda: self.connection().execute(query, params).fetchone(), query, params
+        )
+
+    def read_frame(self, query, params=(), parse_dates=None):
+        """`pd.read_sql_query` on this thread's connection."""
+        return self._timed(
+            lambda: pd.read_sql_query(
+                query, self.connection(), params=params, parse_dates=parse_dates
+            ),
+            query,
+            params,
+        )
+
+    def close(self):
+        """Closes every connection the pool opened; threads reconnect on next use."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
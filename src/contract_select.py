@@ -1,10 +1,66 @@
-import yfinance as yf
-import sqlite3
 from datetime import datetime, timedelta
 from abc import ABC, abstractmethod
+import numpy as np
 import pandas as pd
-
-# from src.broker_api import SchwabAPI  # Assuming you have a broker API wrapper
+from src.connection_pool import ConnectionPool
+from src.price_store import UnderlyingPriceStore
+from src.profiling import profiled
+from src.storage import SQLiteBackend
+
+
+# Columns of a chain snapshot, named like the fields of `get_available_contracts`
+CHAIN_COLUMNS = ["strike", "expiration_date", "option_type", "volume", "open_interest", "iv"]
+
+
+def pair_chain(snapshot):
+    """
+    Joins the call and put of every (strike, expiration) in a chain snapshot.
+
+    Later rows of a contract replace earlier ones, and pairs come out in the order the
+    nested `{strike: {expiration: ...}}` dict of `get_available_contracts` would iterate
+    them, so stable sorts over the result break ties exactly like the dict-based code did.
+
+    :param snapshot: Frame with `CHAIN_COLUMNS`, in row arrival order.
+    :return: Frame with `strike`, `expiration_date` and `<field>_call` / `<field>_put` columns.
+    """
+    chain = snapshot.assign(
+        strike_order=snapshot.groupby("strike", sort=False).ngroup(),
+        pair_order=snapshot.groupby(["strike", "expiration_date"], sort=False).ngroup(),
+    ).drop_duplicates(["strike", "expiration_date", "option_type"], keep="last")
+
+    fields = ["strike", "expiration_date", "strike_order", "pair_order", "volume", "open_interest", "iv"]
+    pairs = chain.loc[chain["option_type"] == "call", fields].merge(
+        chain.loc[chain["option_type"] == "put", fields[:2] + fields[4:]],
+        on=["strike", "expiration_date"],
+        suffixes=("_call", "_put"),
+    )
+    return pairs.sort_values(["strike_order", "pair_order"], kind="mergesort").reset_index(drop=True)
+
+
+def top_k_order(keys, k):
+    """
+    Indices of the `k` smallest rows under a lexicographic sort on `keys`, ties kept in row order.
+
+    Equivalent to `sorted(range(n), key=lambda i: tuple(key[i] for key in keys))[:k]`, but
+    only the rows that can reach the top `k` on the first key (found with `argpartition`)
+    are fully sorted.
+
+    :param keys: Equal-length float arrays, most significant first.
+    :param k: Number of rows to return.
+    """
+    n = len(keys[0])
+    if k <= 0:
+        return []
+    if any(np.isnan(key).any() for key in keys):
+        # NaN compares unordered, so only Python's sort reproduces the legacy order
+        return sorted(range(n), key=lambda i: tuple(key[i] for key in keys))[:k]
+
+    candidates = np.arange(n)
+    if k < n:
+        kth = keys[0][np.argpartition(keys[0], k - 1)[k - 1]]
+        candidates = np.flatnonzero(keys[0] <= kth)
+    order = np.lexsort([key[candidates] for key in reversed(keys)])
+    return candidates[order[:k]].tolist()
 
 
 class ContractSelector(ABC):
@@ -14,6 +70,10 @@ class ContractSelector(ABC):
         live=False,
         min_data_points=10,
         use_open=False,
+        offline=False,
+        backend=None,
+        pool=None,
+        api=None,
     ):
         """
         Base contract selector class.
@@ -22,23 +82,53 @@ class ContractSelector(ABC):
         :param live: If True, fetches live data; otherwise, uses historical data.
         :param min_data_points: Minimum required data points for historical contract selection.
         :param use_open: If True, uses same-day `Open` price; otherwise, uses previous day's `Close` for backtesting.
+        :param offline: If True, underlying prices come only from the local `underlying_prices` table.
+        :param backend: `StorageBackend` for option snapshots; defaults to `SQLiteBackend(db_name)`.
+        :param pool: `ConnectionPool` shared by the price store and the default backend.
+        :param api: Broker client used in live mode (e.g. `src.live_feed.ReplayBroker`).
         """
         self.db_name = db_name
         self.live = live
         self.min_data_points = min_data_points
         self.use_open = use_open  # Determines whether to use Open or Close price
-        if live:
-            self.api = SchwabAPI()  # Live API client
-
-    def _connect_db(self):
-        """Creates a connection to the SQLite database."""
-        return sqlite3.connect(self.db_name)
+        self.offline = offline
+        pool = pool or getattr(backend, "pool", None) or ConnectionPool(db_name)
+        self.price_store = UnderlyingPriceStore(db_name, offline=offline, pool=pool)
+        self.backend = backend or SQLiteBackend(db_name, pool)
+        if live and api is None:
+            raise ValueError("Live mode needs a broker client (api)")
+        self.api = api
 
     @abstractmethod
     def get_available_contracts(self, ticker, reference_date=None):
         """Retrieve available contracts (either from historical DB or live API)."""
         pass
 
+    @profiled("chain_snapshot")
+    def get_chain_snapshot(self, ticker, reference_date=None):
+        """
+        Returns the chain as of `reference_date` as a flat frame with `CHAIN_COLUMNS`:
+        one row per contract, holding its latest observation at or before that time.
+
+        Historical snapshots come straight from `StorageBackend.chain_as_of`; live mode
+        flattens `get_available_contracts`.
+        """
+        if self.live:
+            contracts = self.get_available_contracts(ticker, reference_date)
+            rows = [
+                (strike, expiration_date, option_type, data.get("volume"), data.get("open_interest"), data.get("iv"))
+                for strike, exp_data in contracts.items()
+                for expiration_date, contract_data in exp_data.items()
+                for option_type, data in contract_data.items()
+            ]
+        else:
+            rows = self.backend.chain_as_of(ticker, reference_date)
+
+        snapshot = pd.DataFrame(rows, columns=CHAIN_COLUMNS)
+        snapshot["option_type"] = snapshot["option_type"].str.lower()
+        snapshot["iv"] = snapshot["iv"].astype(float)  # NULL -> NaN
+        return snapshot
+
     def select_contract(self, ticker, reference_date=None, max_results=3):
         """
         Selects the most liquid and actively traded ATM contracts.
@@ -53,9 +143,9 @@ class ContractSelector(ABC):
             if reference_date is None:
                 return []  # No historical data available
 
-        contracts = self.get_available_contracts(ticker, reference_date)
+        contracts = self.get_chain_snapshot(ticker, reference_date)
 
-        if not contracts:
+        if contracts.empty:
             return []  # No contracts available
 
         #  Get the stock price based on execution rules
@@ -71,68 +161,46 @@ class ContractSelector(ABC):
             )
             return []
 
-        all_contracts = []
-
-        for strike in contracts.keys():
-            for expiration_date, contract_data in contracts[strike].items():
-                if "call" in contract_data and "put" in contract_data:
-                    call_data = contract_data["call"]
-                    put_data = contract_data["put"]
-
-                    #  Convert to numeric safely using `pd.to_numeric(errors="coerce")`
-                    call_volume = pd.to_numeric(
-                        call_data.get("volume", 0), errors="coerce"
-                    )
-                    put_volume = pd.to_numeric(
-                        put_data.get("volume", 0), errors="coerce"
-                    )
-                    call_oi = pd.to_numeric(
-                        call_data.get("open_interest", 0), errors="coerce"
-                    )
-                    put_oi = pd.to_numeric(
-                        put_data.get("open_interest", 0), errors="coerce"
-                    )
-                    call_iv = pd.to_numeric(call_data.get("iv", 0.0), errors="coerce")
-                    put_iv = pd.to_numeric(put_data.get("iv", 0.0), errors="coerce")
-
-                    #  Replace NaN values with defaults
-                    call_volume = 0 if pd.isna(call_volume) else int(call_volume)
-                    put_volume = 0 if pd.isna(put_volume) else int(put_volume)
-                    call_oi = 0 if pd.isna(call_oi) else int(call_oi)
-                    put_oi = 0 if pd.isna(put_oi) else int(put_oi)
-                    call_iv = 0.0 if pd.isna(call_iv) else float(call_iv)
-                    put_iv = 0.0 if pd.isna(put_iv) else float(put_iv)
-
-                    #  Use minimum liquidity between the call and put
-                    min_liquidity = min(call_volume, put_volume, call_oi, put_oi)
-
-                    all_contracts.append(
-                        {
-                            "strike": strike,
-                            "expiration_date": expiration_date,
-                            "reference_date": reference_date,
-                            "stock_price": stock_price,
-                            "liquidity_score": min_liquidity,  #  Minimum liquidity
-                            "implied_volatility": (call_iv + put_iv)
-                            / 2,  #  Average IV
-                        }
-                    )
-
-        sorted_contracts = sorted(
-            all_contracts,
-            key=lambda x: (
-                abs(x["strike"] - stock_price),
-                -x["liquidity_score"],
-                -x["implied_volatility"],
-            ),
+        pairs = pair_chain(contracts)
+        if pairs.empty:
+            return []
+
+        #  Contract fields are stored with native numeric types; only fill gaps
+        volume_oi = pairs[["volume_call", "volume_put", "open_interest_call", "open_interest_put"]]
+        #  Use minimum liquidity between the call and put
+        liquidity = volume_oi.fillna(0).infer_objects().to_numpy().min(axis=1)
+        implied_volatility = (
+            pairs["iv_call"].fillna(0.0).to_numpy(dtype=float)
+            + pairs["iv_put"].fillna(0.0).to_numpy(dtype=float)
+        ) / 2  #  Average IV
+        strikes = pairs["strike"].to_numpy(dtype=float)
+
+        top = top_k_order(
+            [np.abs(strikes - stock_price), -liquidity.astype(float), -implied_volatility],
+            max_results,
         )
 
         #  Return the top max_results contracts
-        return sorted_contracts[:max_results]
-
+        strike_values = pairs["strike"].tolist()
+        expiration_dates = pairs["expiration_date"].tolist()
+        liquidity = liquidity.tolist()
+        implied_volatility = implied_volatility.tolist()
+        return [
+            {
+                "strike": strike_values[i],
+                "expiration_date": expiration_dates[i],
+                "reference_date": reference_date,
+                "stock_price": stock_price,
+                "liquidity_score": liquidity[i],  #  Minimum liquidity
+                "implied_volatility": implied_volatility[i],
+            }
+            for i in top
+        ]
+
+    @profiled("spot_price")
     def _get_historical_spot_price(self, ticker, trade_date, use_open):
         """
-        Fetches the stock's historical price using Yahoo Finance.
+        Fetches the stock's historical price from the local price store (Yahoo Finance fallback).
         - Uses previous day's `Close` if `use_open=False` (for market open trading).
         - Uses same-day `Open` if `use_open=True` (for intraday analysis).
         - Finds the closest available price if data is missing due to weekends/holidays.
@@ -146,8 +214,8 @@ class ContractSelector(ABC):
             trade_date_obj = datetime.strptime(trade_date, "%Y-%m-%d")
 
             # Fetch stock history for a small window around the trade date
-            stock = yf.Ticker(ticker)
-            df = stock.history(
+            df = self.price_store.get_history(
+                ticker,
                 start=trade_date_obj - timedelta(days=5),
                 end=trade_date_obj + timedelta(days=1),
             )
@@ -156,9 +224,6 @@ class ContractSelector(ABC):
                 print(f"No stock price found for {ticker} near {trade_date}.")
                 return None
 
-            # Convert index to naive datetime for comparison
-            df.index = df.index.tz_localize(None)
-
             if use_open:
                 df = df[df.index == trade_date_obj]  # Get exact open price
                 if not df.empty:
@@ -179,12 +244,4 @@ class ContractSelector(ABC):
 
     def _get_first_contract_date(self, ticker):
         """Finds the first available trade date for a given ticker."""
-        conn = self._connect_db()
-        result = conn.execute(
-            """
-            SELECT MIN(lastTradeDate) FROM options WHERE ticker=?
-            """,
-            (ticker,),
-        ).fetchone()
-        conn.close()
-        return result[0] if result else None
\ No newline at end of file
+        return self.backend.first_contract_date(ticker)
\ No newline at end of file
@@ -1,17 +1,64 @@
-import sqlite3
 import pandas as pd
 from datetime import datetime
+from pandas.tseries.frequencies import to_offset
+from pandas.tseries.offsets import Tick
+from src.profiling import profiled, stage
+from src.storage import SQLiteBackend
+
+
+# `_to_ohlcv` rules for every bar field; the means are weighted by snapshot counts when
+# daily rollups are merged in
+OHLCV_AGGREGATIONS = {
+    "Open": "first",
+    "High": "max",
+    "Low": "min",
+    "Close": "last",
+    "volume": "sum",
+    "openInterest": "sum",
+    "impliedVolatility": "mean",
+    "percentChange": "mean",
+    "change": "mean",
+    "inTheMoney": "last",
+}
+MEAN_COLUMNS = [column for column, rule in OHLCV_AGGREGATIONS.items() if rule == "mean"]
+
+
+def is_daily_interval(interval):
+    """True when bars of `interval` span whole days (1D, 2D, W, M, ...)."""
+    offset = to_offset(interval.replace("T", "min"))
+    if isinstance(offset, Tick):
+        day = pd.Timedelta(days=1)
+        span = pd.Timedelta(offset)
+        return span >= day and span % day == pd.Timedelta(0)
+    return True
+
+
+def contract_key(contract):
+    """Identifies a contract leg by (ticker, option_type, expiration_date, strike)."""
+    return (
+        contract["ticker"],
+        contract["option_type"],
+        contract["expiration_date"],
+        float(contract["strike"]),
+    )
 
 
 class DataProvider:
-    def __init__(self, db_name="data/options_data.db", live=False):
+    def __init__(self, db_name="data/options_data.db", live=False, backend=None, pool=None, api=None):
+        """
+        :param db_name: Path to the SQLite options database (used when no backend is given).
+        :param live: If True, loads contracts from the broker API.
+        :param backend: `StorageBackend` for historical data; defaults to `SQLiteBackend(db_name)`.
+        :param pool: `ConnectionPool` for the default backend.
+        :param api: Broker client used in live mode (e.g. `src.live_feed.ReplayBroker`).
+        """
         self.db_name = db_name
         self.live = live
-        if live:
-            self.api = SchwabAPI()  # Instantiate broker API client
-
-    def _connect_db(self):
-        return sqlite3.connect(self.db_name)
+        self.backend = backend or SQLiteBackend(db_name, pool)
+        if live and api is None:
+            raise ValueError("Live mode needs a broker client (api)")
+        self.api = api
+        self._live_bars = {}  # (contract key, interval) -> (LegBars, time of the newest row fed)
 
     def load_contract(
         self, ticker, option_type, expiration_date, strike, interval="1T"
@@ -32,29 +79,33 @@ class DataProvider:
         self, ticker, option_type, expiration_date, strike, interval
     ):
         """
-        Loads historical option contract data from SQLite database and resamples to specified interval.
+        Loads historical option contract data from the storage backend and resamples to specified interval.
         """
-        conn = self._connect_db()
-        query = """
-            SELECT lastTradeDate AS Date, lastPrice AS Close, bid, ask, volume, openInterest, impliedVolatility,
-                   percentChange, change, inTheMoney
-            FROM options
-            WHERE ticker=? AND option_type=? AND expiration_date=? AND strike=?
-        """
-        df = pd.read_sql_query(
-            query,
-            conn,
-            params=[ticker, option_type, expiration_date, strike],
-            parse_dates=["Date"],
-        )
-        conn.close()
+        with stage("load_rows"):
+            df = self.backend.load_contract(ticker, option_type, expiration_date, strike)
+            daily = None
+            if is_daily_interval(interval):
+                daily = self.backend.load_daily(
+                    ticker, [(option_type, expiration_date, strike)]
+                ).drop(columns=["option_type", "expiration_date", "strike"])
 
-        if df.empty:
+        if df.empty and (daily is None or daily.empty):
             print(
                 f"No historical data found for {ticker} {option_type} {strike} exp {expiration_date}"
             )
             return None
 
+        return self._to_ohlcv(df, interval, daily)
+
+    @profiled("resample")
+    def _to_ohlcv(self, df, interval, daily=None):
+        """
+        Builds the resampled OHLCV frame used for backtesting from raw contract snapshots.
+
+        :param daily: `StorageBackend.load_daily` rows of the contract (without the key
+                      columns), for intervals of a day or longer. Each replaces the
+                      snapshots of its day, which `DBHandler.compact` may have thinned.
+        """
         df.set_index("Date", inplace=True)
         df.sort_index(inplace=True)
 
@@ -63,55 +114,158 @@ class DataProvider:
         df["High"] = df[["Close", "bid", "ask"]].max(axis=1)
         df["Low"] = df[["Close", "bid", "ask"]].min(axis=1)
 
+        if daily is not None and not daily.empty:
+            return self._merge_daily(df, daily, interval)
+
         df_resampled = (
             df.resample(
                 interval.replace("T", "min")
             )  # Replace deprecated 'T' with 'min'
-            .agg(
-                {
-                    "Open": "first",
-                    "High": "max",
-                    "Low": "min",
-                    "Close": "last",
-                    "volume": "sum",
-                    "openInterest": "sum",
-                    "impliedVolatility": "mean",
-                    "percentChange": "mean",
-                    "change": "mean",
-                    "inTheMoney": "last",
-                }
-            )
+            .agg(OHLCV_AGGREGATIONS)
             .ffill()
         )
 
         return df_resampled
 
+    @staticmethod
+    def _merge_daily(df, daily, interval):
+        """
+        `_to_ohlcv` bars from snapshots and daily rollups: each mean is the count-weighted
+        mean of the days' means and the snapshots, so a bar equals the one built from every
+        snapshot before compaction.
+        """
+        daily = daily.set_index("Date").sort_index()
+        rows = [daily]
+        if not df.empty:
+            df = df[~df.index.normalize().isin(daily.index)]
+        if not df.empty:
+            counts = {
+                f"{column}Count": df[column].notna().astype("int64") for column in MEAN_COLUMNS
+            }
+            rows.append(df[list(OHLCV_AGGREGATIONS)].assign(**counts))
+        rows = pd.concat(rows).sort_index(kind="mergesort")
+        for column in MEAN_COLUMNS:
+            rows[column] = rows[column].fillna(0) * rows[f"{column}Count"]
+
+        aggregations = {
+            column: "sum" if rule == "mean" else rule
+            for column, rule in OHLCV_AGGREGATIONS.items()
+        }
+        aggregations.update({f"{column}Count": "sum" for column in MEAN_COLUMNS})
+        bars = rows.resample(interval.replace("T", "min")).agg(aggregations)
+        for column in MEAN_COLUMNS:
+            counts = bars.pop(f"{column}Count")
+            bars[column] = (bars[column] / counts).where(counts > 0)
+        return bars.ffill()
+
+    def load_contracts(self, contracts, interval="1T"):
+        """
+        Loads many contracts with one backend read per ticker and splits the rows in memory.
+
+        :param contracts: List of contracts (each containing ticker, option_type, expiration_date, strike).
+        :param interval: Default resample interval for contracts without their own `interval`.
+        :return: Dict mapping `contract_key(contract)` to the frame `load_contract` would return.
+        """
+        if self.live:
+            return {
+                contract_key(contract): self.load_contract(
+                    **{"interval": interval, **contract}
+                )
+                for contract in contracts
+            }
+
+        by_ticker = {}
+        for contract in contracts:
+            by_ticker.setdefault(contract["ticker"], {})[contract_key(contract)] = contract
+
+        frames = {}
+        for ticker, ticker_contracts in by_ticker.items():
+            intervals = {
+                key: contract.get("interval", interval)
+                for key, contract in ticker_contracts.items()
+            }
+            with stage("load_rows"):
+                df = self.backend.load_contracts(
+                    ticker, [key[1:] for key in ticker_contracts]
+                )
+                daily_keys = [
+                    key[1:] for key in ticker_contracts if is_daily_interval(intervals[key])
+                ]
+                daily = self.backend.load_daily(ticker, daily_keys) if daily_keys else None
+
+            groups = dict(
+                iter(df.groupby(["option_type", "expiration_date", "strike"], sort=False))
+            )
+            daily_groups = {}
+            if daily is not None:
+                daily_groups = dict(
+                    iter(daily.groupby(["option_type", "expiration_date", "strike"], sort=False))
+                )
+            for key in ticker_contracts:
+                rows = groups.get(key[1:])
+                key_daily = daily_groups.get(key[1:]) if is_daily_interval(intervals[key]) else None
+                if rows is None and key_daily is None:
+                    print(
+                        f"No historical data found for {ticker} {key[1]} {key[3]} exp {key[2]}"
+                    )
+                    frames[key] = None
+                    continue
+                if rows is None:
+                    rows = df.iloc[:0]
+                rows = rows.drop(columns=["option_type", "expiration_date", "strike"])
+                if key_daily is not None:
+                    key_daily = key_daily.drop(
+                        columns=["option_type", "expiration_date", "strike"]
+                    )
+                frames[key] = self._to_ohlcv(
+                    rows.reset_index(drop=True), intervals[key], key_daily
+                )
+
+        return frames
+
     def _load_live_contract(
         self, ticker, option_type, expiration_date, strike, interval
     ):
         """
-        Fetches real-time option chain data from the broker API and formats it for backtesting.
-        """
-        live_data = self.api.get_option_price(
-            ticker, option_type, expiration_date, strike
-        )
+        Fetches real-time option data from the broker API and formats it for backtesting.
 
-        df = pd.DataFrame(live_data)
-        df["Date"] = pd.to_datetime(df["Date"])
-        df.set_index("Date", inplace=True)
-        df.sort_index(inplace=True)
+        Snapshots are folded into a per-contract `LegBars` as they arrive, so each call only
+        aggregates the rows newer than the previous one instead of resampling the whole
+        payload again. The bar still being built is included as the last row.
+        """
+        from src.live_feed import LegBars, Quote
 
-        df["Open"] = df["Close"]  # In live mode, Open=Close if no bid/ask available
-        df["High"] = df["Close"]
-        df["Low"] = df["Close"]
+        key = (ticker, option_type, expiration_date, float(strike))
+        leg, last_time = self._live_bars.get((key, interval), (None, None))
+        if leg is None:
+            leg = LegBars(interval)
 
-        df_resampled = (
-            df.resample(interval.replace("T", "min"))
-            .agg({"Open": "first", "High": "max", "Low": "min", "Close": "last"})
-            .ffill()
+        live_data = self.api.get_option_price(
+            ticker, option_type, expiration_date, strike
         )
+        if live_data:
+            times = pd.to_datetime([record["Date"] for record in live_data])
+            times = times.to_numpy(dtype="datetime64[ns]").astype("int64")
+            new = [i for i, time in enumerate(times.tolist()) if last_time is None or time > last_time]
+            df = pd.DataFrame([live_data[i] for i in new])
+            columns = [
+                pd.to_numeric(df[name], errors="coerce").to_numpy(dtype=float)
+                if name in df
+                else [float("nan")] * len(df)
+                for name in (
+                    "Close", "bid", "ask", "volume", "openInterest", "impliedVolatility",
+                    "percentChange", "change", "inTheMoney",
+                )
+            ]
+            for time, *values in sorted(zip(times[new].tolist(), *columns)):
+                leg.update(Quote(time, key, *values))
+                last_time = time
+        self._live_bars[(key, interval)] = (leg, last_time)
 
-        return df_resampled
+        if not leg.started:
+            print(f"No live data for {ticker} {option_type} {strike} exp {expiration_date}")
+            return None
+        return leg.frame(include_open=True)
 
     def create_data(self, contracts, reference_date=None):
         """
@@ -122,6 +276,55 @@ class DataProvider:
         :return: Processed DataFrame.
         """
         dfs = [self.load_contract(**contract) for contract in contracts]
+        with stage("combine_legs", contracts):
+            return self._combine_legs(dfs, reference_date)
+
+    def create_data_many(
+        self, contract_sets, reference_date=None, interval="1T", reference_dates=None
+    ):
+        """
+        Bulk version of `create_data` for many leg sets (e.g. every selected straddle of a ticker).
+
+        All legs are loaded through `load_contracts`, so each ticker costs one query instead
+        of one backend read per leg, and a leg shared by several sets is resampled once.
+
+        :param contract_sets: List of contract lists, each as accepted by `create_data`.
+        :param reference_date: The date from which to start the backtest.
+        :param interval: Resample interval for legs without their own `interval`.
+        :param reference_dates: Optional per-set start dates aligned with `contract_sets`
+                                (e.g. a walk-forward); overrides `reference_date`.
+        :return: List of combined DataFrames (or None), aligned with `contract_sets`.
+        """
+        frames = self.load_contracts(
+            [contract for contracts in contract_sets for contract in contracts], interval
+        )
+        if reference_dates is None:
+            data = []
+            for contracts in contract_sets:
+                with stage("combine_legs", contracts):
+                    data.append(
+                        self._combine_legs(
+                            [frames[contract_key(contract)] for contract in contracts],
+                            reference_date,
+                        )
+                    )
+            return data
+
+        # A leg set repeated across reference dates is combined once and sliced per date
+        combined = {}
+        data = []
+        for contracts, set_reference_date in zip(contract_sets, reference_dates):
+            keys = tuple(contract_key(contract) for contract in contracts)
+            if keys not in combined:
+                with stage("combine_legs", contracts):
+                    combined[keys] = self._combine_legs([frames[key] for key in keys], None)
+            df = combined[keys]
+            if df is not None and set_reference_date:
+                df = df.loc[df.index >= set_reference_date]
+            data.append(df)
+        return data
+
+    def _combine_legs(self, dfs, reference_date):
         dfs = [df for df in dfs if df is not None]  # Filter out any None values
 
         if not dfs:
@@ -0,0 +1,222 @@
+import numpy as np
+import pandas as pd
+
+
+# Options expire at the close of their expiration date
+EXPIRY_TIME = pd.Timedelta(hours=16)
+
+# Volatility bracket searched by `implied_volatility`
+MIN_VOLATILITY = 1e-4
+MAX_VOLATILITY = 10.0
+
+_SQRT_2PI = np.sqrt(2.0 * np.pi)
+
+
+def norm_pdf(x):
+    return np.exp(-0.5 * x * x) / _SQRT_2PI
+
+
+def norm_cdf(x):
+    """
+    Standard normal CDF to double precision (West's implementation of Hart's algorithm
+    5666), so no SciPy is needed.
+    """
+    x = np.asarray(x, dtype=float)
+    z = np.abs(x)
+    e = np.exp(-0.5 * z * z)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        n = (((((0.0352624965998911 * z + 0.700383064443688) * z + 6.37396220353165) * z
+               + 33.912866078383) * z + 112.079291497871) * z + 221.213596169931) * z + 220.206867912376
+        d = ((((((0.0883883476483184 * z + 1.75566716318264) * z + 16.064177579207) * z
+                + 86.7807322029461) * z + 296.564248779674) * z + 637.333633378831) * z
+             + 793.826512519948) * z + 440.413735824752
+        b = z + 1.0 / (z + 2.0 / (z + 3.0 / (z + 4.0 / (z + 0.65))))
+        tail = np.where(z < 7.07106781186547, e * n / d, e / (b * 2.506628274631))
+    tail = np.where(z > 37.0, 0.0, tail)
+    return np.where(x > 0, 1.0 - tail, tail)
+
+
+def years_to_expiry(expiration_date, as_of):
+    """
+    Time from `as_of` to each expiration's close, in years of 365 days.
+
+    :param expiration_date: Array-like of `YYYY-MM-DD` strings (or timestamps).
+    :param as_of: Timestamp or date string; a bare date means midnight at its start.
+    """
+    codes, uniques = pd.factorize(np.asarray(expiration_date))
+    expiries = pd.to_datetime(uniques) + EXPIRY_TIME
+    years = ((expiries - pd.Timestamp(as_of)) / pd.Timedelta(days=365)).to_numpy(dtype=float)
+    return years[codes] if len(uniques) else np.zeros(0)
+
+
+def black_scholes(spot, strike, years, volatility, is_call, rate=0.0, dividend=0.0):
+    """
+    Black-Scholes-Merton prices and Greeks of European options, element-wise over arrays.
+
+    Contracts with no time left, a non-positive volatility or a missing input get NaN.
+
+    :param spot: Underlying price (scalar or per contract).
+    :param strike: Strike prices.
+    :param years: Time to expiry in years (see `years_to_expiry`).
+    :param volatility: Annualized volatility, e.g. 0.25.
+    :param is_call: Boolean array, True for calls and False for puts.
+    :param rate: Continuously compounded risk-free rate.
+    :param dividend: Continuous dividend yield.
+    :return: Dict of arrays: `price`, `delta`, `gamma`, `vega` (per volatility point, i.e.
+             a 0.01 change) and `theta` (per calendar day).
+    """
+    spot, strike, years, volatility, is_call = np.broadcast_arrays(
+        np.asarray(spot, dtype=float),
+        np.asarray(strike, dtype=float),
+        np.asarray(years, dtype=float),
+        np.asarray(volatility, dtype=float),
+        np.asarray(is_call, dtype=bool),
+    )
+    valid = (years > 0) & (volatility > 0) & (spot > 0) & (strike > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sqrt_t = np.sqrt(np.where(valid, years, np.nan))
+        vol_sqrt_t = volatility * sqrt_t
+        d1 = (np.log(spot / strike) + (rate - dividend + 0.5 * volatility * volatility) * years) / vol_sqrt_t
+        d2 = d1 - vol_sqrt_t
+        sign = np.where(is_call, 1.0, -1.0)
+        spot_disc = spot * np.exp(-dividend * years)
+        strike_disc = strike * np.exp(-rate * years)
+        nd1 = norm_cdf(sign * d1)
+        nd2 = norm_cdf(sign * d2)
+        pdf_d1 = norm_pdf(d1)
+
+        price = sign * (spot_disc * nd1 - strike_disc * nd2)
+        delta = sign * np.exp(-dividend * years) * nd1
+        gamma = np.exp(-dividend * years) * pdf_d1 / (spot * vol_sqrt_t)
+        vega = spot_disc * pdf_d1 * sqrt_t
+        theta = (
+            -spot_disc * pdf_d1 * volatility / (2.0 * sqrt_t)
+            - sign * rate * strike_disc * nd2
+            + sign * dividend * spot_disc * nd1
+        )
+    return {
+        "price": price,
+        "delta": delta,
+        "gamma": gamma,
+        "vega": vega / 100.0,
+        "theta": theta / 365.0,
+    }
+
+
+def implied_volatility(
+    price, spot, strike, years, is_call, rate=0.0, dividend=0.0, tol=1e-8, max_iter=100
+):
+    """
+    Volatility at which `black_scholes` returns `price`, solved for all contracts at once.
+
+    Newton steps on vega, falling back to bisection whenever a step would leave the
+    bracket `[MIN_VOLATILITY, MAX_VOLATILITY]` narrowed so far, so every contract either
+    converges or runs out of iterations. Converged contracts leave the working set.
+
+    :param price: Option prices, e.g. bid/ask mids.
+    :param tol: Absolute price error accepted.
+    :return: Array of volatilities; NaN for prices outside the no-arbitrage bounds, missing
+             inputs or contracts that did not converge.
+    """
+    scalar = np.ndim(price) == 0
+    price, spot, strike, years, is_call = (
+        array.ravel() if array.ndim else array.reshape(1)
+        for array in np.broadcast_arrays(
+            np.asarray(price, dtype=float),
+            np.asarray(spot, dtype=float),
+            np.asarray(strike, dtype=float),
+            np.asarray(years, dtype=float),
+            np.asarray(is_call, dtype=bool),
+        )
+    )
+    result = np.full(len(price), np.nan)
+
+    with np.errstate(invalid="ignore", over="ignore"):
+        spot_disc = spot * np.exp(-dividend * years)
+        strike_disc = strike * np.exp(-rate * years)
+        lower = np.where(is_call, np.maximum(spot_disc - strike_disc, 0.0), np.maximum(strike_disc - spot_disc, 0.0))
+        upper = np.where(is_call, spot_disc, strike_disc)
+        active = np.flatnonzero(
+            (years > 0) & (spot > 0) & (strike > 0) & (price > lower) & (price < upper)
+        )
+
+    # Brenner-Subrahmanyam's at-the-money estimate as the first guess
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sigma = np.clip(
+            np.sqrt(2.0 * np.pi / years[active]) * price[active] / spot[active], 0.05, 3.0
+        )
+    low = np.full(len(active), MIN_VOLATILITY)
+    high = np.full(len(active), MAX_VOLATILITY)
+
+    for _ in range(max_iter):
+        if not len(active):
+            break
+        greeks = black_scholes(
+            spot[active], strike[active], years[active], sigma, is_call[active], rate, dividend
+        )
+        error = greeks["price"] - price[active]
+        done = np.abs(error) < tol
+        result[active[done]] = sigma[done]
+
+        keep = ~done
+        active, sigma, error, low, high = active[keep], sigma[keep], error[keep], low[keep], high[keep]
+        vega = greeks["vega"][keep] * 100.0
+        high = np.where(error > 0, sigma, high)
+        low = np.where(error < 0, sigma, low)
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            step = sigma - error / vega
+        bisect = ~((step > low) & (step < high))
+        sigma = np.where(bisect, 0.5 * (low + high), step)
+
+        # A collapsed bracket pins the root down unless it lies beyond the searched range
+        stuck = high - low < 1e-12
+        inside = stuck & (low > MIN_VOLATILITY) & (high < MAX_VOLATILITY)
+        result[active[inside]] = sigma[inside]
+        active, sigma, low, high = active[~stuck], sigma[~stuck], low[~stuck], high[~stuck]
+
+    return result[0] if scalar else result
+
+
+def chain_greeks(chain, spot, as_of, rate=0.0, dividend=0.0, solve_iv=False):
+    """
+    Greeks of a whole chain snapshot in one batched call.
+
+    :param chain: Frame with the `options` table columns `strike`, `expiration_date`,
+                  `option_type` and `impliedVolatility` and/or `bid` and `ask`.
+    :param spot: Underlying price (scalar, or per row for several tickers).
+    :param as_of: Snapshot time (Timestamp or date string).
+    :param solve_iv: If True, implied volatility is solved from the bid/ask mid for every
+                     contract with a quote; otherwise only where `impliedVolatility` is
+                     missing or not positive.
+    :return: Frame aligned with `chain` with `years`, `mid`, `iv`, `price`, `delta`,
+             `gamma`, `vega` and `theta` (see `black_scholes` for units).
+    """
+    strike = chain["strike"].to_numpy(dtype=float)
+    years = years_to_expiry(chain["expiration_date"].to_numpy(), as_of)
+    codes, option_types = pd.factorize(chain["option_type"])
+    is_call = np.append(pd.Index(option_types, dtype=object).str.lower() == "call", False)[codes]
+
+    mid = np.full(len(chain), np.nan)
+    if "bid" in chain and "ask" in chain:
+        bid = pd.to_numeric(chain["bid"], errors="coerce").to_numpy(dtype=float)
+        ask = pd.to_numeric(chain["ask"], errors="coerce").to_numpy(dtype=float)
+        quoted = (bid > 0) & (ask >= bid)
+        mid[quoted] = (bid[quoted] + ask[quoted]) / 2
+
+    iv = np.full(len(chain), np.nan)
+    if "impliedVolatility" in chain:
+        iv = pd.to_numeric(chain["impliedVolatility"], errors="coerce").to_numpy(dtype=float).copy()
+    solve = ~np.isnan(mid) & (solve_iv | ~(iv > 0))
+    if solve.any():
+        iv[solve] = implied_volatility(
+            mid[solve],
+            np.broadcast_to(np.asarray(spot, dtype=float), len(chain))[solve],
+            strike[solve],
+            years[solve],
+            is_call[solve],
+            rate,
+            dividend,
+        )
+
+    greeks = black_scholes(spot, strike, years, iv, is_call, rate, dividend)
+    return pd.DataFrame({"years": years, "mid": mid, "iv": iv, **greeks}, index=chain.index)
@@ -0,0 +1,99 @@
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+import threading
+import time
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+
+class ChainSource(ABC):
+    """Where the fetcher gets option chains from. Implementations must be thread-safe."""
+
+    @abstractmethod
+    def expirations(self, ticker):
+        """Returns the listed expiration dates (YYYY-MM-DD) for a ticker."""
+
+    @abstractmethod
+    def option_chain(self, ticker, expiration_date):
+        """Returns `(calls, puts)` frames shaped like `yf.Ticker.option_chain`."""
+
+
+class YahooChainSource(ChainSource):
+    def expirations(self, ticker):
+        return list(yf.Ticker(ticker).options)
+
+    def option_chain(self, ticker, expiration_date):
+        # A fresh Ticker per request, so worker threads share no yfinance state
+        chain = yf.Ticker(ticker).option_chain(expiration_date)
+        return chain.calls, chain.puts
+
+
+class FakeChainSource(ChainSource):
+    def __init__(self, num_expirations=4, num_strikes=50, latency=0.0, failures=None, seed=0):
+        """
+        Deterministic local chain source for exercising the fetcher without Yahoo.
+
+        :param num_expirations: Weekly expirations listed per ticker.
+        :param num_strikes: Strikes per side of each chain.
+        :param latency: Seconds each request sleeps, to mimic network round trips.
+        :param failures: Dict mapping a request key (`ticker` for expirations,
+                         `(ticker, expiration_date)` for chains) to how many times it
+                         raises before succeeding; use a large count for a permanent failure.
+        :param seed: Seed for the generated prices.
+        """
+        self.num_expirations = num_expirations
+        self.num_strikes = num_strikes
+        self.latency = latency
+        self.failures = dict(failures or {})
+        self.seed = seed
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _request(self, key):
+        time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+            remaining = self.failures.get(key, 0)
+            if remaining:
+                self.failures[key] = remaining - 1
+        if remaining:
+            raise ConnectionError(f"Simulated failure for {key}")
+
+    def expirations(self, ticker):
+        self._request(ticker)
+        first = datetime(2025, 3, 7)
+        return [
+            (first + timedelta(days=7 * i)).strftime('%Y-%m-%d')
+            for i in range(self.num_expirations)
+        ]
+
+    def option_chain(self, ticker, expiration_date):
+        self._request((ticker, expiration_date))
+        rng = np.random.default_rng([self.seed, sum(map(ord, ticker + expiration_date))])
+        strikes = 100.0 + np.arange(self.num_strikes, dtype=float)
+        last_trade = pd.Timestamp('2025-03-05 15:59:00', tz='UTC')
+        expiry_code = expiration_date.replace('-', '')[2:]
+
+        def side(option_type):
+            n = len(strikes)
+            return pd.DataFrame({
+                'contractSymbol': [
+                    f'{ticker}{expiry_code}{option_type[0].upper()}{int(k * 1000):08d}' for k in strikes
+                ],
+                'lastTradeDate': last_trade,
+                'strike': strikes,
+                'lastPrice': rng.uniform(0.5, 20.0, n),
+                'bid': rng.uniform(0.4, 19.0, n),
+                'ask': rng.uniform(0.6, 21.0, n),
+                'change': rng.normal(0.0, 1.0, n),
+                'percentChange': rng.normal(0.0, 5.0, n),
+                'volume': rng.integers(0, 5000, n).astype(float),
+                'openInterest': rng.integers(0, 20000, n),
+                'impliedVolatility': rng.uniform(0.1, 1.5, n),
+                'inTheMoney': rng.integers(0, 2, n).astype(bool),
+                'contractSize': 'REGULAR',
+                'currency': 'USD',
+            })
+
+        return side('call'), side('put')
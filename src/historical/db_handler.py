@@ -1,7 +1,357 @@
+import re
 import sqlite3
+import numpy as np
 import pandas as pd
 import os
 import yaml
+import pyarrow as pa
+import pyarrow.parquet as pq
+from itertools import islice
+from src.historical.realized_volatility import compute_realized_volatility, DEFAULT_WINDOWS
+from src.historical.iv_context import (
+    compute_constant_maturity,
+    compute_iv_rank,
+    compute_term_structure,
+    DEFAULT_IV_WINDOWS,
+)
+
+
+OPTION_COLUMNS = [
+    'contractSymbol', 'lastTradeDate', 'strike', 'lastPrice', 'bid', 'ask', 'change',
+    'percentChange', 'volume', 'openInterest', 'impliedVolatility', 'inTheMoney',
+    'contractSize', 'currency', 'option_type', 'expiration_date', 'retrieval_date', 'ticker',
+]
+
+# Storage classes for the typed columns; everything else in OPTION_COLUMNS is TEXT
+REAL_COLUMNS = ['strike', 'lastPrice', 'bid', 'ask', 'change', 'percentChange', 'impliedVolatility']
+INTEGER_COLUMNS = ['volume', 'openInterest']
+BOOLEAN_COLUMNS = ['inTheMoney']
+
+# Legacy ingest stored `astype(str)` values, so missing numbers arrived as these strings
+MISSING_TEXT_VALUES = ('nan', 'NaN', 'None', 'NaT', '')
+
+UPSERT_QUERY = '''
+INSERT INTO options (
+    contractSymbol, lastTradeDate, strike, lastPrice, bid, ask, change,
+    percentChange, volume, openInterest, impliedVolatility, inTheMoney,
+    contractSize, currency, option_type, expiration_date, retrieval_date, ticker
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(contractSymbol, lastTradeDate) DO UPDATE SET
+    strike=excluded.strike,
+    lastPrice=excluded.lastPrice,
+    bid=excluded.bid,
+    ask=excluded.ask,
+    change=excluded.change,
+    percentChange=excluded.percentChange,
+    volume=excluded.volume,
+    openInterest=excluded.openInterest,
+    impliedVolatility=excluded.impliedVolatility,
+    inTheMoney=excluded.inTheMoney,
+    contractSize=excluded.contractSize,
+    currency=excluded.currency,
+    option_type=excluded.option_type,
+    expiration_date=excluded.expiration_date,
+    retrieval_date=excluded.retrieval_date,
+    ticker=excluded.ticker
+'''
+
+
+def _numeric_text(column):
+    # Text made only of number characters (with at least one digit); CAST would turn
+    # anything else into 0, where pd.to_numeric(errors='coerce') gives NaN
+    return f"(trim({column}) GLOB '*[0-9]*' AND trim({column}) NOT GLOB '*[^0-9.eE+-]*')"
+
+
+def _type_conversion_statements():
+    statements = []
+    for column in REAL_COLUMNS:
+        statements.append(f'''
+            UPDATE options
+            SET {column} = CASE WHEN {_numeric_text(column)} THEN CAST(trim({column}) AS REAL) ELSE NULL END
+            WHERE typeof({column}) = 'text'
+        ''')
+    for column in INTEGER_COLUMNS:
+        # Rounded like _to_db_rows, so migrated rows match freshly ingested ones
+        statements.append(f'''
+            UPDATE options
+            SET {column} = CASE WHEN typeof({column}) = 'real' THEN CAST(ROUND({column}) AS INTEGER)
+                                WHEN {_numeric_text(column)} THEN CAST(ROUND(CAST(trim({column}) AS REAL)) AS INTEGER)
+                                ELSE NULL END
+            WHERE typeof({column}) IN ('text', 'real')
+        ''')
+    for column in BOOLEAN_COLUMNS:
+        statements.append(f'''
+            UPDATE options
+            SET {column} = CASE WHEN {column} IN ('True', 'true', '1') THEN 1
+                                WHEN {column} IN ('False', 'false', '0') THEN 0
+                                ELSE NULL END
+            WHERE typeof({column}) = 'text'
+        ''')
+    return statements
+
+
+UNDERLYING_UPSERT_QUERY = '''
+INSERT INTO underlying_prices (ticker, date, open, high, low, close, volume)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(ticker, date) DO UPDATE SET
+    open=excluded.open,
+    high=excluded.high,
+    low=excluded.low,
+    close=excluded.close,
+    volume=excluded.volume
+'''
+
+REALIZED_VOL_UPSERT_QUERY = '''
+INSERT INTO realized_volatility (ticker, window, date, value)
+VALUES (?, ?, ?, ?)
+ON CONFLICT(ticker, window, date) DO UPDATE SET value=excluded.value
+'''
+
+IV_TERM_STRUCTURE_UPSERT_QUERY = '''
+INSERT INTO iv_term_structure (ticker, date, expiration_date, days_to_expiry, atm_iv)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(ticker, date, expiration_date) DO UPDATE SET
+    days_to_expiry=excluded.days_to_expiry,
+    atm_iv=excluded.atm_iv
+'''
+
+IV_RANK_UPSERT_QUERY = '''
+INSERT INTO iv_rank (ticker, window, date, atm_iv, iv_rank, iv_percentile)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(ticker, window, date) DO UPDATE SET
+    atm_iv=excluded.atm_iv,
+    iv_rank=excluded.iv_rank,
+    iv_percentile=excluded.iv_percentile
+'''
+
+# Served by idx_options_ticker_date, which covers every selected column
+IV_SNAPSHOT_QUERY = '''
+SELECT lastTradeDate, strike, expiration_date, option_type, impliedVolatility
+FROM options
+WHERE ticker = ? AND lastTradeDate >= ?
+'''
+
+# Served by idx_options_ticker_date (ticker, lastTradeDate range); the rest comes from the rows
+COMPACTION_CHUNK_QUERY = '''
+SELECT id, option_type, expiration_date, strike, lastTradeDate, lastPrice, bid, ask, volume,
+       openInterest, impliedVolatility, percentChange, change, inTheMoney
+FROM options
+WHERE ticker = ? AND lastTradeDate >= ? AND lastTradeDate < ?
+'''
+
+OPTIONS_DAILY_UPSERT_QUERY = '''
+INSERT INTO options_daily (
+    ticker, option_type, expiration_date, strike, date, open, high, low, close, volume,
+    open_interest, implied_volatility, percent_change, change, in_the_money, snapshots,
+    implied_volatility_count, percent_change_count, change_count
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(ticker, option_type, expiration_date, strike, date) DO UPDATE SET
+    open=excluded.open,
+    high=excluded.high,
+    low=excluded.low,
+    close=excluded.close,
+    volume=excluded.volume,
+    open_interest=excluded.open_interest,
+    implied_volatility=excluded.implied_volatility,
+    percent_change=excluded.percent_change,
+    change=excluded.change,
+    in_the_money=excluded.in_the_money,
+    snapshots=excluded.snapshots,
+    implied_volatility_count=excluded.implied_volatility_count,
+    percent_change_count=excluded.percent_change_count,
+    change_count=excluded.change_count
+'''
+
+COMPACTION_STATE_UPSERT_QUERY = '''
+INSERT INTO compaction_state (ticker, compacted_through, compacted_at) VALUES (?, ?, ?)
+ON CONFLICT(ticker) DO UPDATE SET
+    compacted_through=excluded.compacted_through,
+    compacted_at=excluded.compacted_at
+'''
+
+EXPORT_CHUNK_QUERY = '''
+SELECT * FROM options WHERE id > ? AND id <= ? ORDER BY id LIMIT ?
+'''
+
+EXPORT_STATE_UPSERT_QUERY = '''
+INSERT INTO export_state (target, last_id, exported_at) VALUES (?, ?, ?)
+ON CONFLICT(target) DO UPDATE SET last_id=excluded.last_id, exported_at=excluded.exported_at
+'''
+
+# Hive-style partition columns of the Parquet export; retrieval_day is derived from retrieval_date
+EXPORT_PARTITION_COLUMNS = ['ticker', 'retrieval_day']
+
+
+def _export_schema():
+    fields = [pa.field('id', pa.int64())]
+    for column in OPTION_COLUMNS:
+        if column in REAL_COLUMNS:
+            fields.append(pa.field(column, pa.float64()))
+        elif column in INTEGER_COLUMNS:
+            fields.append(pa.field(column, pa.int64()))
+        elif column in BOOLEAN_COLUMNS:
+            fields.append(pa.field(column, pa.bool_()))
+        else:
+            fields.append(pa.field(column, pa.string()))
+    fields.append(pa.field('retrieval_day', pa.string()))
+    return pa.schema(fields)
+
+
+# Fixed schema so every exported file agrees, even when a chunk has an all-NULL column
+EXPORT_SCHEMA = _export_schema()
+
+# In-place converter for databases written by the legacy `astype(str)` ingest
+TYPE_CONVERSION_STATEMENTS = _type_conversion_statements()
+
+# Versioned schema migrations, applied in order and tracked via PRAGMA user_version.
+# Each entry is (version, description, [statements]). Append new entries; never edit
+# or reorder existing ones once they have shipped.
+MIGRATIONS = [
+    (
+        1,
+        "contract lookup index for DataProvider._load_historical_contract",
+        [
+            '''
+            CREATE INDEX IF NOT EXISTS idx_options_contract
+            ON options (ticker, option_type, expiration_date, strike, lastTradeDate)
+            ''',
+        ],
+    ),
+    (
+        2,
+        "covering index for chain snapshots and first-contract-date lookups",
+        [
+            '''
+            CREATE INDEX IF NOT EXISTS idx_options_ticker_date
+            ON options (
+                ticker, lastTradeDate, strike, expiration_date, option_type,
+                volume, openInterest, impliedVolatility
+            )
+            ''',
+        ],
+    ),
+    (
+        3,
+        "convert legacy string-typed option fields to REAL/INTEGER/NULL",
+        TYPE_CONVERSION_STATEMENTS,
+    ),
+    (
+        4,
+        "underlying_prices table for local spot-price and realized-volatility lookups",
+        [
+            '''
+            CREATE TABLE IF NOT EXISTS underlying_prices (
+                ticker TEXT NOT NULL,
+                date TEXT NOT NULL,
+                open REAL,
+                high REAL,
+                low REAL,
+                close REAL,
+                volume INTEGER,
+                PRIMARY KEY (ticker, date)
+            ) WITHOUT ROWID
+            ''',
+        ],
+    ),
+    (
+        5,
+        "realized_volatility table keyed by (ticker, window, date)",
+        [
+            '''
+            CREATE TABLE IF NOT EXISTS realized_volatility (
+                ticker TEXT NOT NULL,
+                window INTEGER NOT NULL,
+                date TEXT NOT NULL,
+                value REAL,
+                PRIMARY KEY (ticker, window, date)
+            ) WITHOUT ROWID
+            ''',
+        ],
+    ),
+    (
+        6,
+        "export_state table holding the incremental export high-water mark per target",
+        [
+            '''
+            CREATE TABLE IF NOT EXISTS export_state (
+                target TEXT PRIMARY KEY,
+                last_id INTEGER NOT NULL,
+                exported_at TEXT
+            )
+            ''',
+        ],
+    ),
+    (
+        7,
+        "iv_term_structure and iv_rank tables maintained at ingest",
+        [
+            '''
+            CREATE TABLE IF NOT EXISTS iv_term_structure (
+                ticker TEXT NOT NULL,
+                date TEXT NOT NULL,
+                expiration_date TEXT NOT NULL,
+                days_to_expiry INTEGER,
+                atm_iv REAL,
+                PRIMARY KEY (ticker, date, expiration_date)
+            ) WITHOUT ROWID
+            ''',
+            '''
+            CREATE TABLE IF NOT EXISTS iv_rank (
+                ticker TEXT NOT NULL,
+                window INTEGER NOT NULL,
+                date TEXT NOT NULL,
+                atm_iv REAL,
+                iv_rank REAL,
+                iv_percentile REAL,
+                PRIMARY KEY (ticker, window, date)
+            ) WITHOUT ROWID
+            ''',
+        ],
+    ),
+    (
+        8,
+        "options_daily rollup and compaction_state tables for DBHandler.compact",
+        [
+            '''
+            CREATE TABLE IF NOT EXISTS options_daily (
+                ticker TEXT NOT NULL,
+                option_type TEXT NOT NULL,
+                expiration_date TEXT NOT NULL,
+                strike REAL NOT NULL,
+                date TEXT NOT NULL,
+                open REAL,
+                high REAL,
+                low REAL,
+                close REAL,
+                volume INTEGER,
+                open_interest INTEGER,
+                implied_volatility REAL,
+                percent_change REAL,
+                change REAL,
+                in_the_money BOOLEAN,
+                snapshots INTEGER,
+                PRIMARY KEY (ticker, option_type, expiration_date, strike, date)
+            ) WITHOUT ROWID
+            ''',
+            '''
+            CREATE TABLE IF NOT EXISTS compaction_state (
+                ticker TEXT PRIMARY KEY,
+                compacted_through TEXT NOT NULL,
+                compacted_at TEXT
+            )
+            ''',
+        ],
+    ),
+    (
+        9,
+        "non-null counts behind the options_daily means, for bars longer than a day",
+        [
+            'ALTER TABLE options_daily ADD COLUMN implied_volatility_count INTEGER',
+            'ALTER TABLE options_daily ADD COLUMN percent_change_count INTEGER',
+            'ALTER TABLE options_daily ADD COLUMN change_count INTEGER',
+        ],
+    ),
+]
 
 
 class DBHandler:
@@ -12,14 +362,30 @@ class DBHandler:
         
         os.makedirs(self.output_folder, exist_ok=True)
         
+        self.insert_batch_size = self.config.get('insert_batch_size', 5000)
+        self.journal_mode = self.config.get('journal_mode', 'WAL')
+        self.export_chunk_size = self.config.get('export_chunk_size', 100000)
+        self.compact_after_days = self.config.get('compact_after_days', 30)
+        self.drop_expired_after_days = self.config.get('drop_expired_after_days')
+        self.compact_chunk_days = self.config.get('compact_chunk_days', 7)
+
         self.conn = sqlite3.connect(self.db_name)
         self.cursor = self.conn.cursor()
+        self._configure_connection()
         self._create_table()
+        self.migrate()
 
     def _load_config(self, config_path):
         with open(config_path, 'r') as file:
             return yaml.safe_load(file)
 
+    def _configure_connection(self):
+        # Only takes effect on a new file; compact() converts existing ones with a full VACUUM
+        self.cursor.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        # WAL lets backtests read while the fetcher writes; NORMAL sync is safe under WAL
+        self.cursor.execute(f'PRAGMA journal_mode={self.journal_mode}')
+        self.cursor.execute('PRAGMA synchronous=NORMAL')
+
     def _create_table(self):
         self.cursor.execute('''
         CREATE TABLE IF NOT EXISTS options (
@@ -47,40 +413,283 @@ class DBHandler:
         ''')
         self.conn.commit()
 
-    def insert_data(self, data):
-        for _, row in data.iterrows():
-            self.cursor.execute('''
-            INSERT INTO options (
-                contractSymbol, lastTradeDate, strike, lastPrice, bid, ask, change,
-                percentChange, volume, openInterest, impliedVolatility, inTheMoney,
-                contractSize, currency, option_type, expiration_date, retrieval_date, ticker
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(contractSymbol, lastTradeDate) DO UPDATE SET
-                strike=excluded.strike,
-                lastPrice=excluded.lastPrice,
-                bid=excluded.bid,
-                ask=excluded.ask,
-                change=excluded.change,
-                percentChange=excluded.percentChange,
-                volume=excluded.volume,
-                openInterest=excluded.openInterest,
-                impliedVolatility=excluded.impliedVolatility,
-                inTheMoney=excluded.inTheMoney,
-                contractSize=excluded.contractSize,
-                currency=excluded.currency,
-                option_type=excluded.option_type,
-                expiration_date=excluded.expiration_date,
-                retrieval_date=excluded.retrieval_date,
-                ticker=excluded.ticker
-            ''', (
-                row['contractSymbol'], row['lastTradeDate'], row['strike'], row['lastPrice'],
-                row['bid'], row['ask'], row['change'], row['percentChange'], row['volume'],
-                row['openInterest'], row['impliedVolatility'], row['inTheMoney'],
-                row['contractSize'], row['currency'], row['option_type'], row['expiration_date'],
-                row['retrieval_date'], row['ticker']
-            ))
+    def _get_schema_version(self):
+        return self.cursor.execute('PRAGMA user_version').fetchone()[0]
+
+    def migrate(self):
+        """
+        Applies any pending schema migrations and refreshes planner statistics.
+
+        :return: List of migration versions applied during this call.
+        """
+        current_version = self._get_schema_version()
+        applied = []
+
+        for version, description, statements in MIGRATIONS:
+            if version <= current_version:
+                continue
+            with self.conn:
+                for statement in statements:
+                    self.conn.execute(statement)
+                # PRAGMA does not accept bound parameters; version is an int from MIGRATIONS
+                self.conn.execute(f'PRAGMA user_version = {int(version)}')
+            print(f"Applied migration {version}: {description}")
+            applied.append(version)
+
+        if applied:
+            self.analyze()
+
+        return applied
+
+    def analyze(self):
+        """Refreshes SQLite planner statistics so the new indexes are picked up."""
+        self.conn.execute('ANALYZE')
         self.conn.commit()
 
+    def explain_query_plan(self, query, params=None):
+        """
+        Returns the `EXPLAIN QUERY PLAN` detail lines for a query.
+
+        :param query: SQL query using `?` placeholders.
+        :param params: Bound parameters; defaults to NULL for every placeholder.
+        :return: List of plan detail strings.
+        """
+        if params is None:
+            numbered = [int(n) for n in re.findall(r'\?(\d+)', query)]
+            params = [None] * (max(numbered) if numbered else query.count('?'))
+        rows = self.conn.execute(f'EXPLAIN QUERY PLAN {query}', params).fetchall()
+        return [row[-1] for row in rows]
+
+    def check_query_plans(self, queries):
+        """
+        Verifies that every query reaches its table through an index.
+
+        Every `SCAN` of a table counts as a full scan, including `SCAN ... USING (COVERING)
+        INDEX`, which walks the whole index. Only `SEARCH` steps pass, plus scans of CTEs,
+        subqueries and constant VALUES lists, which are read in memory.
+
+        :param queries: Dict mapping a query name to its SQL text.
+        :return: Dict mapping each name to `{"uses_index": bool, "plan": [...]}`.
+        """
+        report = {}
+        for name, query in queries.items():
+            plan = self.explain_query_plan(query)
+            # CTEs and subqueries show up as CO-ROUTINE/MATERIALIZE and are scanned in memory
+            derived = {
+                match.group(2)
+                for match in (re.match(r'(CO-ROUTINE|MATERIALIZE) (\w+)', step) for step in plan)
+                if match
+            }
+            full_scans = [
+                step for step in plan
+                if (match := re.match(r'SCAN (TABLE )?(\w+)\b(?! CONSTANT ROWS)', step))
+                and match.group(2) not in derived
+            ]
+            report[name] = {'uses_index': not full_scans, 'plan': plan}
+        return report
+
+    def insert_data(self, data, bulk=True):
+        """
+        Upserts option rows into the `options` table.
+
+        :param data: DataFrame with the `OPTION_COLUMNS` columns.
+        :param bulk: If True, writes in `executemany` batches inside a single transaction;
+                     otherwise falls back to the legacy row-by-row path.
+        """
+        if not bulk:
+            self._insert_rows(data)
+            return
+
+        rows = self._to_db_rows(data)
+        with self.conn:
+            while True:
+                batch = list(islice(rows, self.insert_batch_size))
+                if not batch:
+                    break
+                self.conn.executemany(UPSERT_QUERY, batch)
+
+    def _insert_rows(self, data):
+        for row in self._to_db_rows(data):
+            self.cursor.execute(UPSERT_QUERY, row)
+        self.conn.commit()
+
+    def _to_db_rows(self, data):
+        """
+        Converts a chain frame into row tuples with native SQLite types.
+
+        Numbers stay REAL/INTEGER, booleans become 0/1 and anything missing becomes NULL,
+        so readers never have to parse strings. Frames cast with `astype(str)` are accepted too.
+        """
+        columns = []
+        for column in OPTION_COLUMNS:
+            series = data[column]
+            if column in REAL_COLUMNS:
+                values = pd.to_numeric(series, errors='coerce').astype(float)
+                columns.append(values.astype(object).where(values.notna(), None).tolist())
+            elif column in INTEGER_COLUMNS:
+                values = pd.to_numeric(series, errors='coerce').round().astype('Int64')
+                columns.append([None if pd.isna(v) else int(v) for v in values.tolist()])
+            elif column in BOOLEAN_COLUMNS:
+                values = series.astype(str).str.lower().map({'true': 1, 'false': 0, '1': 1, '0': 0})
+                columns.append(values.astype(object).where(values.notna(), None).tolist())
+            else:
+                values = series.astype(str)
+                columns.append(values.where(~values.isin(MISSING_TEXT_VALUES), None).tolist())
+        return zip(*columns)
+
+    def insert_underlying_prices(self, ticker, history):
+        """
+        Upserts daily underlying bars into `underlying_prices`.
+
+        :param ticker: Stock ticker symbol.
+        :param history: yfinance-style daily history (DatetimeIndex, Open/High/Low/Close/Volume).
+        :return: Number of rows written.
+        """
+        if history.empty:
+            return 0
+
+        index = history.index
+        if getattr(index, 'tz', None) is not None:
+            index = index.tz_localize(None)
+        dates = index.strftime('%Y-%m-%d')
+
+        rows = [
+            (ticker, date, *(None if pd.isna(v) else float(v) for v in prices),
+             None if pd.isna(volume) else int(volume))
+            for date, prices, volume in zip(
+                dates,
+                history[['Open', 'High', 'Low', 'Close']].itertuples(index=False, name=None),
+                history['Volume'],
+            )
+        ]
+        with self.conn:
+            self.conn.executemany(UNDERLYING_UPSERT_QUERY, rows)
+        return len(rows)
+
+    def get_last_underlying_date(self, ticker):
+        """Returns the most recent stored `underlying_prices` date for a ticker, or None."""
+        result = self.conn.execute(
+            'SELECT MAX(date) FROM underlying_prices WHERE ticker=?', (ticker,)
+        ).fetchone()
+        return result[0] if result else None
+
+    def refresh_realized_volatility(self, ticker, windows=DEFAULT_WINDOWS):
+        """
+        Recomputes `realized_volatility` rows for a ticker from `underlying_prices`.
+
+        Only dates from the last stored value onward are recomputed (that value may have
+        been based on a partial bar), so repeated calls stay cheap as history grows.
+
+        :param ticker: Stock ticker symbol.
+        :param windows: Calendar-day windows to maintain.
+        :return: Number of rows written.
+        """
+        windows = [int(window) for window in windows]
+        last_dates = [
+            self.conn.execute(
+                'SELECT MAX(date) FROM realized_volatility WHERE ticker=? AND window=?',
+                (ticker, window),
+            ).fetchone()[0]
+            for window in windows
+        ]
+        since = None if any(date is None for date in last_dates) else min(last_dates)
+
+        query = 'SELECT date, close FROM underlying_prices WHERE ticker=?'
+        params = [ticker]
+        if since is not None:
+            lookback = pd.Timestamp(since) - pd.Timedelta(days=max(windows))
+            query += ' AND date >= ?'
+            params.append(lookback.strftime('%Y-%m-%d'))
+
+        prices = pd.read_sql_query(query + ' ORDER BY date', self.conn, params=params, parse_dates=['date'])
+        closes = prices.set_index('date')['close']
+        if len(closes) < 2:
+            return 0
+
+        dates = None
+        if since is not None:
+            dates = pd.date_range(since, closes.index[-1] + pd.Timedelta(days=1), freq='D')
+
+        vol = compute_realized_volatility(closes, windows, dates)
+        rows = [
+            (ticker, int(window), date.strftime('%Y-%m-%d'), None if np.isnan(value) else float(value))
+            for date, window, value in vol[['date', 'window', 'value']].itertuples(index=False, name=None)
+        ]
+        with self.conn:
+            self.conn.executemany(REALIZED_VOL_UPSERT_QUERY, rows)
+        return len(rows)
+
+    def refresh_iv_context(self, ticker, windows=DEFAULT_IV_WINDOWS):
+        """
+        Updates `iv_term_structure` and `iv_rank` for a ticker after new option rows arrive.
+
+        Term structures are recomputed from the options stored since the last stored day
+        (that day may have gained snapshots), read through the covering index. Ranks only
+        need the compact term-structure table: the constant-maturity ATM IV of the days from
+        the last ranked one onward is ranked against the stored days before it.
+
+        :param ticker: Stock ticker symbol.
+        :param windows: Calendar-day lookbacks of the IV rank and percentile.
+        :return: Number of rows written to both tables.
+        """
+        windows = [int(window) for window in windows]
+        since = self.conn.execute(
+            'SELECT MAX(date) FROM iv_term_structure WHERE ticker=?', (ticker,)
+        ).fetchone()[0]
+
+        snapshots = pd.read_sql_query(
+            IV_SNAPSHOT_QUERY, self.conn, params=(ticker, since or ''), parse_dates=['lastTradeDate']
+        )
+        closes = pd.read_sql_query(
+            'SELECT date, close FROM underlying_prices WHERE ticker=? ORDER BY date',
+            self.conn, params=(ticker,), parse_dates=['date'],
+        ).set_index('date')['close']
+        term = compute_term_structure(snapshots, closes)
+        term_rows = [
+            (ticker, date.strftime('%Y-%m-%d'), expiration_date, int(days), float(atm_iv))
+            for date, expiration_date, days, atm_iv in term.itertuples(index=False, name=None)
+        ]
+
+        last_ranked = [
+            self.conn.execute(
+                'SELECT MAX(date) FROM iv_rank WHERE ticker=? AND window=?', (ticker, window)
+            ).fetchone()[0]
+            for window in windows
+        ]
+        rank_since = None if any(date is None for date in last_ranked) else min(last_ranked)
+        with self.conn:
+            self.conn.executemany(IV_TERM_STRUCTURE_UPSERT_QUERY, term_rows)
+
+            query = 'SELECT date, expiration_date, days_to_expiry, atm_iv FROM iv_term_structure WHERE ticker=?'
+            params = [ticker]
+            if rank_since is not None:
+                lookback = pd.Timestamp(rank_since) - pd.Timedelta(days=max(windows))
+                query += ' AND date > ?'
+                params.append(lookback.strftime('%Y-%m-%d'))
+            stored = pd.read_sql_query(query, self.conn, params=params, parse_dates=['date'])
+            atm_iv = compute_constant_maturity(stored)
+            dates = None if rank_since is None else atm_iv.index[atm_iv.index >= rank_since]
+            ranks = compute_iv_rank(atm_iv, windows, dates)
+            rank_rows = [
+                (ticker, int(window), date.strftime('%Y-%m-%d'),
+                 *(None if np.isnan(value) else float(value) for value in values))
+                for date, window, *values in ranks.itertuples(index=False, name=None)
+            ]
+            self.conn.executemany(IV_RANK_UPSERT_QUERY, rank_rows)
+        return len(term_rows) + len(rank_rows)
+
+    def convert_column_types(self):
+        """
+        Rewrites legacy string-typed numeric fields in place (also applied as migration 3).
+
+        :return: Number of rows touched.
+        """
+        touched = 0
+        with self.conn:
+            for statement in TYPE_CONVERSION_STATEMENTS:
+                touched += self.conn.execute(statement).rowcount
+        return touched
+
     def export_to_csv(self):
         csv_file = os.path.join(self.output_folder, 'options_data_export.csv')
         query = 'SELECT * FROM options'
@@ -88,5 +697,258 @@ class DBHandler:
         df.to_csv(csv_file, index=False)
         print(f"Data exported successfully to {csv_file}")
 
+    def export_to_parquet(self, target=None, chunk_size=None):
+        """
+        Appends options rows added since the previous export to a Parquet dataset
+        partitioned by ticker and retrieval day (`ticker=AAPL/retrieval_day=2025-03-05/`).
+
+        The high-water mark is the `options.id` of the last exported row, stored per target
+        in `export_state` and advanced after each chunk, so memory stays bounded by
+        `chunk_size` and an interrupted export resumes where it stopped. File names are
+        derived from the id range, so re-running a chunk overwrites rather than duplicates.
+        Rows updated in place by a later upsert keep their id and are not re-exported.
+
+        :param target: Dataset root; defaults to `<output_folder>/options_parquet`.
+        :param chunk_size: Rows read and written per chunk; defaults to `export_chunk_size`.
+        :return: Number of rows exported.
+        """
+        target = target or os.path.join(self.output_folder, 'options_parquet')
+        chunk_size = chunk_size or self.export_chunk_size
+
+        row = self.conn.execute('SELECT last_id FROM export_state WHERE target=?', (target,)).fetchone()
+        last_id = row[0] if row else 0
+        # Only export rows that existed when the export started
+        upper_id = self.conn.execute('SELECT MAX(id) FROM options').fetchone()[0] or 0
+
+        exported = 0
+        while last_id < upper_id:
+            chunk = pd.read_sql_query(
+                EXPORT_CHUNK_QUERY, self.conn, params=(last_id, upper_id, chunk_size)
+            )
+            if chunk.empty:
+                break
+
+            first_id, chunk_last_id = int(chunk['id'].iloc[0]), int(chunk['id'].iloc[-1])
+            pq.write_to_dataset(
+                self._to_export_table(chunk),
+                target,
+                partition_cols=EXPORT_PARTITION_COLUMNS,
+                basename_template=f'part-{first_id}-{chunk_last_id}-{{i}}.parquet',
+                existing_data_behavior='overwrite_or_ignore',
+            )
+
+            last_id = chunk_last_id
+            exported += len(chunk)
+            with self.conn:
+                self.conn.execute(
+                    EXPORT_STATE_UPSERT_QUERY,
+                    (target, last_id, pd.Timestamp.now().isoformat(sep=' ')),
+                )
+
+        print(f"Exported {exported} new rows to {target}")
+        return exported
+
+    def _to_export_table(self, chunk):
+        for column in REAL_COLUMNS:
+            chunk[column] = pd.to_numeric(chunk[column], errors='coerce').astype(float)
+        for column in INTEGER_COLUMNS:
+            chunk[column] = pd.to_numeric(chunk[column], errors='coerce').round().astype('Int64')
+        for column in BOOLEAN_COLUMNS:
+            chunk[column] = pd.to_numeric(chunk[column], errors='coerce').astype('boolean')
+        chunk['retrieval_day'] = chunk['retrieval_date'].str.slice(0, 10).fillna('unknown')
+        return pa.Table.from_pandas(chunk[EXPORT_SCHEMA.names], schema=EXPORT_SCHEMA, preserve_index=False)
+
+    def compact(self, compact_after_days=None, drop_expired_after_days=None, vacuum=True, as_of=None):
+        """
+        Retention job: rolls old intraday snapshots up into `options_daily`, optionally
+        drops long-expired contracts, then returns the freed pages to the filesystem.
+
+        For every contract and every day older than `compact_after_days`, `options_daily`
+        gets one row aggregated like `DataProvider`'s 1D bars, and `options` keeps only the
+        day's first snapshot, its last one and its last one with known volume and open
+        interest. Reads at day boundaries are therefore unchanged: `chain_as_of` at any
+        time outside a compacted day's trading span, `first_contract_date`, the daily IV
+        term structure, and `DataProvider` bars of a day or longer, which serve compacted
+        days from `options_daily` (see `StorageBackend.load_daily`). Shorter bars of a
+        compacted day only see the snapshots kept. Rows newer than the cutoff are untouched.
+        Each day is rolled up once (tracked in `compaction_state`); snapshots that arrive
+        later for a compacted day stay in `options`, but daily bars keep using its rollup.
+
+        :param compact_after_days: Age in days past which a day is compacted; defaults to
+                                   `compact_after_days` (None disables the rollup).
+        :param drop_expired_after_days: Delete contracts that expired more than this many
+                                        days ago from `options` and `options_daily`;
+                                        defaults to `drop_expired_after_days` (None keeps them).
+        :param vacuum: Run an incremental vacuum afterwards (see `vacuum`).
+        :param as_of: Reference time of the cutoffs; defaults to now.
+        :return: Dict with `snapshots_removed`, `daily_rows`, `expired_rows`, `bytes_before`,
+                 `bytes_after` and `bytes_reclaimed`.
+        """
+        if compact_after_days is None:
+            compact_after_days = self.compact_after_days
+        if drop_expired_after_days is None:
+            drop_expired_after_days = self.drop_expired_after_days
+        as_of = pd.Timestamp(as_of) if as_of is not None else pd.Timestamp.now()
+
+        bytes_before = self._database_bytes()
+        tickers = [row[0] for row in self.conn.execute('SELECT DISTINCT ticker FROM options')]
+
+        removed = daily_rows = 0
+        if compact_after_days is not None:
+            cutoff = (as_of.normalize() - pd.Timedelta(days=int(compact_after_days))).strftime('%Y-%m-%d')
+            for ticker in tickers:
+                ticker_removed, ticker_daily = self._compact_ticker(ticker, cutoff)
+                removed += ticker_removed
+                daily_rows += ticker_daily
+
+        expired = 0
+        if drop_expired_after_days is not None:
+            horizon = (as_of.normalize() - pd.Timedelta(days=int(drop_expired_after_days))).strftime('%Y-%m-%d')
+            with self.conn:
+                for ticker in tickers:
+                    expired += self.conn.execute(
+                        'DELETE FROM options WHERE ticker=? AND expiration_date < ?', (ticker, horizon)
+                    ).rowcount
+                    self.conn.execute(
+                        'DELETE FROM options_daily WHERE ticker=? AND expiration_date < ?', (ticker, horizon)
+                    )
+
+        if removed or expired:
+            self.analyze()
+        if vacuum:
+            self.vacuum()
+        bytes_after = self._database_bytes()
+
+        print(
+            f"Compacted {removed} snapshots into {daily_rows} daily rows, dropped {expired} expired rows; "
+            f"reclaimed {bytes_before - bytes_after} bytes ({bytes_before} -> {bytes_after})"
+        )
+        return {
+            'snapshots_removed': removed,
+            'daily_rows': daily_rows,
+            'expired_rows': expired,
+            'bytes_before': bytes_before,
+            'bytes_after': bytes_after,
+            'bytes_reclaimed': bytes_before - bytes_after,
+        }
+
+    def _compact_ticker(self, ticker, cutoff):
+        row = self.conn.execute(
+            'SELECT compacted_through FROM compaction_state WHERE ticker=?', (ticker,)
+        ).fetchone()
+        since = row[0] if row else None
+        if since is None:
+            first = self.conn.execute(
+                'SELECT MIN(lastTradeDate) FROM options WHERE ticker=?', (ticker,)
+            ).fetchone()[0]
+            if first is None:
+                return 0, 0
+            since = first[:10]
+
+        removed = daily_rows = 0
+        chunk_days = pd.Timedelta(days=int(self.compact_chunk_days))
+        start = pd.Timestamp(since)
+        while start.strftime('%Y-%m-%d') < cutoff:
+            end = min(start + chunk_days, pd.Timestamp(cutoff)).strftime('%Y-%m-%d')
+            snapshots = pd.read_sql_query(
+                COMPACTION_CHUNK_QUERY, self.conn, params=(ticker, start.strftime('%Y-%m-%d'), end)
+            )
+            daily, drop_ids = self._rollup_snapshots(snapshots)
+            rows = [
+                (ticker, *(None if pd.isna(value) else value for value in values))
+                for values in daily.itertuples(index=False, name=None)
+            ]
+            # The rollup, the deletes and the high-water mark commit together, so an
+            # interrupted run resumes at the first day that was not rolled up
+            with self.conn:
+                self.conn.executemany(OPTIONS_DAILY_UPSERT_QUERY, rows)
+                self.conn.executemany('DELETE FROM options WHERE id = ?', ((int(i),) for i in drop_ids))
+                self.conn.execute(
+                    COMPACTION_STATE_UPSERT_QUERY, (ticker, end, pd.Timestamp.now().isoformat(sep=' '))
+                )
+            removed += len(drop_ids)
+            daily_rows += len(rows)
+            start = pd.Timestamp(end)
+        return removed, daily_rows
+
+    def _rollup_snapshots(self, snapshots):
+        """
+        Daily rows of a chunk of raw snapshots (aggregated like `DataProvider._to_ohlcv` at
+        1D) and the ids of the snapshots `compact` no longer needs.
+        """
+        keys = ['option_type', 'expiration_date', 'strike', 'date']
+        if snapshots.empty:
+            return pd.DataFrame(columns=keys), []
+
+        # lastTradeDate text sorts chronologically; id breaks ties like AS_OF_CHAIN_QUERY
+        df = snapshots.sort_values(['lastTradeDate', 'id'], kind='mergesort')
+        df['date'] = df['lastTradeDate'].str.slice(0, 10)
+        for column in REAL_COLUMNS + INTEGER_COLUMNS + BOOLEAN_COLUMNS:
+            if column in df:
+                df[column] = pd.to_numeric(df[column], errors='coerce')
+        df['open'] = df[['bid', 'ask']].mean(axis=1).fillna(df['lastPrice'])
+        df['high'] = df[['lastPrice', 'bid', 'ask']].max(axis=1)
+        df['low'] = df[['lastPrice', 'bid', 'ask']].min(axis=1)
+
+        daily = df.groupby(keys, sort=True).agg(
+            open=('open', 'first'),
+            high=('high', 'max'),
+            low=('low', 'min'),
+            close=('lastPrice', 'last'),
+            volume=('volume', 'sum'),
+            open_interest=('openInterest', 'sum'),
+            implied_volatility=('impliedVolatility', 'mean'),
+            percent_change=('percentChange', 'mean'),
+            change=('change', 'mean'),
+            in_the_money=('inTheMoney', 'last'),
+            snapshots=('id', 'size'),
+            implied_volatility_count=('impliedVolatility', 'count'),
+            percent_change_count=('percentChange', 'count'),
+            change_count=('change', 'count'),
+        ).reset_index()
+        counts = ['implied_volatility_count', 'percent_change_count', 'change_count']
+        for column in ['volume', 'open_interest', 'snapshots', *counts]:
+            daily[column] = daily[column].astype(np.int64).astype(object)
+        daily['in_the_money'] = daily['in_the_money'].astype(object)
+
+        complete = df[df['volume'].notna() & df['openInterest'].notna()]
+        keep = pd.concat([
+            df.drop_duplicates(keys, keep='first')['id'],
+            df.drop_duplicates(keys, keep='last')['id'],
+            complete.drop_duplicates(keys, keep='last')['id'],
+        ])
+        drop_ids = df.loc[~df['id'].isin(keep), 'id'].tolist()
+        return daily, drop_ids
+
+    def vacuum(self, pages=None):
+        """
+        Returns free pages to the filesystem and truncates the WAL.
+
+        Databases created before auto_vacuum was enabled get a one-time full VACUUM
+        (which rewrites the file and needs as much free disk) to switch them to
+        incremental mode; after that only the free pages are released.
+
+        :param pages: Maximum number of pages to release; None releases all of them.
+        :return: Number of bytes reclaimed.
+        """
+        bytes_before = self._database_bytes()
+        self.conn.commit()
+        if self.conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+            self.conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+            self.conn.execute('VACUUM')
+        else:
+            # Each step of the pragma releases one page and execute() only takes the first
+            # step of a statement without result columns; executescript runs it to the end
+            self.conn.executescript(f'PRAGMA incremental_vacuum({int(pages) if pages else 0});')
+        self.conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchall()
+        return bytes_before - self._database_bytes()
+
+    def _database_bytes(self):
+        return sum(
+            os.path.getsize(path)
+            for path in (self.db_name, f'{self.db_name}-wal')
+            if os.path.exists(path)
+        )
+
     def close_connection(self):
         self.conn.close()
@@ -0,0 +1,172 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import queue
+import random
+import threading
+import time
+import pandas as pd
+
+
+class RateLimiter:
+    def __init__(self, rate, burst=1):
+        """
+        Thread-safe token bucket shared by every fetch worker.
+
+        :param rate: Requests allowed per second on average.
+        :param burst: Requests that may go out back to back after an idle period.
+        """
+        if rate is None or float(rate) <= 0:
+            raise ValueError(f"Rate limit must be a positive number of requests per second, got {rate!r}")
+        self.rate = float(rate)
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def call_with_retries(func, *args, retries=3, backoff=1.0, max_backoff=30.0, rate_limiter=None):
+    """
+    Calls `func(*args)`, retrying failures with jittered exponential backoff.
+
+    :param retries: Retries after the first attempt; the last error is re-raised.
+    :param backoff: Base delay in seconds, doubled after every failed attempt.
+    :param max_backoff: Upper bound on a single delay.
+    :param rate_limiter: Optional `RateLimiter` every attempt (including retries) goes through.
+    """
+    for attempt in range(retries + 1):
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        try:
+            return func(*args)
+        except Exception:
+            if attempt == retries:
+                raise
+            delay = min(max_backoff, backoff * 2 ** attempt)
+            time.sleep(delay * random.uniform(0.5, 1.0))
+
+
+def prepare_chain(ticker, expiration_date, calls, puts, retrieval_date=None):
+    """Adds the metadata columns stored with every chain and combines calls and puts."""
+    calls = calls.copy()
+    puts = puts.copy()
+
+    # Add metadata to the DataFrame
+    calls['option_type'] = 'call'
+    puts['option_type'] = 'put'
+    calls['expiration_date'] = expiration_date
+    puts['expiration_date'] = expiration_date
+
+    # Combine calls and puts
+    options_data = pd.concat([calls, puts])
+
+    # Add current timestamp
+    options_data['retrieval_date'] = retrieval_date or datetime.now()
+    if getattr(options_data['lastTradeDate'].dt, 'tz', None) is not None:
+        options_data['lastTradeDate'] = options_data['lastTradeDate'].dt.tz_localize(None)
+    options_data['ticker'] = ticker
+    return options_data
+
+
+class ChainFetcher:
+    def __init__(self, source, max_workers=8, requests_per_second=5.0, retries=3, backoff=1.0):
+        """
+        Fetches option chains for many tickers concurrently.
+
+        Worker threads issue `source` requests through one shared `RateLimiter`, each with
+        its own retries, and hand results back over a queue. The thread calling `fetch`
+        is the only writer, so the SQLite connection never leaves it. A failing
+        expiration is reported and skipped without dropping the rest of its ticker.
+
+        :param source: `ChainSource` to fetch from.
+        :param max_workers: Concurrent requests in flight.
+        :param requests_per_second: Global request rate across all workers; None or 0 means
+                                    no limit.
+        :param retries: Retries per request before it is reported as failed.
+        :param backoff: Base retry delay in seconds.
+        """
+        self.source = source
+        self.max_workers = max_workers
+        self.rate_limiter = (
+            RateLimiter(requests_per_second, burst=max_workers) if requests_per_second else None
+        )
+        self.retries = retries
+        self.backoff = backoff
+
+    def _request(self, func, *args):
+        return call_with_retries(
+            func, *args, retries=self.retries, backoff=self.backoff, rate_limiter=self.rate_limiter
+        )
+
+    def _fetch_expirations(self, ticker, results):
+        try:
+            results.put(('expirations', ticker, None, self._request(self.source.expirations, ticker)))
+        except Exception as e:
+            results.put(('error', ticker, None, e))
+
+    def _fetch_chain(self, ticker, expiration_date, results):
+        try:
+            calls, puts = self._request(self.source.option_chain, ticker, expiration_date)
+            results.put(('chain', ticker, expiration_date, prepare_chain(ticker, expiration_date, calls, puts)))
+        except Exception as e:
+            results.put(('error', ticker, expiration_date, e))
+
+    def fetch(self, tickers, write):
+        """
+        Fetches every expiration of every ticker and writes each ticker's chains as one frame.
+
+        :param tickers: Ticker symbols to fetch.
+        :param write: Callback receiving `(ticker, frame)`; runs on the calling thread only.
+        :return: Dict mapping each ticker to `{"chains", "rows", "errors"}`.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        report = {ticker: {'chains': 0, 'rows': 0, 'errors': []} for ticker in tickers}
+        buffers = {ticker: [] for ticker in tickers}
+        outstanding = {ticker: 1 for ticker in tickers}
+        results = queue.Queue()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for ticker in tickers:
+                pool.submit(self._fetch_expirations, ticker, results)
+
+            pending = len(tickers)
+            while pending:
+                kind, ticker, expiration_date, payload = results.get()
+                pending -= 1
+                outstanding[ticker] -= 1
+
+                if kind == 'expirations':
+                    for exp_date in payload:
+                        pool.submit(self._fetch_chain, ticker, exp_date, results)
+                    pending += len(payload)
+                    outstanding[ticker] += len(payload)
+                elif kind == 'chain':
+                    buffers[ticker].append(payload)
+                    report[ticker]['chains'] += 1
+                else:
+                    what = f"{ticker} {expiration_date}" if expiration_date else ticker
+                    report[ticker]['errors'].append(f"{what}: {payload}")
+
+                # Every request for this ticker has come back; write it in one transaction
+                if outstanding[ticker] == 0 and buffers[ticker]:
+                    frame = pd.concat(buffers.pop(ticker))
+                    buffers[ticker] = []
+                    try:
+                        write(ticker, frame)
+                        report[ticker]['rows'] = len(frame)
+                    except Exception as e:
+                        report[ticker]['errors'].append(f"{ticker} write: {e}")
+
+        return report
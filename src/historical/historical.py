@@ -1,41 +1,72 @@
 from src.historical.db_handler import DBHandler
+from src.historical.realized_volatility import DEFAULT_WINDOWS
+from src.historical.iv_context import DEFAULT_IV_WINDOWS
+from src.historical.chain_source import YahooChainSource
+from src.historical.fetcher import ChainFetcher
 import yfinance as yf
-from datetime import datetime
-import pandas as pd
 
 class HistoricalDataHandler(DBHandler):
-    def __init__(self, config_path='config.yaml'):
+    def __init__(self, config_path='config.yaml', chain_source=None):
         super().__init__(config_path)
+        self.chain_source = chain_source or YahooChainSource()
         self.stock_list = self.config['stocks']
+        self.realized_vol_windows = self.config.get('realized_vol_windows', DEFAULT_WINDOWS)
+        self.iv_rank_windows = self.config.get('iv_rank_windows', DEFAULT_IV_WINDOWS)
 
     def fetch_and_store_options_data(self):
-        for ticker_symbol in self.stock_list:
-            try:
-                ticker = yf.Ticker(ticker_symbol)
-                expiration_dates = ticker.options
-                for exp_date in expiration_dates:
-                    options = ticker.option_chain(exp_date)
-                    calls = options.calls
-                    puts = options.puts
+        """
+        Fetches every ticker's option chains concurrently and stores each ticker in one
+        transaction. Tuned by `fetch_workers`, `fetch_rate_limit` (requests per second),
+        `fetch_retries` and `fetch_backoff` in the config. The IV context of the new rows
+        is derived by `fetch_and_store_underlying_prices`, once the day's closes are stored.
+        """
+        fetcher = ChainFetcher(
+            self.chain_source,
+            max_workers=self.config.get('fetch_workers', 8),
+            requests_per_second=self.config.get('fetch_rate_limit', 5.0),
+            retries=self.config.get('fetch_retries', 3),
+            backoff=self.config.get('fetch_backoff', 1.0),
+        )
+        report = fetcher.fetch(self.stock_list, lambda ticker, chain: self.insert_data(chain))
 
-                    # Add metadata to the DataFrame
-                    calls['option_type'] = 'call'
-                    puts['option_type'] = 'put'
-                    calls['expiration_date'] = exp_date
-                    puts['expiration_date'] = exp_date
+        for ticker_symbol, result in report.items():
+            for error in result['errors']:
+                print(f"An error occurred for {error}")
+            if result['rows']:
+                print(
+                    f"Options data for {ticker_symbol} fetched and stored successfully "
+                    f"({result['chains']} expirations, {result['rows']} rows)."
+                )
+        return report
 
-                    # Combine calls and puts
-                    options_data = pd.concat([calls, puts])
+    def fetch_and_store_underlying_prices(self):
+        """
+        Backfills `underlying_prices` for tickers with no stored history and
+        incrementally appends new daily bars for the rest. Each ticker's realized volatility
+        and IV context (`iv_term_structure` and `iv_rank`, whose ATM strikes are placed
+        around the stored close) are then updated, so run this after
+        `fetch_and_store_options_data`. A ticker whose prices could not be fetched keeps its
+        IV context until the next run.
+        """
+        backfill_start = self.config.get('underlying_backfill_start', '2020-01-01')
 
-                    # Add current timestamp
-                    options_data['retrieval_date'] = datetime.now()
-                    options_data['lastTradeDate'] = options_data['lastTradeDate'].dt.tz_localize(None)
-                    options_data['ticker'] = ticker_symbol
+        for ticker_symbol in self.stock_list:
+            try:
+                last_date = self.get_last_underlying_date(ticker_symbol)
+                # Re-fetch the last stored day so a partial intraday bar gets finalised
+                start = last_date if last_date else backfill_start
 
-                    # Insert data into the database
-                    self.insert_data(options_data.astype(str))
+                history = yf.Ticker(ticker_symbol).history(start=start, interval='1d')
+                stored = self.insert_underlying_prices(ticker_symbol, history)
+                self.refresh_realized_volatility(ticker_symbol, self.realized_vol_windows)
 
-                print(f"Options data for {ticker_symbol} fetched and stored successfully.")
+                print(f"Underlying prices for {ticker_symbol}: {stored} rows stored from {start}.")
 
             except Exception as e:
-                print(f"An error occurred for {ticker_symbol}: {e}")
+                print(f"An error occurred fetching prices for {ticker_symbol}: {e}")
+                continue
+
+            try:
+                self.refresh_iv_context(ticker_symbol, self.iv_rank_windows)
+            except Exception as e:
+                print(f"An error occurred updating IV context for {ticker_symbol}: {e}")
@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+
+
+DEFAULT_IV_WINDOWS = (30, 90, 365)
+
+# Days to expiry of the constant-maturity ATM IV that is ranked
+TARGET_DAYS = 30
+
+
+def compute_term_structure(snapshots, closes):
+    """
+    ATM implied volatility of every expiration on every day, in one vectorized pass.
+
+    Each contract contributes its last observation of the day; call and put IVs at a
+    strike are averaged (missing or non-positive IVs are ignored), and the ATM IV is
+    interpolated linearly in strike between the strikes around the day's close (the
+    nearest strike when the close lies outside the chain).
+
+    :param snapshots: Frame with `lastTradeDate` (timestamps), `strike`, `expiration_date`,
+                      `option_type` and `impliedVolatility`.
+    :param closes: Series of underlying closes indexed by naive daily timestamps; each day
+                   uses the latest close on or before it.
+    :return: DataFrame with columns `date`, `expiration_date`, `days_to_expiry`, `atm_iv`,
+             sorted by date and expiration.
+    """
+    columns = ["date", "expiration_date", "days_to_expiry", "atm_iv"]
+    df = snapshots.assign(
+        date=pd.to_datetime(snapshots["lastTradeDate"]).dt.normalize(),
+        option_type=snapshots["option_type"].str.lower(),
+        impliedVolatility=pd.to_numeric(snapshots["impliedVolatility"], errors="coerce"),
+    )
+    df = df.sort_values("lastTradeDate", kind="mergesort").drop_duplicates(
+        ["date", "option_type", "expiration_date", "strike"], keep="last"
+    )
+    df = df[(df["impliedVolatility"] > 0) & (df["expiration_date"] >= df["date"].dt.strftime("%Y-%m-%d"))]
+
+    closes = closes.dropna().sort_index()
+    if df.empty or closes.empty:
+        return pd.DataFrame(columns=columns)
+
+    strikes = (
+        df.groupby(["date", "expiration_date", "strike"], sort=True)["impliedVolatility"]
+        .mean()
+        .rename("iv")
+        .reset_index()
+    )
+    spots = pd.DataFrame({"date": closes.index.normalize().astype("datetime64[ns]"), "spot": closes.to_numpy(dtype=float)})
+    strikes["date"] = strikes["date"].astype("datetime64[ns]")
+    strikes = pd.merge_asof(strikes, spots, on="date").dropna(subset=["spot"])
+    if strikes.empty:
+        return pd.DataFrame(columns=columns)
+
+    # Strikes are sorted within each expiration: the last one below spot and the first above
+    keys = ["date", "expiration_date"]
+    below = strikes["strike"] <= strikes["spot"]
+    lower = strikes[below].groupby(keys)[["strike", "iv", "spot"]].last()
+    upper = strikes[~below].groupby(keys)[["strike", "iv", "spot"]].first()
+    bracket = lower.join(upper, how="outer", lsuffix="_lo", rsuffix="_hi")
+
+    spot = bracket["spot_lo"].fillna(bracket["spot_hi"])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        weight = (spot - bracket["strike_lo"]) / (bracket["strike_hi"] - bracket["strike_lo"])
+    atm_iv = (bracket["iv_lo"] + weight * (bracket["iv_hi"] - bracket["iv_lo"]))
+    atm_iv = atm_iv.fillna(bracket["iv_lo"]).fillna(bracket["iv_hi"])
+
+    term = atm_iv.rename("atm_iv").reset_index()
+    term["days_to_expiry"] = (pd.to_datetime(term["expiration_date"]) - term["date"]).dt.days
+    return term[columns]
+
+
+def compute_constant_maturity(term, target_days=TARGET_DAYS):
+    """
+    Daily ATM IV at a fixed time to expiry, interpolated linearly in total variance
+    (`iv**2 * days`) between the expirations around `target_days` and held flat beyond
+    the nearest or farthest one. Expirations with no days left are skipped.
+
+    :param term: Frame from `compute_term_structure`.
+    :return: Series of ATM IVs indexed by date.
+    """
+    term = term[term["days_to_expiry"] > 0].sort_values(["date", "days_to_expiry"], kind="mergesort")
+    if term.empty:
+        return pd.Series(dtype=float, name="atm_iv")
+
+    near = term["days_to_expiry"] <= target_days
+    lower = term[near].groupby("date")[["days_to_expiry", "atm_iv"]].last()
+    upper = term[~near].groupby("date")[["days_to_expiry", "atm_iv"]].first()
+    bracket = lower.join(upper, how="outer", lsuffix="_lo", rsuffix="_hi")
+
+    var_lo = bracket["atm_iv_lo"] ** 2 * bracket["days_to_expiry_lo"]
+    var_hi = bracket["atm_iv_hi"] ** 2 * bracket["days_to_expiry_hi"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        weight = (target_days - bracket["days_to_expiry_lo"]) / (
+            bracket["days_to_expiry_hi"] - bracket["days_to_expiry_lo"]
+        )
+        interpolated = np.sqrt((var_lo + weight * (var_hi - var_lo)) / target_days)
+    atm_iv = interpolated.fillna(bracket["atm_iv_lo"]).fillna(bracket["atm_iv_hi"])
+    atm_iv.index = pd.DatetimeIndex(atm_iv.index)
+    return atm_iv.rename("atm_iv")
+
+
+def compute_iv_rank(atm_iv, windows=DEFAULT_IV_WINDOWS, dates=None):
+    """
+    IV rank and IV percentile of a daily ATM IV series over several lookbacks.
+
+    For `date` and `window`, the lookback holds the observations dated in
+    `(date - window days, date]`. The rank is `(iv - min) / (max - min)` (NaN when they are
+    equal); the percentile is the share of the other observations in the lookback below `iv`
+    (NaN with fewer than two).
+
+    :param atm_iv: Series indexed by naive daily timestamps (see `compute_constant_maturity`).
+    :param windows: Calendar-day lookbacks.
+    :param dates: Optional subset of `atm_iv`'s dates to return.
+    :return: DataFrame with columns `date`, `window`, `atm_iv`, `iv_rank`, `iv_percentile`.
+    """
+    atm_iv = atm_iv.dropna().sort_index()
+    frames = []
+    for window in windows:
+        rolling = atm_iv.rolling(f"{int(window)}D")
+        low, high = rolling.min(), rolling.max()
+        count = rolling.count()
+        below = rolling.rank(method="min") - 1
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rank = np.where(high != low, (atm_iv - low) / (high - low), np.nan)
+            percentile = np.where(count >= 2, below / (count - 1), np.nan)
+        frames.append(
+            pd.DataFrame(
+                {
+                    "date": atm_iv.index,
+                    "window": int(window),
+                    "atm_iv": atm_iv.to_numpy(),
+                    "iv_rank": rank,
+                    "iv_percentile": percentile,
+                }
+            )
+        )
+
+    result = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(
+        columns=["date", "window", "atm_iv", "iv_rank", "iv_percentile"]
+    )
+    if dates is not None:
+        result = result[result["date"].isin(pd.DatetimeIndex(dates))].reset_index(drop=True)
+    return result
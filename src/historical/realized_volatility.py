@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+
+DEFAULT_WINDOWS = (7, 20, 60)
+
+
+def compute_realized_volatility(closes, windows=DEFAULT_WINDOWS, dates=None):
+    """
+    Computes annualized close-to-close realized volatility for several windows in one pass.
+
+    The value for `date` and `window` uses the closes dated in `[date - window days, date)`,
+    exactly like `StraddleSelector._compute_realized_volatility`: daily returns between
+    consecutive closes inside the window, sample standard deviation, scaled by sqrt(252).
+
+    :param closes: Series of closing prices indexed by naive daily timestamps.
+    :param windows: Calendar-day window lengths.
+    :param dates: Dates to evaluate; defaults to every calendar day from the day after the
+                  first close through the day after the last close.
+    :return: DataFrame with columns `date`, `window`, `value` (NaN with fewer than two returns).
+    """
+    closes = closes.dropna().sort_index()
+    if len(closes) < 2:
+        return pd.DataFrame(columns=["date", "window", "value"])
+
+    close_dates = closes.index.normalize().values
+    prices = closes.to_numpy(dtype=float)
+
+    if dates is None:
+        dates = pd.date_range(
+            closes.index[0].normalize() + pd.Timedelta(days=1),
+            closes.index[-1].normalize() + pd.Timedelta(days=1),
+            freq="D",
+        )
+    dates = pd.DatetimeIndex(dates)
+
+    # Prefix sums of returns and squared returns give O(1) window moments
+    returns = prices[1:] / prices[:-1] - 1
+    cum_sum = np.concatenate(([0.0], np.cumsum(returns)))
+    cum_sq = np.concatenate(([0.0], np.cumsum(returns**2)))
+
+    hi = np.searchsorted(close_dates, dates.values, side="left")
+
+    frames = []
+    for window in windows:
+        lo = np.searchsorted(
+            close_dates, (dates - pd.Timedelta(days=window)).values, side="left"
+        )
+        # Closes lo..hi-1 are in the window; returns ending at closes lo+1..hi-1 are usable
+        count = np.maximum(hi - 1 - lo, 0)
+        end = np.maximum(hi - 1, lo)
+        total = cum_sum[end] - cum_sum[lo]
+        total_sq = cum_sq[end] - cum_sq[lo]
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            variance = (total_sq - total**2 / count) / (count - 1)
+        variance = np.where(count >= 2, np.maximum(variance, 0.0), np.nan)
+
+        frames.append(
+            pd.DataFrame(
+                {
+                    "date": dates,
+                    "window": window,
+                    "value": np.sqrt(variance) * np.sqrt(252),
+                }
+            )
+        )
+
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,420 @@
+import asyncio
+import math
+import time
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from src.data_provider import contract_key
+from src.storage import CONTRACT_COLUMNS
+
+
+# Per-bar columns, as produced by `DataProvider._to_ohlcv` and `_combine_legs`
+BAR_COLUMNS = [
+    "Open", "High", "Low", "Close", "volume", "openInterest", "impliedVolatility",
+    "percentChange", "change", "inTheMoney",
+]
+
+# One quote event: `time` is in nanoseconds since the epoch, `key` is `contract_key(contract)`
+Quote = namedtuple(
+    "Quote",
+    ["time", "key", "close", "bid", "ask", "volume", "open_interest", "implied_volatility",
+     "percent_change", "change", "in_the_money"],
+)
+
+# A completed bar: `time` is the bar's start as a Timestamp, then `BAR_COLUMNS`
+Bar = namedtuple("Bar", ["time", *BAR_COLUMNS])
+
+_NAN_BAR = (math.nan,) * len(BAR_COLUMNS)
+
+_VOLUME, _OI = BAR_COLUMNS.index("volume"), BAR_COLUMNS.index("openInterest")
+# How `_combine_legs` aggregates each column across legs
+_COMBINE = ("sum",) * 6 + ("mean",) * 3 + ("last",)
+
+
+def interval_ns(interval):
+    """Bar length in nanoseconds for a pandas offset alias such as "1T" or "5min"."""
+    return pd.Timedelta(interval.replace("T", "min")).value
+
+
+def _nan_to_none(value):
+    return None if value != value else value
+
+
+class BarRing:
+    def __init__(self, capacity=100_000):
+        """
+        Fixed-capacity ring buffer of bars: once full, each new bar overwrites the oldest.
+
+        :param capacity: Number of bars kept.
+        """
+        self.capacity = capacity
+        self._times = np.zeros(capacity, dtype=np.int64)
+        self._values = np.full((capacity, len(BAR_COLUMNS)), np.nan)
+        self._next = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, bar_time, values):
+        i = self._next
+        self._times[i] = bar_time
+        self._values[i] = values
+        self._next = (i + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def last(self):
+        """`(time_ns, values)` of the newest bar, or None."""
+        if not self._count:
+            return None
+        i = (self._next - 1) % self.capacity
+        return int(self._times[i]), tuple(self._values[i].tolist())
+
+    def frame(self, last=None):
+        """The newest `last` bars (all by default), oldest first, indexed by bar start."""
+        count = self._count if last is None else min(last, self._count)
+        order = (np.arange(self._next - count, self._next)) % self.capacity
+        return pd.DataFrame(
+            self._values[order],
+            index=pd.DatetimeIndex(self._times[order], name="Date"),
+            columns=BAR_COLUMNS,
+        )
+
+
+class LegBars:
+    def __init__(self, interval="1T", capacity=100_000):
+        """
+        Incremental `DataProvider._to_ohlcv` for one contract: quotes are folded into the
+        open bar, and a bar closes (into a `BarRing`) once the feed's clock moves past it.
+
+        Bars follow `resample(interval).agg(...).ffill()`: Open is the first bid/ask mid
+        (Close when both are missing), High/Low the extremes of close, bid and ask, volume
+        and open interest are summed, IV and the changes averaged, and intervals without
+        quotes repeat the previous bar with zero volume and open interest.
+        """
+        self.interval = interval_ns(interval)
+        self.bars = BarRing(capacity)
+        self.quotes = 0
+        self.late_quotes = 0
+        self.last_quote_time = None
+        self._bar_time = None  # Start of the open bar, or None between bars
+        self._next_time = None  # Start of the first bar not closed yet
+        self._acc = None
+        self._previous = _NAN_BAR
+
+    @property
+    def started(self):
+        return self._next_time is not None
+
+    def advance(self, bucket):
+        """
+        Closes every bar that starts before `bucket` (a bar start in ns).
+
+        :return: List of `(time_ns, values)` closed bars, oldest first.
+        """
+        if self._next_time is None:
+            return []
+        closed = []
+        if self._bar_time is not None:
+            if self._bar_time >= bucket:
+                return closed
+            closed.append(self._close())
+        while self._next_time < bucket:
+            # No quotes in this interval: forward-fill, with nothing traded
+            values = list(self._previous)
+            values[_VOLUME] = values[_OI] = 0.0
+            closed.append(self._emit(self._next_time, tuple(values)))
+        return closed
+
+    def update(self, quote):
+        """Adds one quote; returns the bars it closed (see `advance`)."""
+        bucket = quote.time - quote.time % self.interval
+        closed = self.advance(bucket)
+        if self._next_time is not None and bucket < self._next_time:
+            # Older than a bar already closed (out-of-order feed)
+            self.late_quotes += 1
+            return closed
+        if self._bar_time is None:
+            self._bar_time = self._next_time = bucket
+            self._acc = [math.nan, -math.inf, math.inf, math.nan, 0.0, 0.0, 0.0, 0, 0.0, 0, 0.0, 0, math.nan]
+
+        close, bid, ask = quote.close, quote.bid, quote.ask
+        acc = self._acc
+        if acc[0] != acc[0]:
+            mid = (bid + ask) / 2 if bid == bid and ask == ask else (bid if bid == bid else ask)
+            acc[0] = mid if mid == mid else close
+        for price in (close, bid, ask):
+            if price == price:
+                acc[1] = max(acc[1], price)
+                acc[2] = min(acc[2], price)
+        if close == close:
+            acc[3] = close
+        if quote.volume == quote.volume:
+            acc[4] += quote.volume
+        if quote.open_interest == quote.open_interest:
+            acc[5] += quote.open_interest
+        for i, value in ((6, quote.implied_volatility), (8, quote.percent_change), (10, quote.change)):
+            if value == value:
+                acc[i] += value
+                acc[i + 1] += 1
+        if quote.in_the_money == quote.in_the_money:
+            acc[12] = quote.in_the_money
+
+        self.quotes += 1
+        self.last_quote_time = quote.time
+        return closed
+
+    def _open_values(self):
+        acc = self._acc
+        return (
+            acc[0],
+            acc[1] if acc[1] != -math.inf else math.nan,
+            acc[2] if acc[2] != math.inf else math.nan,
+            acc[3],
+            acc[4],
+            acc[5],
+            acc[6] / acc[7] if acc[7] else math.nan,
+            acc[8] / acc[9] if acc[9] else math.nan,
+            acc[10] / acc[11] if acc[11] else math.nan,
+            acc[12],
+        )
+
+    def _close(self):
+        bar_time = self._bar_time
+        self._bar_time = None
+        return self._emit(bar_time, self._open_values())
+
+    def _emit(self, bar_time, values):
+        # Missing aggregates take the previous bar's value, as `.ffill()` does
+        values = tuple(
+            previous if value != value else value for value, previous in zip(values, self._previous)
+        )
+        self.bars.append(bar_time, values)
+        self._previous = values
+        self._next_time = bar_time + self.interval
+        return bar_time, values
+
+    def flush(self):
+        """Closes the open bar (e.g. at the end of a replay); returns it in a list."""
+        return [self._close()] if self._bar_time is not None else []
+
+    def frame(self, include_open=False):
+        """Closed bars as a frame, plus the bar still being built when `include_open`."""
+        df = self.bars.frame()
+        if include_open and self._bar_time is not None:
+            values = tuple(
+                previous if value != value else value
+                for value, previous in zip(self._open_values(), self._previous)
+            )
+            df.loc[pd.Timestamp(self._bar_time)] = values
+        return df
+
+
+class LiveBarPipeline:
+    def __init__(self, contracts, interval="1T", capacity=100_000):
+        """
+        Builds combined multi-leg bars (e.g. a straddle) from a time-ordered quote stream.
+
+        Every leg keeps its own `LegBars` ring. The newest quote time of the whole feed is
+        the clock: once it passes the end of an interval, every leg that has started closes
+        that bar, so a quiet leg carries its last bar forward like `.ffill()` would. The legs'
+        closed bars are combined like `DataProvider._combine_legs` (prices, volume and open
+        interest summed, IV and changes averaged, bars with a missing value dropped) into
+        the pipeline's own `BarRing`. On a replayed history whose legs quote through the
+        end, the bars equal `DataProvider.create_data` without a reference date.
+
+        :param contracts: Legs as accepted by `DataProvider.create_data`.
+        :param interval: Bar length as a pandas offset alias.
+        :param capacity: Bars kept per leg and for the combined series.
+        """
+        self.keys = [contract_key(contract) for contract in contracts]
+        self.legs = {key: LegBars(interval, capacity) for key in self.keys}
+        self.interval = interval_ns(interval)
+        self.bars = BarRing(capacity)
+        self.ignored_quotes = 0
+        self._clock = None
+
+    def on_quote(self, quote):
+        """
+        Feeds one quote.
+
+        :return: List of `Bar`s completed by it (usually empty), oldest first.
+        """
+        leg = self.legs.get(quote.key)
+        if leg is None:
+            self.ignored_quotes += 1
+            return []
+        bucket = quote.time - quote.time % self.interval
+        if self._clock is not None and bucket <= self._clock:
+            leg.update(quote)
+            return []
+        self._clock = bucket
+
+        closed = {}
+        for key, other in self.legs.items():
+            bars = other.update(quote) if other is leg else other.advance(bucket)
+            for bar_time, values in bars:
+                closed.setdefault(bar_time, []).append(values)
+        return self._combine(closed)
+
+    def flush(self):
+        """Closes every leg's open bar; returns the resulting `Bar`s."""
+        closed = {}
+        for leg in self.legs.values():
+            for bar_time, values in leg.flush():
+                closed.setdefault(bar_time, []).append(values)
+        return self._combine(closed)
+
+    def _combine(self, closed):
+        bars = []
+        for bar_time in sorted(closed):
+            legs = closed[bar_time]
+            values = []
+            for kind, column in zip(_COMBINE, zip(*legs)):
+                # NaNs are skipped as by groupby's sum/mean/last (a sum of none is 0)
+                present = [value for value in column if value == value]
+                if kind == "sum":
+                    values.append(math.fsum(present))
+                elif kind == "last":
+                    values.append(present[-1] if present else math.nan)
+                else:
+                    values.append(math.fsum(present) / len(present) if present else math.nan)
+            if any(value != value for value in values):
+                continue
+            self.bars.append(bar_time, values)
+            bars.append(Bar(pd.Timestamp(bar_time), *values))
+        return bars
+
+    def frame(self, last=None):
+        """The newest `last` combined bars as a `create_data`-shaped frame."""
+        return self.bars.frame(last)
+
+    async def stream(self, quotes):
+        """
+        Async iterator of completed combined bars.
+
+        :param quotes: Async iterable of `Quote`s in time order (e.g.
+                       `ReplayBroker.stream_quotes`); the open bars are flushed when it ends.
+        """
+        async for quote in quotes:
+            for bar in self.on_quote(quote):
+                yield bar
+        for bar in self.flush():
+            yield bar
+
+
+class ReplayBroker:
+    def __init__(self, snapshots, spot_prices=None, speed=None, batch_size=1000):
+        """
+        Offline stand-in for a broker client that replays stored option snapshots as quotes.
+
+        It serves the calls live mode makes (`get_option_price`, `get_spot_price`), streams
+        quotes in time order for `LiveBarPipeline`, and fills orders at the latest quotes.
+
+        :param snapshots: Frame with `CONTRACT_KEY_COLUMNS`, `ticker` and `CONTRACT_COLUMNS`
+                          (see `from_backend`).
+        :param spot_prices: Optional dict mapping a ticker to its spot price.
+        :param speed: Replay speed relative to the recorded timestamps (e.g. 60 plays an hour
+                      per minute); None replays as fast as possible.
+        :param batch_size: Quotes between yields to the event loop when replaying at full speed.
+        """
+        snapshots = snapshots.sort_values("Date", kind="mergesort").reset_index(drop=True)
+        self.snapshots = snapshots
+        self.spot_prices = dict(spot_prices or {})
+        self.speed = speed
+        self.batch_size = batch_size
+        self.now = None  # Time (ns) of the last quote streamed
+        self.fills = []
+        self._latest = {}  # contract key -> last quote streamed
+
+        self._keys = list(
+            zip(snapshots["ticker"], snapshots["option_type"], snapshots["expiration_date"],
+                snapshots["strike"].astype(float))
+        )
+        self._times = snapshots["Date"].to_numpy(dtype="datetime64[ns]").astype(np.int64)
+        self._rows = {}  # contract key -> row positions, in time order
+        for i, key in enumerate(self._keys):
+            self._rows.setdefault(key, []).append(i)
+
+    @classmethod
+    def from_backend(cls, backend, contracts, **kwargs):
+        """Replays every stored snapshot of `contracts` read from a `StorageBackend`."""
+        by_ticker = {}
+        for contract in contracts:
+            by_ticker.setdefault(contract["ticker"], []).append(contract_key(contract)[1:])
+        frames = []
+        for ticker, keys in by_ticker.items():
+            df = backend.load_contracts(ticker, keys)
+            frames.append(df.assign(ticker=ticker))
+        return cls(pd.concat(frames, ignore_index=True), **kwargs)
+
+    def _quotes(self, keys=None):
+        columns = [
+            pd.to_numeric(self.snapshots[name], errors="coerce").to_numpy(dtype=float)
+            for name in ("Close", "bid", "ask", "volume", "openInterest", "impliedVolatility",
+                         "percentChange", "change", "inTheMoney")
+        ]
+        wanted = set(keys) if keys is not None else None
+        for i, values in enumerate(zip(*columns)):
+            key = self._keys[i]
+            if wanted is None or key in wanted:
+                yield Quote(int(self._times[i]), key, *values)
+
+    async def stream_quotes(self, contracts=None):
+        """
+        Async iterator of `Quote`s for `contracts` (all stored contracts by default), in
+        time order, paced by `speed`.
+        """
+        keys = [contract_key(contract) for contract in contracts] if contracts else None
+        started = first_time = None
+        for n, quote in enumerate(self._quotes(keys), 1):
+            if self.speed:
+                if started is None:
+                    started, first_time = time.perf_counter(), quote.time
+                due = started + (quote.time - first_time) / 1e9 / self.speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif n % self.batch_size == 0:
+                await asyncio.sleep(0)
+            self.now = quote.time
+            self._latest[quote.key] = quote
+            yield quote
+
+    def get_option_price(self, ticker, option_type, expiration_date, strike):
+        """Every snapshot of one contract up to the replay clock (all of them before streaming)."""
+        rows = self._rows.get((ticker, option_type, expiration_date, float(strike)), [])
+        if self.now is not None:
+            rows = rows[: np.searchsorted(self._times[rows], self.now, side="right")]
+        df = self.snapshots.iloc[rows][CONTRACT_COLUMNS]
+        return [
+            {name: _nan_to_none(value) for name, value in record.items()}
+            for record in df.to_dict(orient="records")
+        ]
+
+    def get_spot_price(self, ticker):
+        return self.spot_prices.get(ticker)
+
+    def submit_order(self, contracts, size, side="buy"):
+        """
+        Fills a multi-leg order at once against the latest streamed quotes: the sum of the
+        legs' asks when buying, bids when selling (last price when a side is missing).
+
+        :return: Fill dict with `time`, `side`, `size`, `price` and the leg `contracts`.
+        """
+        price = 0.0
+        for contract in contracts:
+            quote = self._latest.get(contract_key(contract))
+            if quote is None:
+                raise ValueError(f"No quote streamed yet for {contract_key(contract)}")
+            side_price = quote.ask if side == "buy" else quote.bid
+            price += side_price if side_price == side_price else quote.close
+        fill = {
+            "time": pd.Timestamp(self.now),
+            "side": side,
+            "size": size,
+            "price": price,
+            "contracts": contracts,
+        }
+        self.fills.append(fill)
+        return fill
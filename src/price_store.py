@@ -0,0 +1,192 @@
+import sqlite3
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from functools import lru_cache
+from src.connection_pool import ConnectionPool
+from src.profiling import count, stage
+
+
+UNDERLYING_HISTORY_QUERY = """
+    SELECT date AS Date, open AS Open, high AS High, low AS Low, close AS Close, volume AS Volume
+    FROM underlying_prices
+    WHERE ticker=?
+    ORDER BY date
+"""
+
+REALIZED_VOL_QUERY = """
+    SELECT value FROM realized_volatility WHERE ticker=? AND window=? AND date=?
+"""
+
+# Latest stored day strictly before the reference date, so nothing after it is seen
+IV_RANK_QUERY = """
+    SELECT date, atm_iv, iv_rank, iv_percentile FROM iv_rank
+    WHERE ticker=? AND window=? AND date < ?
+    ORDER BY date DESC LIMIT 1
+"""
+
+IV_TERM_STRUCTURE_QUERY = """
+    SELECT expiration_date, days_to_expiry, atm_iv FROM iv_term_structure
+    WHERE ticker=?1 AND date = (
+        SELECT MAX(date) FROM iv_term_structure WHERE ticker=?1 AND date < ?2
+    )
+    ORDER BY expiration_date
+"""
+
+
+class UnderlyingPriceStore:
+    def __init__(self, db_name="data/options_data.db", offline=False, cache_size=64, pool=None):
+        """
+        Read-through access to the `underlying_prices` table.
+
+        :param db_name: Path to the SQLite options database.
+        :param offline: If True, never falls back to Yahoo Finance for days missing from the table.
+        :param cache_size: Number of tickers whose daily history is kept in the LRU cache.
+        :param pool: `ConnectionPool` to query through; defaults to a read-only pool on `db_name`.
+        """
+        self.db_name = db_name
+        self.offline = offline
+        self.pool = pool or ConnectionPool(db_name)
+        self._load_ticker_history = lru_cache(maxsize=cache_size)(
+            self._query_ticker_history
+        )
+        # Bumped to re-read a ticker whose cached history ends before a requested window
+        self._generations = {}
+        # (ticker, last day) pairs already re-read, fetched from Yahoo or warned about, so a
+        # day with no bar (a holiday, or today before the backfill) costs one lookup per process
+        self._refreshed = set()
+        self._fetched = {}  # (ticker, last day) -> (first day fetched, Yahoo bars)
+        self._warned = set()
+
+    def _query_ticker_history(self, ticker, generation=0):
+        try:
+            df = self.pool.read_frame(
+                UNDERLYING_HISTORY_QUERY, params=[ticker], parse_dates=["Date"]
+            )
+        except (pd.errors.DatabaseError, sqlite3.OperationalError):
+            # Database missing or predates the underlying_prices migration
+            df = pd.DataFrame(columns=["Date", "Open", "High", "Low", "Close", "Volume"])
+        return df.set_index("Date")
+
+    def _ticker_history(self, ticker, refresh=False):
+        if refresh:
+            self._generations[ticker] = self._generations.get(ticker, 0) + 1
+        return self._load_ticker_history(ticker, self._generations.get(ticker, 0))
+
+    def get_history(self, ticker, start, end):
+        """
+        Returns daily bars with `start <= date < end`, matching `yf.Ticker.history` semantics.
+
+        When the stored history ends before the window's last business day (e.g. today,
+        before the daily backfill has run, or a holiday), the ticker is re-read from the
+        table, since rows may have been written after it was cached. If it is still behind,
+        the missing days come from Yahoo Finance, or a warning is printed when the store is
+        offline. An empty local window is fetched from Yahoo as a whole. Each of these
+        happens at most once per ticker and last business day; later calls reuse the result.
+
+        :param ticker: Stock ticker symbol.
+        :param start: Window start (datetime or date string).
+        :param end: Window end, exclusive (datetime or date string).
+        :return: DataFrame indexed by naive dates (may be empty).
+        """
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        # Weekends never have bars; holidays are not known here
+        last_day = pd.offsets.BDay().rollback((end - pd.Timedelta(days=1)).normalize())
+        history = self._ticker_history(ticker)
+        stale = last_day >= start and (history.empty or history.index[-1] < last_day)
+        if stale and (ticker, last_day) not in self._refreshed:
+            self._refreshed.add((ticker, last_day))
+            history = self._ticker_history(ticker, refresh=True)
+        window = history.loc[(history.index >= start) & (history.index < end)]
+
+        behind = last_day >= start and (window.empty or window.index[-1] < last_day)
+        if not behind:
+            return window
+        if self.offline:
+            if not window.empty and (ticker, last_day) not in self._warned:
+                self._warned.add((ticker, last_day))
+                print(f"Stored prices for {ticker} end on {window.index[-1]:%Y-%m-%d}, before {last_day:%Y-%m-%d}.")
+            return window
+
+        tail_start = start if window.empty else window.index[-1] + pd.Timedelta(days=1)
+        fetched = self._fetched.get((ticker, last_day))
+        if fetched is None or fetched[0] > tail_start:
+            count("yahoo_requests")
+            with stage("yahoo"):
+                remote = yf.Ticker(ticker).history(start=tail_start, end=end)
+            if not remote.empty:
+                remote.index = remote.index.tz_localize(None)
+            fetched = self._fetched[(ticker, last_day)] = (tail_start, remote)
+        remote = fetched[1]
+        if not remote.empty:
+            remote = remote.loc[(remote.index >= tail_start) & (remote.index < end)]
+        if remote.empty:
+            return window
+        if window.empty:
+            return remote
+        return pd.concat([window, remote[window.columns.intersection(remote.columns)]])
+
+    def get_realized_volatility(self, ticker, window, date):
+        """
+        Looks up a precomputed realized volatility from the `realized_volatility` table.
+
+        :param ticker: Stock ticker symbol.
+        :param window: Calendar-day window length.
+        :param date: Reference date (YYYY-MM-DD); the window ends the day before it.
+        :return: Annualized volatility, NaN if stored as undefined, or None if not stored.
+        """
+        try:
+            row = self.pool.fetchone(REALIZED_VOL_QUERY, (ticker, int(window), date))
+        except sqlite3.OperationalError:
+            # Database missing or predates the realized_volatility migration
+            row = None
+
+        if row is None:
+            return None
+        return row[0] if row[0] is not None else np.nan
+
+    def get_iv_rank(self, ticker, window, date):
+        """
+        Looks up the materialized IV context (`iv_rank` table) as of the start of `date`.
+
+        :param ticker: Stock ticker symbol.
+        :param window: Calendar-day lookback of the rank.
+        :param date: Reference date (YYYY-MM-DD); the latest stored day before it is used.
+        :return: Dict with `date`, `atm_iv`, `iv_rank` and `iv_percentile` (NaN when
+                 undefined), or None if nothing is stored.
+        """
+        try:
+            row = self.pool.fetchone(IV_RANK_QUERY, (ticker, int(window), date))
+        except sqlite3.OperationalError:
+            # Database missing or predates the iv_rank migration
+            row = None
+
+        if row is None:
+            return None
+        return {
+            "date": row[0],
+            **{
+                name: value if value is not None else np.nan
+                for name, value in zip(("atm_iv", "iv_rank", "iv_percentile"), row[1:])
+            },
+        }
+
+    def get_term_structure(self, ticker, date):
+        """
+        ATM IV per expiration of the latest stored day before `date` (`iv_term_structure`).
+
+        :return: DataFrame with `expiration_date`, `days_to_expiry` and `atm_iv` (may be empty).
+        """
+        try:
+            return self.pool.read_frame(IV_TERM_STRUCTURE_QUERY, params=[ticker, date])
+        except (pd.errors.DatabaseError, sqlite3.OperationalError):
+            return pd.DataFrame(columns=["expiration_date", "days_to_expiry", "atm_iv"])
+
+    def cache_info(self):
+        return self._load_ticker_history.cache_info()
+
+    def clear_cache(self):
+        self._load_ticker_history.cache_clear()
+        self._generations.clear()
+        self._refreshed.clear()
+        self._fetched.clear()
@@ -0,0 +1,217 @@
+import contextlib
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+import numpy as np
+from src.connection_pool import QueryStats
+
+
+# The active profiler; None keeps every `stage` a shared no-op context
+_profiler = None
+
+_DISABLED = contextlib.nullcontext()
+
+
+def enable_profiling():
+    """Starts collecting stage timings in this process and returns the `Profiler`."""
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler()
+    return _profiler
+
+
+def disable_profiling():
+    global _profiler
+    _profiler = None
+
+
+def get_profiler():
+    """The active `Profiler`, or None when profiling is disabled."""
+    return _profiler
+
+
+def stage(name, contracts=None):
+    """
+    Context manager timing one pass through a pipeline stage.
+
+    :param name: Stage name, e.g. "load_rows" or "backtest".
+    :param contracts: Optional contract set the time is spent on, attributed to it in the
+                      slowest-contracts table (labelled with `contracts_label`).
+    """
+    profiler = _profiler
+    if profiler is None:
+        return _DISABLED
+    return _Timer(profiler, name, contracts)
+
+
+def profiled(name):
+    """Decorator timing every call of a function as stage `name`."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _profiler
+            if profiler is None:
+                return func(*args, **kwargs)
+            with _Timer(profiler, name, None):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def count(name, n=1):
+    """Adds `n` to counter `name` when profiling is enabled."""
+    profiler = _profiler
+    if profiler is not None:
+        profiler.count(name, n)
+
+
+def contracts_label(contracts):
+    """Short label of a contract set, e.g. "AAPL 2025-03-14 150.0 call+put"."""
+    if not contracts:
+        return ""
+    first = contracts[0]
+    option_types = "+".join(contract["option_type"] for contract in contracts)
+    return f"{first['ticker']} {first['expiration_date']} {float(first['strike'])} {option_types}"
+
+
+class _Timer:
+    __slots__ = ("profiler", "name", "contracts", "start")
+
+    def __init__(self, profiler, name, contracts):
+        self.profiler = profiler
+        self.name = name
+        self.contracts = contracts
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        label = contracts_label(self.contracts) if self.contracts else None
+        self.profiler.record(self.name, elapsed, label)
+        return False
+
+
+class Profiler:
+    def __init__(self):
+        """
+        Collects stage durations, counters and per-contract time for one run.
+
+        Stages may nest (e.g. "yahoo" inside "spot_price"), so stage totals are inclusive
+        and their shares of the wall time can add up to more than 100%. SQL statements are
+        timed separately through `attach`.
+        """
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self.durations = {}
+        self.counters = {}
+        self.contract_times = {}
+        self.query_stats = QueryStats()
+        self._lock = threading.Lock()
+
+    def record(self, name, elapsed, contract=None):
+        with self._lock:
+            self.durations.setdefault(name, []).append(elapsed)
+            if contract is not None:
+                stages = self.contract_times.setdefault(contract, {})
+                stages[name] = stages.get(name, 0.0) + elapsed
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def attach(self, pool):
+        """Times every statement run through a `ConnectionPool`."""
+        pool.add_hook(self.query_stats)
+
+    def drain(self):
+        """Returns and clears what was collected so far, for `merge` in another process."""
+        with self._lock:
+            state = (self.durations, self.counters, self.contract_times)
+            self.durations, self.counters, self.contract_times = {}, {}, {}
+        return (*state, self.query_stats.drain())
+
+    def merge(self, state):
+        """Adds the `drain` output of another profiler (e.g. a backtest worker)."""
+        durations, counters, contract_times, query_stats = state
+        self.query_stats.merge(query_stats)
+        with self._lock:
+            for name, values in durations.items():
+                self.durations.setdefault(name, []).extend(values)
+            for name, n in counters.items():
+                self.counters[name] = self.counters.get(name, 0) + n
+            for contract, stages in contract_times.items():
+                totals = self.contract_times.setdefault(contract, {})
+                for name, elapsed in stages.items():
+                    totals[name] = totals.get(name, 0.0) + elapsed
+
+    def report(self, top=20):
+        """
+        The run's profile as a JSON-serializable dict: per-stage count, total, mean and
+        p50/p90/p99/max in milliseconds, counters, per-statement SQL timings and the `top`
+        contract sets with the most time attributed to them.
+        """
+        wall = time.perf_counter() - self._start
+        with self._lock:
+            durations = {name: np.asarray(values) for name, values in self.durations.items()}
+            counters = dict(self.counters)
+            contract_times = {name: dict(stages) for name, stages in self.contract_times.items()}
+
+        stages = {}
+        for name, values in sorted(durations.items(), key=lambda item: -item[1].sum()):
+            p50, p90, p99 = np.percentile(values, [50, 90, 99]) * 1000
+            stages[name] = {
+                "count": int(len(values)),
+                "total_s": float(values.sum()),
+                "share_of_wall": float(values.sum() / wall) if wall else 0.0,
+                "mean_ms": float(values.mean() * 1000),
+                "p50_ms": float(p50),
+                "p90_ms": float(p90),
+                "p99_ms": float(p99),
+                "max_ms": float(values.max() * 1000),
+            }
+
+        slowest = sorted(contract_times.items(), key=lambda item: -sum(item[1].values()))[:top]
+        queries = self.query_stats.summary().sort_values("total_ms", ascending=False)
+        return {
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "wall_s": wall,
+            "argv": sys.argv,
+            "pid": os.getpid(),
+            "stages": stages,
+            "counters": counters,
+            "queries": queries.to_dict(orient="records"),
+            "slowest_contracts": [
+                {"contract": name, "total_s": sum(times.values()), "stages": times}
+                for name, times in slowest
+            ],
+        }
+
+    def write_report(self, path, top=20):
+        report = self.report(top)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as file:
+            json.dump(report, file, indent=2)
+        return report
+
+    def format_stages(self):
+        """Per-stage table of `report()` as text, for printing at the end of a run."""
+        report = self.report()
+        lines = [f"{'stage':<22}{'count':>8}{'total s':>10}{'share':>8}{'p50 ms':>10}{'p99 ms':>10}"]
+        for name, stats in report["stages"].items():
+            lines.append(
+                f"{name:<22}{stats['count']:>8}{stats['total_s']:>10.2f}"
+                f"{stats['share_of_wall']:>8.0%}{stats['p50_ms']:>10.2f}{stats['p99_ms']:>10.2f}"
+            )
+        lines.append(f"wall time {report['wall_s']:.2f} s")
+        return "\n".join(lines)
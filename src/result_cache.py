@@ -0,0 +1,207 @@
+import hashlib
+import inspect
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import backtesting
+import pandas as pd
+import talib
+
+
+# Bump when the cached result layout or the backtest code changes in a way the key misses
+CACHE_VERSION = 1
+
+# Strategy attributes that are not parameters
+_STRATEGY_BASES = (backtesting.Strategy, object)
+
+
+def frame_digest(df):
+    """Hash of an OHLCV frame's index, column names, dtypes and values."""
+    digest = hashlib.sha256()
+    digest.update(repr([(str(name), str(dtype)) for name, dtype in df.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def strategy_fingerprint(strategy):
+    """
+    The source of every class `strategy` inherits its logic from (up to backtesting.py's
+    `Strategy`) and the values of its parameters, i.e. its public non-callable class
+    attributes. Classes without source (e.g. built with `type()`) contribute their name.
+    """
+    sources = []
+    params = {}
+    for cls in reversed(strategy.__mro__):
+        if cls in _STRATEGY_BASES:
+            continue
+        try:
+            sources.append(inspect.getsource(cls))
+        except (OSError, TypeError):
+            sources.append(cls.__qualname__)
+        for name, value in vars(cls).items():
+            if not name.startswith("_") and not callable(value) and not isinstance(
+                value, (property, staticmethod, classmethod)
+            ):
+                params[name] = value
+    return sources, sorted((name, repr(value)) for name, value in params.items())
+
+
+def result_key(bt_data, strategy, cash, commission, vectorized=False):
+    """
+    Content address of a `run_backtest` result: the input frame, the strategy's source and
+    parameters, cash, commission and the simulator used (with its module's source). The
+    pandas and TA-Lib versions are included too, since the indicator math lives there.
+    """
+    digest = hashlib.sha256()
+    parts = [
+        CACHE_VERSION,
+        backtesting.__version__,
+        pd.__version__,
+        talib.__version__,
+        strategy_fingerprint(strategy),
+        repr(float(cash)),
+        repr(float(commission)),
+        bool(vectorized),
+    ]
+    if vectorized:
+        parts.append(inspect.getsource(sys.modules["src.vectorized_backtest"]))
+    digest.update(repr(parts).encode())
+    digest.update(frame_digest(bt_data).encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    def __init__(self, root="data/result_cache", max_bytes=512 * 1024 * 1024):
+        """
+        On-disk cache of backtest results (trades frame and summary stats), keyed by
+        `result_key`, so reruns only recompute contracts whose data or strategy changed.
+
+        Each entry is one pickle under `root`, written to a temp file and renamed. A hit
+        refreshes the entry's modification time; once the cache grows past `max_bytes`
+        the least recently used entries are deleted.
+
+        :param root: Cache directory, created on first write.
+        :param max_bytes: Size limit of all entries together; None disables eviction.
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._size = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Worker processes count their own hits and measure the directory again
+        state = {**self.__dict__, "_size": None, "hits": 0, "misses": 0, "evictions": 0}
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], f"{key}.pkl")
+
+    def _entries(self):
+        if not os.path.isdir(self.root):
+            return []
+        entries = []
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".pkl"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def get(self, key):
+        """The cached `(trades, summary)` for `key`, or None (counted as a miss)."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as file:
+                entry = pickle.load(file)
+            os.utime(path)
+            result = entry["results"], entry["summary"]
+        except FileNotFoundError:
+            # Missing, or evicted by another process meanwhile
+            result = None
+        except Exception:
+            # Unreadable, or pickled under pandas/backtesting.py releases that can no longer
+            # load it (AttributeError, ImportError, ValueError, ...): drop it and recompute
+            result = None
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def put(self, key, trades, summary):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as file:
+            pickle.dump({"results": trades, "summary": summary}, file, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            else:
+                self._size += os.path.getsize(path)
+            if self.max_bytes is not None and self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = sorted(self._entries())
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self._size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._size -= size
+            self.evictions += 1
+
+    def clear(self):
+        for _, _, path in self._entries():
+            os.remove(path)
+        self._size = 0
+
+    def stats(self):
+        """Hit/miss/eviction counts of this process, plus the entries on disk."""
+        entries = self._entries()
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+            "evictions": self.evictions,
+            "entries": len(entries),
+            "size_bytes": sum(size for _, size, _ in entries),
+        }
+
+    def add_counts(self, hits, misses, evictions=0):
+        """Adds counts reported by another process (e.g. a backtest worker)."""
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.evictions += evictions
+
+    def counts(self):
+        return self.hits, self.misses, self.evictions
+
+    def reset_counts(self):
+        with self._lock:
+            self.hits = self.misses = self.evictions = 0
@@ -0,0 +1,392 @@
+import glob
+import hashlib
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+
+# Summary stats of a `run_backtest` result, in the order they are stored
+SUMMARY_COLUMNS = ["total_profit", "win_rate", "max_drawdown", "sharpe_ratio", "num_trades"]
+
+# Identify a backtested contract set within a run
+JOB_COLUMNS = ["ticker", "strike", "expiration_date", "reference_date"]
+
+# One row per finished job: what it was, how it ended and its summary stats
+SINK_SUMMARY_COLUMNS = [
+    "run_id", "job_key", *JOB_COLUMNS, "status", "error", *SUMMARY_COLUMNS, "finished_at",
+]
+
+# Job outcomes; only "ok" jobs have trades
+STATUS_OK = "ok"
+STATUS_NO_TRADES = "no_trades"
+STATUS_NO_DATA = "no_data"
+STATUS_ERROR = "error"
+
+SQLITE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS runs (
+        run_id TEXT PRIMARY KEY,
+        started_at TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS summaries (
+        run_id TEXT NOT NULL,
+        job_key TEXT NOT NULL,
+        ticker TEXT,
+        strike REAL,
+        expiration_date TEXT,
+        reference_date TEXT,
+        status TEXT NOT NULL,
+        error TEXT,
+        total_profit REAL,
+        win_rate REAL,
+        max_drawdown REAL,
+        sharpe_ratio REAL,
+        num_trades INTEGER,
+        finished_at TEXT NOT NULL,
+        PRIMARY KEY (run_id, job_key)
+    )
+    """,
+    # Trade columns depend on the strategy's indicators, so they are added as they appear
+    """
+    CREATE TABLE IF NOT EXISTS trades (
+        run_id TEXT NOT NULL,
+        job_key TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_trades_job ON trades (run_id, job_key)",
+]
+
+
+def job_key(ticker, contract, reference_date):
+    """Stable identifier of a selected contract within a run, used to resume it."""
+    return f"{ticker}|{contract['expiration_date']}|{float(contract['strike'])}|{reference_date}"
+
+
+def new_run_id():
+    return datetime.now().strftime("%Y%m%d-%H%M%S")
+
+
+def job_rows(run_id, ticker, contract, reference_date, result):
+    """
+    Splits one `run_backtest` result into its summary row and its tagged trades frame.
+
+    :param result: `run_backtest` or `BacktestEngine._error_result` dict, or None when the
+                   contracts had no data.
+    :return: `(summary, trades)`; `trades` is None unless the job traded.
+    """
+    key = job_key(ticker, contract, reference_date)
+    summary = {
+        "run_id": run_id,
+        "job_key": key,
+        "ticker": ticker,
+        "strike": float(contract["strike"]),
+        "expiration_date": contract["expiration_date"],
+        "reference_date": reference_date,
+        "status": STATUS_NO_DATA,
+        "error": None,
+        **dict.fromkeys(SUMMARY_COLUMNS),
+        "finished_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    if result is None:
+        return summary, None
+    if result.get("error"):
+        return {**summary, "status": STATUS_ERROR, "error": result["error"]}, None
+
+    summary.update({column: result["summary"][column] for column in SUMMARY_COLUMNS})
+    if result["results"] is None:
+        return {**summary, "status": STATUS_NO_TRADES}, None
+
+    trades = result["results"].assign(
+        ticker=ticker,
+        strike=contract["strike"],
+        expiration_date=contract["expiration_date"],
+        option_type="straddle",
+    )
+    return {**summary, "status": STATUS_OK}, trades
+
+
+class ResultsSink(ABC):
+    """
+    Append-only store of finished backtest jobs, grouped by run ID.
+
+    Each job's summary row and trades are written together as soon as it finishes, so
+    an interrupted run keeps everything completed so far and can be resumed by skipping
+    the job keys `completed_keys` returns.
+    """
+
+    def __init__(self, run_id=None, resume=False):
+        """
+        :param run_id: Run to write to; defaults to the latest run when resuming, else a new
+                       timestamped ID.
+        :param resume: Continue an existing run instead of starting a new one.
+        """
+        if run_id is None:
+            run_id = self.latest_run_id() if resume else None
+            run_id = run_id or new_run_id()
+        self.run_id = run_id
+        self.resume = resume
+        self._start_run()
+
+    @abstractmethod
+    def _start_run(self):
+        """Registers `run_id`, clearing any earlier results under it unless resuming."""
+
+    @abstractmethod
+    def latest_run_id(self):
+        """Most recently started run, or None."""
+
+    @abstractmethod
+    def completed_keys(self):
+        """Job keys of `run_id` that already have a summary row."""
+
+    @abstractmethod
+    def write(self, summary, trades=None):
+        """Stores one job's summary row and trades (see `job_rows`) atomically."""
+
+    @abstractmethod
+    def read_summaries(self):
+        """Every summary row of `run_id` (one per finished job)."""
+
+    @abstractmethod
+    def read_trades(self):
+        """Every trade of `run_id`, tagged with its job."""
+
+    def add(self, ticker, contract, reference_date, result):
+        """Writes one `run_backtest` result and returns its status."""
+        summary, trades = job_rows(self.run_id, ticker, contract, reference_date, result)
+        self.write(summary, trades)
+        return summary["status"]
+
+    def export_csv(self, results_csv, summary_csv):
+        """
+        Writes the run's trades and the summaries of jobs that traded, in the CSV layout
+        `main.py` has always produced.
+
+        :return: `(num_trades, num_summaries)` written.
+        """
+        trades = self.read_trades()
+        summaries = self.read_summaries()
+        if not summaries.empty:
+            # Jobs without stats leave NULLs behind, so the counts come back as floats
+            summaries = summaries[summaries["status"] == STATUS_OK]
+            summaries = summaries.astype({"num_trades": "int64"})
+        if not trades.empty:
+            trades.drop(columns=["run_id", "job_key"]).to_csv(results_csv, index=False)
+        if not summaries.empty:
+            summaries[SUMMARY_COLUMNS + ["ticker", "strike", "expiration_date"]].to_csv(
+                summary_csv, index=False
+            )
+        return len(trades), len(summaries)
+
+    def close(self):
+        pass
+
+
+class SQLiteResultsSink(ResultsSink):
+    def __init__(self, path="results/backtest_results.db", run_id=None, resume=False):
+        """
+        Results sink in a SQLite database of its own (`runs`, `summaries`, `trades`).
+
+        Each job commits its summary and trades in one transaction. Trade columns not yet
+        in the `trades` table are added on first sight.
+
+        :param path: Results database path; created if missing.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            for statement in SQLITE_SCHEMA:
+                self.conn.execute(statement)
+        self._trade_columns = self._columns("trades")
+        super().__init__(run_id, resume)
+
+    def _columns(self, table):
+        return [row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")]
+
+    def _start_run(self):
+        with self.conn:
+            if not self.resume:
+                self.conn.execute("DELETE FROM summaries WHERE run_id=?", (self.run_id,))
+                self.conn.execute("DELETE FROM trades WHERE run_id=?", (self.run_id,))
+            self.conn.execute(
+                "INSERT OR IGNORE INTO runs (run_id, started_at) VALUES (?, ?)",
+                (self.run_id, datetime.now().isoformat(timespec="seconds")),
+            )
+
+    def latest_run_id(self):
+        row = self.conn.execute(
+            "SELECT run_id FROM runs ORDER BY started_at DESC, rowid DESC LIMIT 1"
+        ).fetchone()
+        return row[0] if row else None
+
+    def completed_keys(self):
+        return {
+            row[0]
+            for row in self.conn.execute(
+                "SELECT job_key FROM summaries WHERE run_id=?", (self.run_id,)
+            )
+        }
+
+    @staticmethod
+    def _to_sql_values(trades):
+        # Timestamps and durations as text, numpy scalars as Python values, NaN as NULL
+        values = trades.copy()
+        for column in values.columns:
+            if values[column].dtype.kind in "mM":
+                values[column] = values[column].astype(str).where(values[column].notna(), None)
+        values = values.astype(object).where(values.notna(), None)
+        return [
+            tuple(v.item() if isinstance(v, np.generic) else v for v in row)
+            for row in values.itertuples(index=False, name=None)
+        ]
+
+    def write(self, summary, trades=None):
+        with self.conn:
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO summaries ({', '.join(SINK_SUMMARY_COLUMNS)}) "
+                f"VALUES ({', '.join(['?'] * len(SINK_SUMMARY_COLUMNS))})",
+                [summary[column] for column in SINK_SUMMARY_COLUMNS],
+            )
+            self.conn.execute(
+                "DELETE FROM trades WHERE run_id=? AND job_key=?",
+                (summary["run_id"], summary["job_key"]),
+            )
+            if trades is None or trades.empty:
+                return
+
+            trades = trades.assign(run_id=summary["run_id"], job_key=summary["job_key"])
+            for column in trades.columns:
+                if column not in self._trade_columns:
+                    self.conn.execute(f'ALTER TABLE trades ADD COLUMN "{column}"')
+                    self._trade_columns.append(column)
+            columns = ", ".join(f'"{column}"' for column in trades.columns)
+            self.conn.executemany(
+                f"INSERT INTO trades ({columns}) VALUES ({', '.join(['?'] * len(trades.columns))})",
+                self._to_sql_values(trades),
+            )
+
+    def read_summaries(self):
+        return pd.read_sql_query(
+            "SELECT * FROM summaries WHERE run_id=? ORDER BY rowid", self.conn, params=[self.run_id]
+        )
+
+    def read_trades(self):
+        return pd.read_sql_query(
+            "SELECT * FROM trades WHERE run_id=? ORDER BY rowid", self.conn, params=[self.run_id]
+        )
+
+    def close(self):
+        self.conn.close()
+
+
+class ParquetResultsSink(ResultsSink):
+    def __init__(self, root="results/backtest_results", run_id=None, resume=False):
+        """
+        Results sink writing one summary file and one trades file per job under
+        `<root>/run_id=<run_id>/`.
+
+        Files are written under a temporary name and renamed into place, trades first,
+        so a job counts as completed only once its summary file exists.
+
+        :param root: Directory holding one subdirectory per run.
+        """
+        self.root = root
+        super().__init__(run_id, resume)
+
+    def _run_dir(self, run_id=None):
+        return os.path.join(self.root, f"run_id={run_id or self.run_id}")
+
+    def _start_run(self):
+        for kind in ("summaries", "trades"):
+            directory = os.path.join(self._run_dir(), kind)
+            if not self.resume:
+                for path in glob.glob(os.path.join(directory, "*.parquet")):
+                    os.remove(path)
+            os.makedirs(directory, exist_ok=True)
+        # Starting or resuming a run makes it the latest one
+        os.utime(self._run_dir())
+
+    @staticmethod
+    def _last_modified(run_dir):
+        # Job files land in subdirectories, which does not touch the run directory itself
+        paths = [run_dir, *glob.glob(os.path.join(run_dir, "*", "*.parquet"))]
+        return max(os.path.getmtime(path) for path in paths)
+
+    def latest_run_id(self):
+        runs = glob.glob(os.path.join(self.root, "run_id=*"))
+        if not runs:
+            return None
+        return os.path.basename(max(runs, key=self._last_modified))[len("run_id="):]
+
+    def _path(self, kind, key):
+        name = hashlib.sha1(key.encode()).hexdigest()[:16]
+        return os.path.join(self._run_dir(), kind, f"{name}.parquet")
+
+    def _read(self, kind):
+        paths = sorted(
+            glob.glob(os.path.join(self._run_dir(), kind, "*.parquet")), key=os.path.getmtime
+        )
+        frames = [pd.read_parquet(path) for path in paths]
+        if not frames:
+            return pd.DataFrame()
+        columns = list(dict.fromkeys(column for frame in frames for column in frame.columns))
+        frames = [frame for frame in frames if not frame.empty]
+        dtypes = {}
+        for frame in frames:
+            for column, dtype in frame.dtypes.items():
+                dtypes.setdefault(column, dtype)
+        # Empty frames and all-NA columns would make concat's result dtypes depend on them
+        # (a pandas FutureWarning); dropped here, they come back as NA with their own dtype
+        frames = [frame.dropna(axis=1, how="all") for frame in frames]
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        df = df.reindex(columns=columns)
+        for column in df.columns[df.isna().all()]:
+            if column in dtypes:
+                df[column] = df[column].astype(dtypes[column])
+        return df
+
+    def completed_keys(self):
+        summaries = self._read("summaries")
+        return set(summaries["job_key"]) if not summaries.empty else set()
+
+    @staticmethod
+    def _replace(df, path):
+        temp_path = f"{path}.tmp"
+        df.to_parquet(temp_path, index=False)
+        os.replace(temp_path, path)
+
+    def write(self, summary, trades=None):
+        key = summary["job_key"]
+        trades_path = self._path("trades", key)
+        if trades is not None and not trades.empty:
+            self._replace(
+                trades.assign(run_id=summary["run_id"], job_key=key), trades_path
+            )
+        elif os.path.exists(trades_path):
+            os.remove(trades_path)
+        self._replace(pd.DataFrame([summary], columns=SINK_SUMMARY_COLUMNS), self._path("summaries", key))
+
+    def read_summaries(self):
+        return self._read("summaries")
+
+    def read_trades(self):
+        return self._read("trades")
+
+
+def make_results_sink(sink="sqlite", path=None, run_id=None, resume=False):
+    """Builds the results sink named by a config `sink` value ("sqlite" or "parquet")."""
+    if sink == "sqlite":
+        return SQLiteResultsSink(path or "results/backtest_results.db", run_id, resume)
+    if sink == "parquet":
+        return ParquetResultsSink(path or "results/backtest_results", run_id, resume)
+    raise ValueError(f"Unknown results sink: {sink}")
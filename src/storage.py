@@ -0,0 +1,643 @@
+import sqlite3
+from abc import ABC, abstractmethod
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+from src.connection_pool import ConnectionPool
+
+
+HISTORICAL_CONTRACT_QUERY = """
+    SELECT lastTradeDate AS Date, lastPrice AS Close, bid, ask, volume, openInterest, impliedVolatility,
+           percentChange, change, inTheMoney
+    FROM options
+    WHERE ticker=? AND option_type=? AND expiration_date=? AND strike=?
+"""
+
+# CROSS JOIN pins the requested keys as the outer loop, so each one is an index seek
+BULK_CONTRACTS_QUERY = """
+    WITH wanted(option_type, expiration_date, strike) AS (VALUES {values})
+    SELECT o.option_type, o.expiration_date, o.strike,
+           o.lastTradeDate AS Date, o.lastPrice AS Close, o.bid, o.ask, o.volume, o.openInterest,
+           o.impliedVolatility, o.percentChange, o.change, o.inTheMoney
+    FROM wanted CROSS JOIN options o
+    WHERE o.ticker=? AND o.option_type=wanted.option_type
+      AND o.expiration_date=wanted.expiration_date AND o.strike=wanted.strike
+"""
+
+FIRST_CONTRACT_DATE_QUERY = """
+    SELECT MIN(lastTradeDate) FROM options WHERE ticker=?
+"""
+
+# Latest observation of every unexpired contract at or before the as-of timestamp. Each
+# contract costs one backwards seek on idx_options_contract that stops at its first row
+# at or before ?2, so rows after the as-of time are never read.
+AS_OF_CHAIN_QUERY = """
+    SELECT o.strike, o.expiration_date, o.option_type, o.volume, o.openInterest, o.impliedVolatility
+    FROM (
+        SELECT DISTINCT option_type, expiration_date, strike FROM options
+        WHERE ticker = ?1 AND expiration_date >= ?3
+    ) c
+    JOIN options o ON o.id = (
+        SELECT id FROM options
+        WHERE ticker = ?1 AND option_type = c.option_type AND expiration_date = c.expiration_date
+          AND strike = c.strike AND lastTradeDate <= ?2
+          AND volume IS NOT NULL AND openInterest IS NOT NULL
+        ORDER BY lastTradeDate DESC, id DESC
+        LIMIT 1
+    )
+    ORDER BY o.strike, o.expiration_date, o.option_type
+"""
+
+# Every snapshot of a ticker's contracts expiring on or after a date, in idx_options_contract
+# order (contract by contract, oldest first), so no sort is needed
+TICKER_HISTORY_QUERY = """
+    SELECT option_type, expiration_date, strike,
+           lastTradeDate AS Date, lastPrice AS Close, bid, ask, volume, openInterest,
+           impliedVolatility, percentChange, change, inTheMoney
+    FROM options
+    WHERE ticker=? AND expiration_date >= ?
+    ORDER BY option_type, expiration_date, strike, lastTradeDate
+"""
+
+# Daily bars that `DBHandler.compact` rolled up from a contract's snapshots, one seek on the
+# options_daily primary key per requested contract (so each contract's rows come by date). Rows rolled up before the counts were
+# stored average every snapshot of the day that had a value.
+DAILY_CONTRACTS_QUERY = """
+    WITH wanted(option_type, expiration_date, strike) AS (VALUES {values})
+    SELECT d.option_type, d.expiration_date, d.strike,
+           d.date AS Date, d.open AS Open, d.high AS High, d.low AS Low, d.close AS Close,
+           d.volume, d.open_interest AS openInterest, d.implied_volatility AS impliedVolatility,
+           d.percent_change AS percentChange, d.change, d.in_the_money AS inTheMoney,
+           COALESCE(d.implied_volatility_count, (d.implied_volatility IS NOT NULL) * d.snapshots)
+               AS impliedVolatilityCount,
+           COALESCE(d.percent_change_count, (d.percent_change IS NOT NULL) * d.snapshots)
+               AS percentChangeCount,
+           COALESCE(d.change_count, (d.change IS NOT NULL) * d.snapshots) AS changeCount
+    FROM wanted CROSS JOIN options_daily d
+    WHERE d.ticker=? AND d.option_type=wanted.option_type
+      AND d.expiration_date=wanted.expiration_date AND d.strike=wanted.strike
+"""
+
+# Every daily bar of a ticker's contracts expiring on or after a date, in primary key order
+DAILY_HISTORY_QUERY = """
+    SELECT option_type, expiration_date, strike,
+           date AS Date, open AS Open, high AS High, low AS Low, close AS Close,
+           volume, open_interest AS openInterest, implied_volatility AS impliedVolatility,
+           percent_change AS percentChange, change, in_the_money AS inTheMoney,
+           COALESCE(implied_volatility_count, (implied_volatility IS NOT NULL) * snapshots)
+               AS impliedVolatilityCount,
+           COALESCE(percent_change_count, (percent_change IS NOT NULL) * snapshots)
+               AS percentChangeCount,
+           COALESCE(change_count, (change IS NOT NULL) * snapshots) AS changeCount
+    FROM options_daily
+    WHERE ticker=? AND expiration_date >= ?
+    ORDER BY option_type, expiration_date, strike, date
+"""
+
+# Contracts per bulk query, keeping bound parameters well under SQLite's limit
+BULK_CHUNK_SIZE = 300
+
+# Raw snapshot columns returned for a contract, as named by HISTORICAL_CONTRACT_QUERY
+CONTRACT_COLUMNS = [
+    "Date", "Close", "bid", "ask", "volume", "openInterest", "impliedVolatility",
+    "percentChange", "change", "inTheMoney",
+]
+CONTRACT_KEY_COLUMNS = ["option_type", "expiration_date", "strike"]
+# Integer columns; SQLite returns them as int64 unless the result holds a NULL
+INTEGER_COLUMNS = ["volume", "openInterest", "inTheMoney"]
+# Daily bar columns returned by DAILY_CONTRACTS_QUERY: `DataProvider._to_ohlcv` fields, with
+# the number of snapshots behind each mean so longer bars can weight the days
+DAILY_COLUMNS = [
+    "Date", "Open", "High", "Low", "Close", "volume", "openInterest", "impliedVolatility",
+    "percentChange", "change", "inTheMoney", "impliedVolatilityCount", "percentChangeCount",
+    "changeCount",
+]
+CHAIN_AS_OF_COLUMNS = [
+    "strike", "expiration_date", "option_type", "volume", "openInterest", "impliedVolatility",
+]
+
+# `options` columns stored by the Parquet backend, renamed to CONTRACT_COLUMNS on load
+PARQUET_RENAMES = {"lastTradeDate": "Date", "lastPrice": "Close"}
+
+PARQUET_SCHEMA = pa.schema(
+    [
+        ("option_type", pa.string()),
+        ("strike", pa.float64()),
+        ("lastTradeDate", pa.timestamp("ns")),
+        ("lastPrice", pa.float64()),
+        ("bid", pa.float64()),
+        ("ask", pa.float64()),
+        ("volume", pa.int64()),
+        ("openInterest", pa.int64()),
+        ("impliedVolatility", pa.float64()),
+        ("percentChange", pa.float64()),
+        ("change", pa.float64()),
+        ("inTheMoney", pa.int64()),
+    ]
+)
+
+PARQUET_PARTITIONING = ds.partitioning(
+    pa.schema([("ticker", pa.string()), ("expiration_date", pa.string())]), flavor="hive"
+)
+
+# `options_daily` rows, stored under `_daily/ticker=<T>/` (skipped by the snapshot dataset)
+PARQUET_DAILY_DIR = "_daily"
+PARQUET_DAILY_PARTITIONING = ds.partitioning(pa.schema([("ticker", pa.string())]), flavor="hive")
+
+
+def _empty_daily():
+    return pd.DataFrame(columns=CONTRACT_KEY_COLUMNS + DAILY_COLUMNS)
+
+
+def _is_missing_table(exc):
+    # pd.read_sql_query wraps sqlite3 errors in pd.errors.DatabaseError
+    return "no such table" in str(exc) or "no such column" in str(exc)
+
+
+class StorageBackend(ABC):
+    """
+    Read access to option snapshots for `DataProvider` and the contract selectors.
+
+    Every backend returns the same frames and rows as `SQLiteBackend`, so callers can swap
+    storage without changing results.
+    """
+
+    # True when `chain_as_of` reads only the snapshot (an index seek per contract) rather
+    # than every earlier row, so preloading a history for repeated snapshots does not pay off
+    seeks_as_of = False
+
+    @abstractmethod
+    def load_contract(self, ticker, option_type, expiration_date, strike):
+        """Raw snapshots of one contract: a frame with `CONTRACT_COLUMNS`, `Date` parsed."""
+
+    @abstractmethod
+    def load_contracts(self, ticker, keys):
+        """
+        Raw snapshots of many contracts of one ticker.
+
+        :param keys: List of (option_type, expiration_date, strike) tuples.
+        :return: Frame with `CONTRACT_KEY_COLUMNS` followed by `CONTRACT_COLUMNS`.
+        """
+
+    @abstractmethod
+    def first_contract_date(self, ticker):
+        """Earliest `lastTradeDate` stored for a ticker (as text), or None."""
+
+    @abstractmethod
+    def chain_as_of(self, ticker, as_of):
+        """
+        Point-in-time chain: the latest observation (with known volume and open interest) of
+        every contract not yet expired, taken at or before `as_of`. Nothing later is read.
+
+        :param as_of: Timestamp or date string; a bare date means midnight at its start.
+        :return: List of `CHAIN_AS_OF_COLUMNS` tuples, one per contract, ordered by
+                 strike, expiration_date and option_type.
+        """
+
+    @abstractmethod
+    def load_history(self, ticker, since):
+        """
+        Every raw snapshot of a ticker's contracts expiring on or after `since`.
+
+        :param since: Date string (YYYY-MM-DD).
+        :return: Frame with `CONTRACT_KEY_COLUMNS` followed by `CONTRACT_COLUMNS`, sorted
+                 by contract and then by time.
+        """
+
+    def load_daily(self, ticker, keys):
+        """
+        Daily bars rolled up by `DBHandler.compact` for days whose snapshots were thinned.
+        `DataProvider` serves those days from these rows at intervals of a day or longer.
+
+        :param keys: List of (option_type, expiration_date, strike) tuples.
+        :return: Frame with `CONTRACT_KEY_COLUMNS` followed by `DAILY_COLUMNS` (`Date` at
+                 midnight), each contract's rows by date. Empty when the storage holds no
+                 rollups.
+        """
+        return _empty_daily()
+
+    def load_daily_history(self, ticker, since):
+        """Every daily bar of a ticker's contracts expiring on or after `since`, as `load_daily`."""
+        return _empty_daily()
+
+
+class SQLiteBackend(StorageBackend):
+    seeks_as_of = True
+
+    def __init__(self, db_name="data/options_data.db", pool=None):
+        """
+        :param db_name: Path to the SQLite options database.
+        :param pool: `ConnectionPool` to query through; defaults to a read-only pool on `db_name`.
+        """
+        self.db_name = db_name
+        self.pool = pool or ConnectionPool(db_name)
+
+    def load_contract(self, ticker, option_type, expiration_date, strike):
+        return self.pool.read_frame(
+            HISTORICAL_CONTRACT_QUERY,
+            params=[ticker, option_type, expiration_date, strike],
+            parse_dates=["Date"],
+        )
+
+    def load_contracts(self, ticker, keys):
+        raw = []
+        for i in range(0, len(keys), BULK_CHUNK_SIZE):
+            chunk = keys[i : i + BULK_CHUNK_SIZE]
+            query = BULK_CONTRACTS_QUERY.format(
+                values=", ".join(["(?, ?, ?)"] * len(chunk))
+            )
+            params = [v for key in chunk for v in key] + [ticker]
+            raw.append(self.pool.read_frame(query, params=params, parse_dates=["Date"]))
+        return pd.concat(raw, ignore_index=True)
+
+    def first_contract_date(self, ticker):
+        result = self.pool.fetchone(FIRST_CONTRACT_DATE_QUERY, (ticker,))
+        return result[0] if result else None
+
+    def chain_as_of(self, ticker, as_of):
+        as_of = pd.Timestamp(as_of)
+        # lastTradeDate is stored as 'YYYY-MM-DD HH:MM:SS' text, so compare in that form
+        return self.pool.fetchall(
+            AS_OF_CHAIN_QUERY, (ticker, str(as_of), as_of.strftime("%Y-%m-%d"))
+        )
+
+    def load_history(self, ticker, since):
+        return self.pool.read_frame(
+            TICKER_HISTORY_QUERY, params=[ticker, since], parse_dates=["Date"]
+        )
+
+    def _read_daily(self, query, params):
+        try:
+            return self.pool.read_frame(query, params=params, parse_dates=["Date"])
+        except (pd.errors.DatabaseError, sqlite3.OperationalError) as exc:
+            # Database predates the options_daily migrations
+            if not _is_missing_table(exc):
+                raise
+            return _empty_daily()
+
+    def load_daily(self, ticker, keys):
+        daily = []
+        for i in range(0, len(keys), BULK_CHUNK_SIZE):
+            chunk = keys[i : i + BULK_CHUNK_SIZE]
+            query = DAILY_CONTRACTS_QUERY.format(
+                values=", ".join(["(?, ?, ?)"] * len(chunk))
+            )
+            params = [v for key in chunk for v in key] + [ticker]
+            daily.append(self._read_daily(query, params))
+        return pd.concat(daily, ignore_index=True) if daily else _empty_daily()
+
+    def load_daily_history(self, ticker, since):
+        return self._read_daily(DAILY_HISTORY_QUERY, [ticker, since])
+
+
+class ParquetBackend(StorageBackend):
+    def __init__(self, root="data/options_parquet"):
+        """
+        Columnar backend over a Parquet dataset written by `convert_sqlite_to_parquet`.
+
+        Files are partitioned as `ticker=<T>/expiration_date=<YYYY-MM-DD>/` and memory-mapped
+        on read. Ticker and expiration filters prune whole directories; option_type and
+        strike filters are pushed down to row-group statistics, and only the needed columns
+        are decoded. Timestamps are stored pre-parsed.
+
+        :param root: Dataset root directory.
+        """
+        self.root = root
+        self._dataset = None
+        self._daily_dataset = None
+
+    def __getstate__(self):
+        # The dataset handles are rebuilt lazily, so backends can be sent to worker processes
+        return {**self.__dict__, "_dataset": None, "_daily_dataset": None}
+
+    @property
+    def dataset(self):
+        if self._dataset is None:
+            self._dataset = ds.dataset(
+                self.root,
+                format="parquet",
+                partitioning=PARQUET_PARTITIONING,
+                filesystem=pafs.LocalFileSystem(use_mmap=True),
+            )
+        return self._dataset
+
+    @property
+    def daily_dataset(self):
+        """The `options_daily` rollups, or None when the dataset has none."""
+        path = f"{self.root}/{PARQUET_DAILY_DIR}"
+        exists = pafs.LocalFileSystem().get_file_info(path).type == pafs.FileType.Directory
+        if self._daily_dataset is None and exists:
+            self._daily_dataset = ds.dataset(
+                path,
+                format="parquet",
+                partitioning=PARQUET_DAILY_PARTITIONING,
+                filesystem=pafs.LocalFileSystem(use_mmap=True),
+            )
+        return self._daily_dataset
+
+    def _read(self, columns, filter):
+        return self.dataset.to_table(columns=columns, filter=filter).to_pandas()
+
+    def _read_daily(self, filter):
+        if self.daily_dataset is None:
+            return _empty_daily()
+        columns = CONTRACT_KEY_COLUMNS + DAILY_COLUMNS
+        df = self.daily_dataset.to_table(columns=columns, filter=filter).to_pandas()
+        return df.sort_values(
+            ["option_type", "expiration_date", "strike", "Date"], kind="mergesort"
+        ).reset_index(drop=True)
+
+    def load_contract(self, ticker, option_type, expiration_date, strike):
+        df = self._read(
+            list(PARQUET_SCHEMA.names[2:]),
+            (ds.field("ticker") == ticker)
+            & (ds.field("expiration_date") == expiration_date)
+            & (ds.field("option_type") == option_type)
+            & (ds.field("strike") == float(strike)),
+        )
+        return df.rename(columns=PARQUET_RENAMES)[CONTRACT_COLUMNS]
+
+    def load_contracts(self, ticker, keys):
+        expirations = sorted({key[1] for key in keys})
+        df = self._read(
+            ["option_type", "expiration_date", "strike", *PARQUET_SCHEMA.names[2:]],
+            (ds.field("ticker") == ticker)
+            & ds.field("expiration_date").isin(expirations)
+            & ds.field("strike").isin(sorted({float(key[2]) for key in keys})),
+        )
+        wanted = pd.MultiIndex.from_tuples(
+            list(dict.fromkeys((key[0], key[1], float(key[2])) for key in keys)),
+            names=CONTRACT_KEY_COLUMNS,
+        )
+        # Keep the requested contracts in request order, like the SQLite VALUES join
+        position = wanted.get_indexer(pd.MultiIndex.from_frame(df[CONTRACT_KEY_COLUMNS]))
+        order = position.argsort(kind="stable")
+        df = df.iloc[order[position[order] >= 0]]
+        return df.rename(columns=PARQUET_RENAMES)[CONTRACT_KEY_COLUMNS + CONTRACT_COLUMNS].reset_index(drop=True)
+
+    def first_contract_date(self, ticker):
+        dates = self.dataset.to_table(
+            columns=["lastTradeDate"], filter=ds.field("ticker") == ticker
+        ).column("lastTradeDate")
+        first = pc.min(dates).as_py()
+        return None if first is None else str(pd.Timestamp(first))
+
+    def chain_as_of(self, ticker, as_of):
+        as_of = pd.Timestamp(as_of)
+        df = self._read(
+            ["lastTradeDate", *CHAIN_AS_OF_COLUMNS],
+            (ds.field("ticker") == ticker)
+            & (ds.field("expiration_date") >= as_of.strftime("%Y-%m-%d"))
+            & (ds.field("lastTradeDate") <= as_of)
+            & ds.field("volume").is_valid()
+            & ds.field("openInterest").is_valid(),
+        )
+        df = df.sort_values(
+            ["strike", "expiration_date", "option_type", "lastTradeDate"], kind="mergesort"
+        ).drop_duplicates(["strike", "expiration_date", "option_type"], keep="last")
+        return list(zip(*(df[column].tolist() for column in CHAIN_AS_OF_COLUMNS)))
+
+    def load_history(self, ticker, since):
+        df = self._read(
+            ["option_type", "expiration_date", "strike", *PARQUET_SCHEMA.names[2:]],
+            (ds.field("ticker") == ticker) & (ds.field("expiration_date") >= since),
+        )
+        df = df.rename(columns=PARQUET_RENAMES)[CONTRACT_KEY_COLUMNS + CONTRACT_COLUMNS]
+        return df.sort_values(
+            ["option_type", "expiration_date", "strike", "Date"], kind="mergesort"
+        ).reset_index(drop=True)
+
+    def load_daily(self, ticker, keys):
+        df = self._read_daily(
+            (ds.field("ticker") == ticker)
+            & ds.field("expiration_date").isin(sorted({key[1] for key in keys}))
+            & ds.field("strike").isin(sorted({float(key[2]) for key in keys}))
+        )
+        wanted = {(key[0], key[1], float(key[2])) for key in keys}
+        found = [
+            key in wanted for key in df[CONTRACT_KEY_COLUMNS].itertuples(index=False, name=None)
+        ]
+        return df[found].reset_index(drop=True)
+
+    def load_daily_history(self, ticker, since):
+        return self._read_daily(
+            (ds.field("ticker") == ticker) & (ds.field("expiration_date") >= since)
+        )
+
+
+class MemoryBackend(StorageBackend):
+    def __init__(self, histories, first_dates=None, daily=None):
+        """
+        Serves preloaded ticker histories from memory, e.g. for a walk-forward run that
+        selects and backtests the same contracts at many reference dates.
+
+        Returns the same frames and rows as the backend the histories were loaded from,
+        for contracts expiring on or after the date they were loaded since. Each history
+        is indexed once by contract, so a contract read is a slice and an as-of chain is
+        one pass over the history.
+
+        :param histories: Dict mapping a ticker to its `StorageBackend.load_history` frame.
+        :param first_dates: Dict mapping a ticker to its `first_contract_date`.
+        :param daily: Dict mapping a ticker to its `StorageBackend.load_daily_history` frame.
+        """
+        self.histories = histories
+        self.first_dates = first_dates or {}
+        self.daily = daily or {}
+        self._indexes = {}
+
+    @classmethod
+    def load(cls, backend, tickers, since):
+        """Loads every ticker's history and daily rollups from `backend` once."""
+        return cls(
+            {ticker: backend.load_history(ticker, since) for ticker in tickers},
+            {ticker: backend.first_contract_date(ticker) for ticker in tickers},
+            {ticker: backend.load_daily_history(ticker, since) for ticker in tickers},
+        )
+
+    def _index(self, ticker):
+        """
+        The ticker's history with, per row, the position of its contract, and a dict mapping
+        each contract key to its (start, stop) row range.
+        """
+        if ticker not in self._indexes:
+            history = self.histories.get(ticker)
+            if history is None:
+                history = pd.DataFrame(columns=CONTRACT_KEY_COLUMNS + CONTRACT_COLUMNS)
+            # Rows are grouped by contract, so a new contract starts wherever the key changes
+            keys = history[CONTRACT_KEY_COLUMNS]
+            starts = np.flatnonzero((keys != keys.shift()).any(axis=1).to_numpy())
+            stops = np.append(starts[1:], len(history))
+            contract_ids = np.repeat(np.arange(len(starts)), stops - starts)
+            ranges = dict(
+                zip(
+                    keys.iloc[starts].itertuples(index=False, name=None),
+                    zip(starts.tolist(), stops.tolist()),
+                )
+            )
+            self._indexes[ticker] = (history, contract_ids, ranges)
+        return self._indexes[ticker]
+
+    @staticmethod
+    def _as_queried(df):
+        # A slice of a ticker-wide frame keeps float columns that a per-contract query
+        # would have returned as int64
+        for column in INTEGER_COLUMNS:
+            if len(df) and df[column].dtype.kind == "f" and df[column].notna().all():
+                df[column] = df[column].astype("int64")
+        return df
+
+    def _rows(self, ticker, keys, columns):
+        history, _, ranges = self._index(ticker)
+        found = [
+            ranges[key]
+            for key in dict.fromkeys((key[0], key[1], float(key[2])) for key in keys)
+            if key in ranges
+        ]
+        positions = np.concatenate(
+            [np.arange(start, stop) for start, stop in found] or [np.array([], dtype=int)]
+        )
+        return self._as_queried(history[columns].iloc[positions].reset_index(drop=True))
+
+    def load_contract(self, ticker, option_type, expiration_date, strike):
+        return self._rows(ticker, [(option_type, expiration_date, strike)], CONTRACT_COLUMNS)
+
+    def load_contracts(self, ticker, keys):
+        return self._rows(ticker, keys, CONTRACT_KEY_COLUMNS + CONTRACT_COLUMNS)
+
+    def first_contract_date(self, ticker):
+        return self.first_dates.get(ticker)
+
+    def chain_as_of(self, ticker, as_of):
+        as_of = pd.Timestamp(as_of)
+        history, contract_ids, _ = self._index(ticker)
+        candidates = np.flatnonzero(
+            (
+                (history["Date"] <= as_of)
+                & (history["expiration_date"] >= as_of.strftime("%Y-%m-%d"))
+                & history["volume"].notna()
+                & history["openInterest"].notna()
+            ).to_numpy()
+        )
+        # Rows are in contract then time order: keep each contract's last candidate
+        ids = contract_ids[candidates]
+        latest = candidates[np.append(ids[1:] != ids[:-1], True)] if len(ids) else candidates
+        df = history.iloc[latest].sort_values(
+            ["strike", "expiration_date", "option_type"], kind="mergesort"
+        )
+        return list(
+            zip(
+                df["strike"].tolist(),
+                df["expiration_date"].tolist(),
+                df["option_type"].tolist(),
+                df["volume"].astype("int64").tolist(),
+                df["openInterest"].astype("int64").tolist(),
+                [None if iv != iv else iv for iv in df["impliedVolatility"].tolist()],
+            )
+        )
+
+    def load_history(self, ticker, since):
+        history = self._index(ticker)[0]
+        return history[history["expiration_date"] >= since].reset_index(drop=True)
+
+    def load_daily(self, ticker, keys):
+        daily = self.daily.get(ticker)
+        if daily is None:
+            return _empty_daily()
+        wanted = {(key[0], key[1], float(key[2])) for key in keys}
+        found = [
+            key in wanted for key in daily[CONTRACT_KEY_COLUMNS].itertuples(index=False, name=None)
+        ]
+        return daily[found].reset_index(drop=True)
+
+    def load_daily_history(self, ticker, since):
+        daily = self.daily.get(ticker)
+        if daily is None:
+            return _empty_daily()
+        return daily[daily["expiration_date"] >= since].reset_index(drop=True)
+
+
+def make_backend(
+    storage="sqlite", db_name="data/options_data.db", parquet_path="data/options_parquet", pool=None
+):
+    """
+    Builds the backend named by a config `storage` value ("sqlite" or "parquet").
+
+    :param pool: `ConnectionPool` for the SQLite backend.
+    """
+    if storage == "sqlite":
+        return SQLiteBackend(db_name, pool)
+    if storage == "parquet":
+        return ParquetBackend(parquet_path)
+    raise ValueError(f"Unknown storage backend: {storage}")
+
+
+def convert_sqlite_to_parquet(db_name, root, row_group_size=2048):
+    """
+    Writes the `options` table of a SQLite database as the dataset read by `ParquetBackend`,
+    with the `options_daily` rollups (if any) under `_daily/`.
+
+    Tickers are converted one at a time, so memory is bounded by the largest ticker.
+    Rows are sorted by option_type, strike and time inside each partition so row-group
+    statistics can skip non-matching contracts.
+
+    :param db_name: Source SQLite database.
+    :param root: Dataset root directory; existing files for a converted partition are replaced.
+    :param row_group_size: Rows per Parquet row group.
+    :return: Number of rows written.
+    """
+    conn = sqlite3.connect(db_name)
+    tickers = [
+        row[0]
+        for row in conn.execute("SELECT DISTINCT ticker FROM options WHERE ticker IS NOT NULL")
+    ]
+
+    written = 0
+    for ticker in tickers:
+        df = pd.read_sql_query(
+            f"SELECT expiration_date, {', '.join(PARQUET_SCHEMA.names)} FROM options WHERE ticker=?",
+            conn,
+            params=[ticker],
+            parse_dates=["lastTradeDate"],
+        )
+        df = df.dropna(subset=["expiration_date"]).sort_values(
+            ["expiration_date", "option_type", "strike", "lastTradeDate"], kind="mergesort"
+        )
+        for expiration_date, rows in df.groupby("expiration_date", sort=False):
+            table = pa.Table.from_pandas(
+                rows[PARQUET_SCHEMA.names].astype(
+                    {"volume": "Int64", "openInterest": "Int64", "inTheMoney": "Int64"}
+                ),
+                schema=PARQUET_SCHEMA,
+                preserve_index=False,
+            ).replace_schema_metadata(None)  # Read back with SQLite's dtypes, not Int64
+            partition = f"{root}/ticker={ticker}/expiration_date={expiration_date}"
+            pafs.LocalFileSystem().create_dir(partition)
+            pq.write_table(table, f"{partition}/part-0.parquet", row_group_size=row_group_size)
+        written += len(df)
+        print(f"Converted {len(df)} rows for {ticker}")
+
+    _convert_daily(conn, root)
+    conn.close()
+
+    return written
+
+
+def _convert_daily(conn, root):
+    """Writes `options_daily` as `PARQUET_DAILY_DIR/ticker=<T>/part-0.parquet`, one file per ticker."""
+    try:
+        tickers = [row[0] for row in conn.execute("SELECT DISTINCT ticker FROM options_daily")]
+    except sqlite3.OperationalError:
+        return  # Never compacted
+    for ticker in tickers:
+        df = pd.read_sql_query(DAILY_HISTORY_QUERY, conn, params=[ticker, ""], parse_dates=["Date"])
+        partition = f"{root}/{PARQUET_DAILY_DIR}/ticker={ticker}"
+        pafs.LocalFileSystem().create_dir(partition)
+        pq.write_table(
+            pa.Table.from_pandas(df, preserve_index=False).replace_schema_metadata(None),
+            f"{partition}/part-0.parquet",
+        )
+
@@ -1,5 +1,6 @@
-from src.contract_select import ContractSelector
-import yfinance as yf
+from src.contract_select import ContractSelector, pair_chain, top_k_order
+from src.greeks import black_scholes, years_to_expiry
+from src.profiling import profiled
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
@@ -7,30 +8,13 @@ from datetime import datetime, timedelta
 
 class StraddleSelector(ContractSelector):
     def get_available_contracts(self, ticker, reference_date=None):
-        conn = self._connect_db()
-        query = """
-            SELECT strike, expiration_date, option_type, volume, openInterest, impliedVolatility
-            FROM options
-            WHERE ticker = ? AND lastTradeDate >= ?
-        """
-        rows = conn.execute(query, (ticker, reference_date)).fetchall()
-        conn.close()
+        rows = self.backend.chain_as_of(ticker, reference_date)
 
         contracts = {}
 
         for row in rows:
             strike, expiration_date, option_type, volume, open_interest, iv = row
 
-            if volume in [None, "nan", "NaN"] or open_interest in [None, "nan", "NaN"]:
-                continue
-
-            try:
-                volume = int(float(volume))
-                open_interest = int(float(open_interest))
-                iv = float(iv)
-            except ValueError:
-                continue
-
             if strike not in contracts:
                 contracts[strike] = {}
             if expiration_date not in contracts[strike]:
@@ -39,20 +23,47 @@ class StraddleSelector(ContractSelector):
             contracts[strike][expiration_date][option_type.lower()] = {
                 "volume": volume,
                 "open_interest": open_interest,
-                "iv": iv,
+                "iv": iv if iv is not None else np.nan,
             }
 
         return contracts
 
+    @profiled("realized_volatility")
     def _compute_realized_volatility(self, ticker, days, reference_date):
+        stored = self.price_store.get_realized_volatility(ticker, days, reference_date)
+        if stored is not None:
+            return stored
+
         end_date = datetime.strptime(reference_date, "%Y-%m-%d")
         start_date = end_date - timedelta(days=days)
-        stock = yf.Ticker(ticker)
-        hist = stock.history(start=start_date, end=end_date)
+        hist = self.price_store.get_history(ticker, start=start_date, end=end_date)
+        if hist.empty:
+            return np.nan
         returns = hist["Close"].pct_change().dropna()
         realized_vol = returns.std() * np.sqrt(252)
         return realized_vol
 
+    @profiled("greeks")
+    def _straddle_greeks(self, pairs, stock_price, reference_date, rate):
+        """
+        Straddle (call + put) Greeks of every pair, from each leg's snapshot IV; both legs
+        of every pair are priced in one `black_scholes` call.
+        """
+        n = len(pairs)
+        years = years_to_expiry(pairs["expiration_date"].to_numpy(), reference_date)
+        greeks = black_scholes(
+            stock_price,
+            np.tile(pairs["strike"].to_numpy(dtype=float), 2),
+            np.tile(years, 2),
+            np.concatenate([pairs["iv_call"].to_numpy(dtype=float), pairs["iv_put"].to_numpy(dtype=float)]),
+            np.arange(2 * n) < n,
+            rate,
+        )
+        return {
+            name: greeks[name][:n] + greeks[name][n:]
+            for name in ("delta", "gamma", "vega", "theta")
+        }
+
     def select_contract(
         self,
         ticker,
@@ -60,14 +71,45 @@ class StraddleSelector(ContractSelector):
         max_results=3,
         historical_days=7,
         optimal_expiry_range=(7, 30),
+        greeks=False,
+        delta_neutral=False,
+        max_abs_delta=None,
+        min_vega=None,
+        rate=0.0,
+        iv_rank_window=None,
+        max_iv_rank=None,
     ):
+        """
+        Ranks straddles by strike distance to the spot price, then IV/HV ratio, then liquidity.
+
+        :param greeks: If True, each result also carries the straddle's Black-Scholes
+                       `delta`, `gamma`, `vega` (per vol point) and `theta` (per day).
+        :param delta_neutral: Rank by absolute straddle delta instead of strike distance.
+        :param max_abs_delta: Drop straddles whose absolute delta is larger.
+        :param min_vega: Drop straddles whose vega is smaller.
+        :param rate: Risk-free rate used for the Greeks.
+        :param iv_rank_window: Lookback (days) of the ticker's stored IV rank (`iv_rank`
+                               table) added to each result as `atm_iv`, `iv_rank` and
+                               `iv_percentile`.
+        :param max_iv_rank: Select nothing when that stored IV rank is higher.
+        """
         if not self.live and reference_date is None:
             reference_date = self._get_first_contract_date(ticker)
             if reference_date is None:
                 return []
 
-        contracts = self.get_available_contracts(ticker, reference_date)
-        if not contracts:
+        iv_context = {}
+        if iv_rank_window is not None:
+            stored = self.price_store.get_iv_rank(ticker, iv_rank_window, reference_date)
+            iv_context = {
+                name: stored[name] if stored else np.nan
+                for name in ("atm_iv", "iv_rank", "iv_percentile")
+            }
+            if max_iv_rank is not None and iv_context["iv_rank"] > max_iv_rank:
+                return []
+
+        contracts = self.get_chain_snapshot(ticker, reference_date)
+        if contracts.empty:
             return []
 
         stock_price = (
@@ -82,56 +124,76 @@ class StraddleSelector(ContractSelector):
 
         hv = self._compute_realized_volatility(ticker, historical_days, reference_date)
 
-        selected_contracts = []
-
-        for strike, exp_data in contracts.items():
-            for expiration_date, contract_data in exp_data.items():
-                days_to_expiry = (
-                    datetime.strptime(expiration_date, "%Y-%m-%d")
-                    - datetime.strptime(reference_date, "%Y-%m-%d")
-                ).days
-                if (
-                    not optimal_expiry_range[0]
-                    <= days_to_expiry
-                    <= optimal_expiry_range[1]
-                ):
-                    continue
-
-                call_data = contract_data.get("call")
-                put_data = contract_data.get("put")
-
-                if not call_data or not put_data:
-                    continue
-
-                liquidity = min(
-                    call_data["volume"],
-                    put_data["volume"],
-                    #call_data["open_interest"],
-                    #put_data["open_interest"],
-                )
-
-                if liquidity == 0:
-                    continue
-
-                avg_iv = (call_data["iv"] + put_data["iv"]) / 2
-                iv_hv_ratio = avg_iv / hv if hv != 0 else np.inf
-
-                selected_contracts.append(
-                    {
-                        "strike": strike,
-                        "expiration_date": expiration_date,
-                        "days_to_expiry": days_to_expiry,
-                        "reference_date": reference_date,
-                        "stock_price": stock_price,
-                        "liquidity": liquidity,
-                        "iv_hv_ratio": iv_hv_ratio,
-                        "strike_distance": abs(strike - stock_price),
-                    }
-                )
-
-        sorted_contracts = sorted(
-            selected_contracts,
-            key=lambda x: (x["strike_distance"], x["iv_hv_ratio"], -x["liquidity"]),
+        pairs = pair_chain(contracts)
+        days_to_expiry = (
+            pd.to_datetime(pairs["expiration_date"], format="%Y-%m-%d")
+            - datetime.strptime(reference_date, "%Y-%m-%d")
+        ).dt.days.to_numpy()
+        liquidity = np.minimum(
+            pairs["volume_call"].to_numpy(),
+            pairs["volume_put"].to_numpy(),
+            #pairs["open_interest_call"].to_numpy(),
+            #pairs["open_interest_put"].to_numpy(),
         )
 
-        return sorted_contracts[:max_results]
+        keep = (
+            (optimal_expiry_range[0] <= days_to_expiry)
+            & (days_to_expiry <= optimal_expiry_range[1])
+            & (liquidity != 0)
+        )
+        pairs = pairs[keep]
+        days_to_expiry = days_to_expiry[keep]
+        liquidity = liquidity[keep]
+        if pairs.empty:
+            return []
+
+        features = {}
+        if greeks or delta_neutral or max_abs_delta is not None or min_vega is not None:
+            features = self._straddle_greeks(pairs, stock_price, reference_date, rate)
+            keep = np.ones(len(pairs), dtype=bool)
+            if max_abs_delta is not None:
+                keep &= np.abs(features["delta"]) <= max_abs_delta
+            if min_vega is not None:
+                keep &= features["vega"] >= min_vega
+            if not keep.all():
+                pairs = pairs[keep]
+                days_to_expiry = days_to_expiry[keep]
+                liquidity = liquidity[keep]
+                features = {name: values[keep] for name, values in features.items()}
+                if pairs.empty:
+                    return []
+
+        avg_iv = (pairs["iv_call"].to_numpy() + pairs["iv_put"].to_numpy()) / 2
+        iv_hv_ratio = avg_iv / hv if hv != 0 else np.full(len(avg_iv), np.inf)
+        strike_distance = np.abs(pairs["strike"].to_numpy(dtype=float) - stock_price)
+
+        first_key = strike_distance
+        if delta_neutral:
+            # Straddles without Greeks (missing IV) rank after every priced one
+            first_key = np.nan_to_num(np.abs(features["delta"]), nan=np.inf)
+        top = top_k_order(
+            [first_key, iv_hv_ratio, -liquidity.astype(float)], max_results
+        )
+
+        strikes = pairs["strike"].tolist()
+        expiration_dates = pairs["expiration_date"].tolist()
+        days_to_expiry = days_to_expiry.tolist()
+        liquidity = liquidity.tolist()
+        iv_hv_ratio = iv_hv_ratio.tolist()
+        strike_distance = strike_distance.tolist()
+        features = {name: values.tolist() for name, values in features.items()} if greeks else {}
+        return [
+            {
+                "strike": strikes[i],
+                "expiration_date": expiration_dates[i],
+                "days_to_expiry": days_to_expiry[i],
+                "reference_date": reference_date,
+                "stock_price": stock_price,
+                "liquidity": liquidity[i],
+                "iv_hv_ratio": iv_hv_ratio[i],
+                "strike_distance": strike_distance[i],
+                **{name: values[i] for name, values in features.items()},
+                **iv_context,
+            }
+            for i in top
+        ]
@@ -0,0 +1,307 @@
+import math
+from collections import deque
+import numpy as np
+from src.strategy import SimpleStraddleStrategy
+
+
+# Running sums are recomputed from the window this often to stop float drift accumulating
+_RESYNC_EVERY = 4096
+
+
+class RollingMean:
+    def __init__(self, window, skipna=False):
+        """
+        Mean of the last `window` values, or of all values while fewer have been seen,
+        i.e. `np.mean(values[-window:])` (`np.nanmean` with `skipna`).
+
+        :param skipna: Ignore NaNs instead of returning NaN while one is in the window.
+        """
+        self.window = window
+        self.skipna = skipna
+        self.value = math.nan
+        self._values = deque()
+        self._sum = 0.0
+        self._count = 0  # Non-NaN values in the window
+        self._updates = 0
+
+    def update(self, x):
+        x = float(x)
+        self._values.append(x)
+        if x == x:
+            self._sum += x
+            self._count += 1
+        if len(self._values) > self.window:
+            old = self._values.popleft()
+            if old == old:
+                self._sum -= old
+                self._count -= 1
+
+        self._updates += 1
+        if self._updates % _RESYNC_EVERY == 0:
+            self._sum = math.fsum(v for v in self._values if v == v)
+
+        if self._count == 0 or (not self.skipna and self._count < len(self._values)):
+            self.value = math.nan
+        else:
+            self.value = self._sum / self._count
+        return self.value
+
+
+class RSI:
+    def __init__(self, period=14):
+        """Wilder's RSI, matching `talib.RSI(close, timeperiod=period)` bar for bar."""
+        self.period = period
+        self.lookback = period
+        self.value = math.nan
+        self._prev_close = None
+        self._seen = 0  # Price changes seen so far
+        self._avg_gain = 0.0
+        self._avg_loss = 0.0
+
+    def update(self, close):
+        close = float(close)
+        prev_close, self._prev_close = self._prev_close, close
+        if prev_close is None:
+            return self.value
+
+        change = close - prev_close
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        self._seen += 1
+        if self._seen <= self.period:
+            # The first averages are plain means of the first `period` changes
+            self._avg_gain += gain
+            self._avg_loss += loss
+            if self._seen < self.period:
+                return self.value
+            self._avg_gain /= self.period
+            self._avg_loss /= self.period
+        else:
+            self._avg_gain = (self._avg_gain * (self.period - 1) + gain) / self.period
+            self._avg_loss = (self._avg_loss * (self.period - 1) + loss) / self.period
+
+        total = self._avg_gain + self._avg_loss
+        self.value = 100.0 * self._avg_gain / total if total != 0 else 0.0
+        return self.value
+
+
+class ATR:
+    def __init__(self, period=14):
+        """Wilder's average true range, matching `talib.ATR(high, low, close, timeperiod=period)`."""
+        self.period = period
+        self.lookback = period
+        self.value = math.nan
+        self._prev_close = None
+        self._seen = 0  # True ranges seen so far (the first bar has none)
+        self._sum = 0.0
+
+    def update(self, high, low, close):
+        high, low, close = float(high), float(low), float(close)
+        prev_close, self._prev_close = self._prev_close, close
+        if prev_close is None:
+            return self.value
+
+        true_range = max(high - low, abs(high - prev_close), abs(low - prev_close))
+        self._seen += 1
+        if self._seen < self.period:
+            self._sum += true_range
+        elif self._seen == self.period:
+            self.value = (self._sum + true_range) / self.period
+        else:
+            self.value = (self.value * (self.period - 1) + true_range) / self.period
+        return self.value
+
+
+class BollingerBands:
+    def __init__(self, period=20, nbdev=2.0):
+        """
+        Simple-moving-average Bollinger bands with population standard deviation,
+        matching `talib.BBANDS(close, timeperiod=period, nbdevup=nbdev, nbdevdn=nbdev)`.
+
+        `value` is the `(upper, middle, lower)` tuple.
+        """
+        self.period = period
+        self.nbdev = nbdev
+        self.lookback = period - 1
+        self.value = (math.nan, math.nan, math.nan)
+        self._values = deque()
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._updates = 0
+
+    def update(self, close):
+        close = float(close)
+        self._values.append(close)
+        self._sum += close
+        self._sum_sq += close * close
+        if len(self._values) > self.period:
+            old = self._values.popleft()
+            self._sum -= old
+            self._sum_sq -= old * old
+
+        self._updates += 1
+        if self._updates % _RESYNC_EVERY == 0:
+            self._sum = math.fsum(self._values)
+            self._sum_sq = math.fsum(v * v for v in self._values)
+
+        if len(self._values) < self.period:
+            return self.value
+        mean = self._sum / self.period
+        deviation = self.nbdev * math.sqrt(max(self._sum_sq / self.period - mean * mean, 0.0))
+        self.value = (mean + deviation, mean, mean - deviation)
+        return self.value
+
+
+class RollingRank:
+    def __init__(self, window=20):
+        """
+        Position of the latest value between the minimum and maximum of the last `window`
+        values (the latest included): `(x - min) / (max - min)`, NaN when they are equal.
+        Used as the IV rank. Minimum and maximum are kept in monotonic deques, so an update
+        is amortized O(1).
+        """
+        self.window = window
+        self.value = math.nan
+        self._index = 0
+        self._mins = deque()  # (index, value), values increasing
+        self._maxs = deque()  # (index, value), values decreasing
+        self._nans = deque()  # Indexes of NaNs in the window
+
+    def update(self, x):
+        x = float(x)
+        i = self._index
+        self._index += 1
+        expired = i - self.window
+        for queue in (self._mins, self._maxs):
+            while queue and queue[0][0] <= expired:
+                queue.popleft()
+        while self._nans and self._nans[0] <= expired:
+            self._nans.popleft()
+
+        if x != x:
+            self._nans.append(i)
+        else:
+            while self._mins and self._mins[-1][1] >= x:
+                self._mins.pop()
+            self._mins.append((i, x))
+            while self._maxs and self._maxs[-1][1] <= x:
+                self._maxs.pop()
+            self._maxs.append((i, x))
+
+        if self._nans or x != x:
+            self.value = math.nan
+        else:
+            low, high = self._mins[0][1], self._maxs[0][1]
+            self.value = (x - low) / (high - low) if high != low else math.nan
+        return self.value
+
+
+class StraddleSignals:
+    def __init__(self, strategy=SimpleStraddleStrategy):
+        """
+        Incremental `SimpleStraddleStrategy` entry/exit rules for live bars.
+
+        Every indicator the strategy reads (RSI, ATR, Bollinger bands, IV rank, the volume
+        and ATR means) keeps a fixed-size state, so `update` costs the same on the first bar
+        and the ten-thousandth. After each bar, `should_buy`, `should_exit` and
+        `position_size` give what the strategy's methods would return on the frame built so
+        far; the IV rank is taken over the trailing 20 bars ending at the current bar.
+
+        :param strategy: `SimpleStraddleStrategy` or a subclass that only changes parameters.
+        """
+        self.base_hold_period = strategy.base_hold_period
+        self.profit_target = strategy.profit_target
+        self.base_size = strategy.base_size
+        self.hold_period = self.base_hold_period
+
+        self.rsi = RSI(14)
+        self.atr = ATR(14)
+        self.bbands = BollingerBands(20)
+        self.iv_rank = RollingRank(20)
+        self.volume_mean = RollingMean(20)
+        self.atr_mean = RollingMean(10)
+        self.atr_nanmean = RollingMean(20, skipna=True)
+        self._atr = deque([math.nan] * 3, maxlen=3)
+
+        # backtesting.py first calls `next` once every indicator has a value
+        self.start = 1 + max(self.rsi.lookback, self.atr.lookback, self.bbands.lookback)
+        self.bars = 0
+        self.time = None
+        self.close = self.volume = math.nan
+
+    def update(self, time, high, low, close, volume, implied_volatility):
+        """Adds one bar; returns self."""
+        self.bars += 1
+        self.time = time
+        self.close = float(close)
+        self.volume = float(volume)
+        self.rsi.update(close)
+        atr = self.atr.update(high, low, close)
+        self._atr.append(atr)
+        self.atr_mean.update(atr)
+        self.atr_nanmean.update(atr)
+        self.bbands.update(close)
+        self.iv_rank.update(implied_volatility)
+        self.volume_mean.update(volume)
+        return self
+
+    @property
+    def ready(self):
+        """True once the strategy would evaluate its rules on the current bar."""
+        return self.bars > self.start
+
+    def should_buy(self):
+        """`SimpleStraddleStrategy.should_buy` on the current bar: `(buy, reason)`."""
+        reasons = []
+        if self.close <= self.bbands.value[2]:
+            reasons.append("Bollinger Band Squeeze")
+
+        if self.iv_rank.value > 0.8:
+            return False, "IV Rank Too High (Expensive Options)"
+
+        if self.volume < 1.5 * self.volume_mean.value:
+            return False, "Low Volume Confirmation"
+
+        rsi = self.rsi.value
+        if rsi < 30:
+            reasons.append("RSI Oversold")
+        if rsi > 70:
+            reasons.append("RSI Overbought")
+        atr_3, atr_2, atr_1 = self._atr
+        if atr_1 > atr_2 > atr_3:
+            reasons.append("Extra Increasing ATR (Volatility)")
+        elif atr_1 > atr_2:
+            reasons.append("Increasing ATR (Volatility)")
+
+        return (True, ", ".join(reasons)) if reasons else (False, "")
+
+    def position_size(self):
+        """The ATR-scaled size `SimpleStraddleStrategy.next` buys on the current bar."""
+        avg_atr = self.atr_nanmean.value
+        current_atr = self.atr.value if not np.isnan(self.atr.value) else avg_atr
+        if np.isnan(current_atr) or np.isnan(avg_atr) or avg_atr == 0:
+            adjusted_size = self.base_size
+        else:
+            adjusted_size = int(self.base_size / (current_atr / avg_atr))
+        return max(1, adjusted_size)
+
+    def should_exit(self, entry_price, entry_time):
+        """`SimpleStraddleStrategy.should_exit` on the current bar: `(exit, reason)`."""
+        reasons = []
+        atr = self.atr.value
+        if atr > 1.5 * self.atr_mean.value:
+            self.hold_period = 5
+        else:
+            self.hold_period = self.base_hold_period
+
+        if self.time >= entry_time + np.timedelta64(self.hold_period, "D"):
+            reasons.append(f"Hold Period Expired ({self.hold_period} days)")
+
+        trailing_stop = entry_price - (atr * 1.5)
+        if self.close < trailing_stop:
+            reasons.append("ATR Trailing Stop Hit")
+
+        price_change = (self.close - entry_price) / entry_price
+        if price_change >= self.profit_target:
+            reasons.append(f"Profit Target Hit (+{self.profit_target * 100}%)")
+
+        return (True, ", ".join(reasons)) if reasons else (False, "")
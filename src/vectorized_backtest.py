@@ -0,0 +1,323 @@
+from backtesting import Backtest
+from backtesting._stats import compute_stats
+from backtesting._util import _Data, _indicator_warmup_nbars
+from src.strategy import SimpleStraddleStrategy
+from numpy.lib.stride_tricks import sliding_window_view
+from math import copysign
+import numpy as np
+import pandas as pd
+
+
+# Methods whose behaviour the simulator reproduces; overriding any of them opts out
+_SIMULATED_METHODS = ("init", "next", "should_buy", "should_exit")
+
+# Bars examined per step while looking for the next exit; doubles on each miss
+_EXIT_SCAN_BLOCK = 1024
+
+
+def supports_strategy(strategy):
+    """True if `strategy` behaves exactly like `SimpleStraddleStrategy` (parameters may differ)."""
+    return isinstance(strategy, type) and all(
+        getattr(strategy, name, None) is getattr(SimpleStraddleStrategy, name)
+        for name in _SIMULATED_METHODS
+    )
+
+
+def _trailing(values, window, func):
+    """`func(values[max(0, i - window + 1):i + 1])` for every i, NaN-propagating like numpy."""
+    out = np.empty(len(values))
+    head = min(window - 1, len(values))
+    for i in range(head):
+        out[i] = func(values[: i + 1])
+    if len(values) >= window:
+        out[head:] = func(sliding_window_view(values, window), axis=1)
+    return out
+
+
+class VectorizedStraddleSimulator:
+    def __init__(self, data, strategy=SimpleStraddleStrategy, cash=10000, commission=0.001, **params):
+        """
+        Array-based equivalent of `Backtest(data, SimpleStraddleStrategy).run()`.
+
+        Indicators come from the strategy's own `init`, entry/exit conditions are evaluated
+        as whole arrays, and entries, hold periods, cooldowns, trailing stops and profit
+        targets are resolved in a single forward pass with the same broker rules
+        (next-bar-open fills, cash check, relative commission) as backtesting.py.
+
+        :param data: OHLCV frame as produced by `DataProvider.create_data`.
+        :param strategy: `SimpleStraddleStrategy` or a subclass that only changes parameters.
+        :param cash: Starting cash.
+        :param commission: Relative commission per fill.
+        :param params: Strategy parameter overrides (e.g. `profit_target=0.3`).
+        """
+        if not supports_strategy(strategy):
+            raise ValueError(
+                f"{getattr(strategy, '__name__', strategy)} overrides SimpleStraddleStrategy logic; "
+                "use BacktestEngine.run_backtest instead."
+            )
+
+        self.bt = Backtest(data, strategy, cash=cash, commission=commission)
+        self.cash = cash
+        self.commission = commission
+
+        # Build the strategy exactly as Backtest.run does so indicators, names and warm-up match
+        self.data = _Data(self.bt._data.copy(deep=False))
+        broker = self.bt._broker(data=self.data)
+        self.strategy = self.bt._strategy(broker, self.data, params)
+        self.strategy.init()
+        self.data._update()
+        self.start = 1 + _indicator_warmup_nbars(self.strategy)
+        self._signals = None
+
+    def _commission(self, size, price):
+        return 0 + abs(size) * price * self.commission
+
+    def _prepare_signals(self):
+        """Parameter-independent arrays, computed once and reused by every `run` call."""
+        s = self.strategy
+        df = self.bt._data
+        n = len(df)
+
+        open_ = df["Open"].to_numpy(dtype=float)
+        close = df["Close"].to_numpy(dtype=float)
+        volume = df["volume"].to_numpy(dtype=float)
+        rsi = np.asarray(s.rsi, dtype=float)
+        atr = np.asarray(s.atr, dtype=float)
+        lower = np.asarray(s.lower_band, dtype=float)
+
+        # `self.iv` is bound once in init() to the full-length column, so the strategy's
+        # IV rank is the same value on every bar
+        iv = np.asarray(s.iv, dtype=float)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            iv_rank = (iv[-1] - np.min(iv[-20:])) / (np.max(iv[-20:]) - np.min(iv[-20:]))
+
+        with np.errstate(invalid="ignore"):
+            avg_volume = _trailing(volume, 20, np.mean)
+            atr_prev = np.concatenate(([np.nan], atr[:-1]))
+            atr_prev2 = np.concatenate(([np.nan, np.nan], atr[:-2]))
+            bollinger = close <= lower
+            rsi_low = rsi < 30
+            rsi_high = rsi > 70
+            atr_rising = atr > atr_prev
+            atr_extra = atr_rising & (atr_prev > atr_prev2)
+            has_reason = bollinger | rsi_low | rsi_high | atr_rising
+            buy_signal = has_reason & ~(volume < 1.5 * avg_volume)
+            atr_extended = atr > 1.5 * _trailing(atr, 10, np.mean)
+        if iv_rank > 0.8:
+            buy_signal[:] = False
+        buy_signal[: self.start] = False
+
+        return {
+            "n": n,
+            "open": open_,
+            "close": close,
+            "times": df.index.asi8,
+            "atr": atr,
+            "bollinger": bollinger,
+            "rsi_low": rsi_low,
+            "rsi_high": rsi_high,
+            "atr_rising": atr_rising,
+            "atr_extra": atr_extra,
+            "atr_extended": atr_extended,
+            "buy_bars": np.flatnonzero(buy_signal),
+        }
+
+    def run(self, **params):
+        """
+        Simulates one parameter set. Indicators and entry signals are shared between calls,
+        so a simulator can be reused across a parameter sweep.
+
+        :param params: Strategy parameter overrides for this run only.
+        :return: Tuple `(stats, trades, entry_reason, exit_reason)` shaped like `Backtest.run()`,
+                 `stats._trades` and the strategy's final reasons, or None when the data hits a
+                 corner case (too few bars, running out of money) the simulator does not model.
+        """
+        s = self.strategy
+        for name in params:
+            if not hasattr(type(s), name):
+                raise AttributeError(f"Strategy '{type(s).__name__}' is missing parameter '{name}'.")
+        base_hold_period = params.get("base_hold_period", s.base_hold_period)
+        cooldown_period = params.get("cooldown_period", s.cooldown_period)
+        profit_target = params.get("profit_target", s.profit_target)
+        base_size = params.get("base_size", s.base_size)
+
+        df = self.bt._data
+        n = len(df)
+        start = self.start
+        if start < 3 or start >= n:
+            return None
+
+        if self._signals is None:
+            self._signals = self._prepare_signals()
+        sig = self._signals
+        open_, close, times, atr = sig["open"], sig["close"], sig["times"], sig["atr"]
+        bollinger, rsi_low, rsi_high = sig["bollinger"], sig["rsi_low"], sig["rsi_high"]
+        atr_rising, atr_extra, atr_extended = sig["atr_rising"], sig["atr_extra"], sig["atr_extended"]
+        buy_bars = sig["buy_bars"]
+
+        day_ns = np.int64(86_400_000_000_000)
+        hold_ns = np.where(atr_extended, 5, base_hold_period).astype(np.int64) * day_ns
+
+        cash = self.cash
+        equity = np.full(n, np.nan)
+        equity_from = start
+        trades = []
+        open_trade = None  # (size, entry_price, fill_bar)
+        entry_reason = exit_reason = None
+        cursor = start
+
+        while True:
+            # Next entry: first buy signal at or after the cursor (cooldown already applied)
+            k = np.searchsorted(buy_bars, cursor)
+            if k == len(buy_bars):
+                break
+            entry_bar = buy_bars[k]
+
+            entry_price = close[entry_bar]
+            entry_time = times[entry_bar]
+            reasons = []
+            if bollinger[entry_bar]:
+                reasons.append("Bollinger Band Squeeze")
+            if rsi_low[entry_bar]:
+                reasons.append("RSI Oversold")
+            if rsi_high[entry_bar]:
+                reasons.append("RSI Overbought")
+            if atr_extra[entry_bar]:
+                reasons.append("Extra Increasing ATR (Volatility)")
+            elif atr_rising[entry_bar]:
+                reasons.append("Increasing ATR (Volatility)")
+            entry_reason = ", ".join(reasons)
+
+            window = atr[max(0, entry_bar - 19) : entry_bar + 1]
+            current_atr = atr[entry_bar] if not np.isnan(atr[entry_bar]) else np.nanmean(window)
+            avg_atr = np.nanmean(window)
+            if np.isnan(current_atr) or np.isnan(avg_atr) or avg_atr == 0:
+                adjusted_size = base_size
+            else:
+                adjusted_size = int(base_size / (current_atr / avg_atr))
+            size = max(1, adjusted_size)
+
+            # Market order fills on the next bar's open if cash allows
+            fill_bar = entry_bar + 1
+            if fill_bar < n:
+                price = open_[fill_bar]
+                # Broker prices a zero open at the bar's close
+                adjusted_price = (price or close[fill_bar]) * 1.0
+                equity[equity_from:fill_bar] = cash
+                equity_from = fill_bar
+                if abs(size) * (adjusted_price + self._commission(size, price)) <= max(0, cash):
+                    cash -= self._commission(size, adjusted_price)
+                    open_trade = (size, adjusted_price, fill_bar)
+
+            # Next exit: first bar after entry where any exit condition holds
+            exit_bar = None
+            lo, block = entry_bar + 1, _EXIT_SCAN_BLOCK
+            while lo < n:
+                hi = min(n, lo + block)
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    hits = (
+                        (times[lo:hi] >= entry_time + hold_ns[lo:hi])
+                        | (close[lo:hi] < entry_price - (atr[lo:hi] * 1.5))
+                        | ((close[lo:hi] - entry_price) / entry_price >= profit_target)
+                    )
+                found = np.flatnonzero(hits)
+                if len(found):
+                    exit_bar = lo + found[0]
+                    break
+                lo, block = hi, block * 2
+
+            if exit_bar is None:
+                break
+
+            hold_period = 5 if atr_extended[exit_bar] else base_hold_period
+            reasons = []
+            if times[exit_bar] >= entry_time + hold_period * day_ns:
+                reasons.append(f"Hold Period Expired ({hold_period} days)")
+            if close[exit_bar] < entry_price - (atr[exit_bar] * 1.5):
+                reasons.append("ATR Trailing Stop Hit")
+            with np.errstate(invalid="ignore", divide="ignore"):
+                if (close[exit_bar] - entry_price) / entry_price >= profit_target:
+                    reasons.append(f"Profit Target Hit (+{profit_target * 100}%)")
+            exit_reason = ", ".join(reasons)
+
+            # position.close() fills on the next bar's open
+            close_bar = exit_bar + 1
+            if open_trade is not None:
+                size_, fill_price, fill_bar_ = open_trade
+                mark_end = min(close_bar, n)
+                equity[equity_from:mark_end] = cash + size_ * (close[equity_from:mark_end] - fill_price)
+                equity_from = mark_end
+                if close_bar < n:
+                    exit_price = open_[close_bar]
+                    pl = size_ * ((exit_price or close[close_bar]) - fill_price)
+                    cash += pl - self._commission(size_, exit_price)
+                    trades.append((size_, fill_bar_, close_bar, fill_price, exit_price))
+                    open_trade = None
+                else:
+                    break
+
+            # Cooldown after the exit signal before the next entry can be considered
+            cooldown_end = times[exit_bar] + cooldown_period * day_ns
+            cursor = exit_bar + 1 + np.searchsorted(times[exit_bar + 1 :], cooldown_end)
+
+        if open_trade is not None:
+            size_, fill_price, _ = open_trade
+            equity[equity_from:] = cash + size_ * (close[equity_from:] - fill_price)
+        else:
+            equity[equity_from:] = cash
+        equity[:start] = np.nan
+
+        if np.nanmin(equity) <= 0:
+            return None  # backtesting.py would stop the run early
+
+        trades_df = self._trades_frame(trades, close[-1])
+        equity = pd.Series(equity).bfill().fillna(cash).values
+        stats = compute_stats(
+            trades=trades_df,
+            equity=equity,
+            ohlc_data=df,
+            strategy_instance=s,
+            risk_free_rate=0.0,
+        )
+        return stats, trades_df, entry_reason, exit_reason
+
+    def _trades_frame(self, trades, last_price):
+        index = self.bt._data.index
+        sizes = [t[0] for t in trades]
+        entry_bars = [t[1] for t in trades]
+        exit_bars = [t[2] for t in trades]
+        entry_prices = [t[3] for t in trades]
+        exit_prices = [t[4] for t in trades]
+        # Trade.pl falls back to the last price when the exit price is 0
+        marks = [(price or last_price) for price in exit_prices]
+
+        trades_df = pd.DataFrame(
+            {
+                "Size": sizes,
+                "EntryBar": entry_bars,
+                "ExitBar": exit_bars,
+                "EntryPrice": entry_prices,
+                "ExitPrice": exit_prices,
+                "SL": [None] * len(trades),
+                "TP": [None] * len(trades),
+                "PnL": [size * (mark - entry) for size, mark, entry in zip(sizes, marks, entry_prices)],
+                "ReturnPct": [
+                    copysign(1, size) * (mark / entry - 1)
+                    for size, mark, entry in zip(sizes, marks, entry_prices)
+                ],
+                "EntryTime": [index[bar] for bar in entry_bars],
+                "ExitTime": [index[bar] for bar in exit_bars],
+            }
+        )
+        trades_df["Duration"] = trades_df["ExitTime"] - trades_df["EntryTime"]
+        trades_df["Tag"] = [None] * len(trades)
+
+        if len(trades_df):
+            for ind in self.strategy._indicators:
+                ind = np.atleast_2d(ind)
+                for i, values in enumerate(ind):
+                    suffix = f"_{i}" if len(ind) > 1 else ""
+                    trades_df[f"Entry_{ind.name}{suffix}"] = values[trades_df["EntryBar"].values]
+                    trades_df[f"Exit_{ind.name}{suffix}"] = values[trades_df["ExitBar"].values]
+
+        return trades_df
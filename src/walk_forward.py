@@ -0,0 +1,169 @@
+from src.backtest_engine import BacktestEngine
+from src.storage import MemoryBackend
+from src.straddle_selector import StraddleSelector
+import pandas as pd
+
+
+def walk_forward_dates(start_date, end_date, step="1B"):
+    """
+    Reference dates from `start_date` to `end_date` (inclusive).
+
+    :param step: pandas offset alias, e.g. "1B" for every business day or "7D" for weekly.
+    :return: List of YYYY-MM-DD strings.
+    """
+    return [
+        date.strftime("%Y-%m-%d")
+        for date in pd.date_range(start_date, end_date, freq=step)
+    ]
+
+
+def straddle_legs(ticker, contract):
+    """The call and put legs of a selected straddle, as accepted by `run_backtest`."""
+    return [
+        {
+            "ticker": ticker,
+            "option_type": option_type,
+            "expiration_date": contract["expiration_date"],
+            "strike": contract["strike"],
+        }
+        for option_type in ("call", "put")
+    ]
+
+
+def run_walk_forward(
+    strategy,
+    tickers,
+    reference_dates,
+    backend,
+    db_name="data/options_data.db",
+    max_contracts_per_ticker=3,
+    offline=False,
+    cash=10000,
+    commission=0.001,
+    vectorized=False,
+    selector_cls=StraddleSelector,
+    preload=None,
+    pool=None,
+    result_cache=None,
+    select_kwargs=None,
+):
+    """
+    Selects and backtests straddles at every reference date, reusing loaded data.
+
+    Contracts are selected at every date first. Every distinct leg selected on any date
+    is then loaded once per ticker and resampled once, each distinct straddle is combined
+    once, and each backtest runs on the slice from its reference date onward. Results
+    match separate runs per date.
+
+    :param reference_dates: Dates to select and start backtests at (see `walk_forward_dates`).
+    :param backend: `StorageBackend` to read from.
+    :param selector_cls: `ContractSelector` subclass used at every date.
+    :param preload: If True, each ticker's history (every contract expiring on or after the
+                    first date) is read once into a `MemoryBackend` and every date's chain
+                    snapshot is sliced from it. Defaults to True unless the backend's
+                    `chain_as_of` is already an index seek (`seeks_as_of`).
+    :param pool: `ConnectionPool` the selectors read underlying prices through.
+    :param result_cache: Optional `ResultCache` passed to every backtest.
+    :param select_kwargs: Extra `select_contract` arguments (e.g. Greeks filters).
+    :return: List of `(reference_date, ticker, contract, result)` tuples, ordered by
+             ticker and then date, where `result` is a `run_backtest` result (or None).
+    """
+    records = []
+    if not reference_dates:
+        return records
+    if preload is None:
+        preload = not backend.seeks_as_of
+
+    for ticker in tickers:
+        ticker_backend = (
+            MemoryBackend.load(backend, [ticker], since=reference_dates[0])
+            if preload
+            else backend
+        )
+        selector = selector_cls(
+            db_name, use_open=True, offline=offline, backend=ticker_backend, pool=pool
+        )
+        engine = BacktestEngine(db_name, backend=ticker_backend, result_cache=result_cache)
+
+        jobs = []
+        for reference_date in reference_dates:
+            selected_contracts = selector.select_contract(
+                ticker,
+                reference_date=reference_date,
+                max_results=max_contracts_per_ticker,
+                **(select_kwargs or {}),
+            )
+            if not selected_contracts:
+                print(f"No suitable contracts found for {ticker} on {reference_date}")
+            for contract in selected_contracts:
+                jobs.append((reference_date, contract, straddle_legs(ticker, contract)))
+        if not jobs:
+            continue
+
+        print(f"Running {len(jobs)} walk-forward backtests for {ticker}")
+        job_data = engine.data_provider.create_data_many(
+            [contracts for _, _, contracts in jobs],
+            reference_dates=[reference_date for reference_date, _, _ in jobs],
+        )
+        for (reference_date, contract, contracts), bt_data in zip(jobs, job_data):
+            if bt_data is None:
+                print("Skipping backtest due to missing data.")
+                result = None
+            else:
+                try:
+                    result = engine.run_backtest(
+                        strategy,
+                        contracts,
+                        reference_date,
+                        cash=cash,
+                        commission=commission,
+                        bt_data=bt_data,
+                        vectorized=vectorized,
+                    )
+                except Exception as e:
+                    result = engine._error_result(contracts, e)
+            records.append((reference_date, ticker, contract, result))
+
+    return records
+
+
+def summarize_walk_forward(records):
+    """
+    Flattens `run_walk_forward` records into result tables.
+
+    :return: `(trades, summaries, by_date)` DataFrames: every trade and every contract
+             summary tagged with its reference date, and one aggregate row per date.
+    """
+    trades, summaries = [], []
+    for reference_date, ticker, contract, result in records:
+        if not result or result.get("error") or result["results"] is None:
+            continue
+        tags = {
+            "reference_date": reference_date,
+            "ticker": ticker,
+            "strike": contract["strike"],
+            "expiration_date": contract["expiration_date"],
+        }
+        for trade in result["results"].to_dict(orient="records"):
+            trades.append({**trade, **tags, "option_type": "straddle"})
+        summaries.append({**tags, **result["summary"]})
+
+    trades = pd.DataFrame(trades)
+    summaries = pd.DataFrame(summaries)
+    if summaries.empty:
+        return trades, summaries, pd.DataFrame()
+
+    by_date = (
+        summaries.groupby("reference_date")
+        .agg(
+            total_profit=("total_profit", "sum"),
+            win_rate=("win_rate", "mean"),
+            max_drawdown=("max_drawdown", "mean"),
+            sharpe_ratio=("sharpe_ratio", "mean"),
+            num_trades=("num_trades", "sum"),
+            num_contracts=("total_profit", "size"),
+        )
+        .reset_index()
+    )
+    by_date["cumulative_profit"] = by_date["total_profit"].cumsum()
+    return trades, summaries, by_date